@@ -1,2065 +1,1992 @@
 import smtplib
 import os
+import argparse
+import asyncio
+import csv
+import fcntl
+import gzip
+import hashlib
+import heapq
+import html
+import json
+import math
+import mmap
+import random
+import re
+import shutil
+import socketserver
+import sqlite3
+import struct
+import sys
+import textwrap
+import threading
+import time
+import zlib
+from bisect import bisect_left
+from collections import OrderedDict, namedtuple
+from itertools import count, islice, takewhile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager, nullcontext
+from queue import LifoQueue, Queue
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from datetime import datetime
+from email.charset import Charset, QP
+from html.parser import HTMLParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from datetime import date, datetime, timezone
+from urllib.parse import quote, unquote, urlsplit
+from zoneinfo import ZoneInfo
 
 # --- CONFIGURATION ---
 SENDER_EMAIL = os.environ.get("EMAIL_ADDRESS")
 EMAIL_PASSWORD = os.environ.get("EMAIL_PASSWORD")
 RECEIVER_EMAIL = os.environ.get("EMAIL_ADDRESS")
 
+# Comma-separated subscriber list. Empty means "just RECEIVER_EMAIL".
+RECIPIENT_EMAILS = os.environ.get("RECIPIENT_EMAILS", "")
+
+SMTP_HOST = os.environ.get("SMTP_HOST", "smtp.gmail.com")
+SMTP_PORT = int(os.environ.get("SMTP_PORT", "587"))
+SMTP_TIMEOUT = float(os.environ.get("SMTP_TIMEOUT", "30"))
+SMTP_STARTTLS = os.environ.get("SMTP_STARTTLS", "1") != "0"
+# Number of authenticated sessions kept open while sending to a list.
+SMTP_POOL_SIZE = int(os.environ.get("SMTP_POOL_SIZE", "3"))
+# Sessions idle longer than this are probed with NOOP before being reused.
+SMTP_IDLE_TIMEOUT = float(os.environ.get("SMTP_IDLE_TIMEOUT", "60"))
+# Cap on concurrent SMTP sessions in async delivery mode.
+SMTP_CONCURRENCY = int(os.environ.get("SMTP_CONCURRENCY", "10"))
+# Processes used to render large batches. 0 renders in the sending process.
+RENDER_WORKERS = int(os.environ.get("RENDER_WORKERS", "0"))
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+# Pre-rendered lesson bodies, keyed by a hash of the lesson and the template.
+RENDER_CACHE_DIR = os.environ.get("RENDER_CACHE_DIR", os.path.join(BASE_DIR, ".render_cache"))
+# Lesson bundle to send from, and whether to read it through mmap.
+COURSE_BUNDLE = os.environ.get("COURSE_BUNDLE", os.path.join(BASE_DIR, "curriculum", "js_deep_dive.jsonl"))
+CURRICULUM_MMAP = os.environ.get("CURRICULUM_MMAP", "0") == "1"
+# Per-subscriber schedule: subscribers bucketed by time zone and send hour.
+SCHEDULE_DIR = os.environ.get("SCHEDULE_DIR", os.path.join(BASE_DIR, ".schedule"))
+# SQLite subscriber store; used instead of SCHEDULE_DIR once it exists, and
+# anyone still in SCHEDULE_DIR is moved into it the first time it is opened.
+SUBSCRIBER_DB = os.environ.get("SUBSCRIBER_DB", os.path.join(BASE_DIR, "subscribers.db"))
+# Rows per transaction for imports/updates, and due subscribers per send batch.
+IMPORT_BATCH_SIZE = int(os.environ.get("IMPORT_BATCH_SIZE", "10000"))
+SEND_BATCH_SIZE = int(os.environ.get("SEND_BATCH_SIZE", "1000"))
+# Attempts per recipient, and the jittered exponential backoff between them.
+SEND_MAX_ATTEMPTS = int(os.environ.get("SEND_MAX_ATTEMPTS", "4"))
+RETRY_BASE_DELAY = float(os.environ.get("RETRY_BASE_DELAY", "2"))
+RETRY_MAX_DELAY = float(os.environ.get("RETRY_MAX_DELAY", "60"))
+# Append-only record of deliveries, checked before every send.
+LEDGER_DIR = os.environ.get("LEDGER_DIR", os.path.join(BASE_DIR, ".ledger"))
+LEDGER_FSYNC_EVERY = int(os.environ.get("LEDGER_FSYNC_EVERY", "100"))
+# Minify whitespace and compact inline styles in outgoing HTML.
+OPTIMIZE_HTML = os.environ.get("OPTIMIZE_HTML", "1") != "0"
+# Where per-stage timing histograms are written after each run. Empty disables.
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+
 # !!! CHANGE THIS TO TODAY'S DATE (YYYY, MM, DD) !!!
 COURSE_START_DATE = datetime(2026, 2, 24)
 
+# =====================================================
+# CURRICULUM LOADER
+# =====================================================
+class LessonSequence:
+    # Read-only, list-like view over lessons stored outside this module.
+    # Subclasses provide _count() and _raw(index), the lesson's stored JSON
+    # bytes; lookups go through a small LRU so repeated access to the same
+    # day costs nothing.
+    def __init__(self, cache_size=8):
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._hashes = {}
+        self._signature = None
+        self._known = None
+
+    def __len__(self):
+        return self._count()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("lesson index out of range")
+        if index in self._cache:
+            self._cache.move_to_end(index)
+            return self._cache[index]
+        lesson = self._parse(index)
+        self._cache[index] = lesson
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return lesson
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def _parse(self, index):
+        return json.loads(self._raw(index))
+
+    def content_hash(self, index):
+        # sha256 of the lesson as stored; computed once per load.
+        if index < 0:
+            index += len(self)
+        digest = self._hashes.get(index)
+        if digest is None:
+            digest = self._hashes[index] = hashlib.sha256(self._raw(index)).hexdigest()
+        return digest
+
+    def reload(self):
+        self._cache.clear()
+        self._hashes.clear()
+
+    def _stat(self):
+        st = os.stat(self.path)
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def refresh(self):
+        # Reloads if the file changed on disk since the last call and returns
+        # the indexes whose content differs (added and removed days included).
+        # The first call only records the baseline.
+        signature = self._stat()
+        if signature == self._signature:
+            return []
+        first = self._signature is None
+        if not first:
+            self.reload()
+        self._signature = signature
+        before, self._known = self._known, [self.content_hash(i) for i in range(len(self))]
+        if first:
+            return []
+        return [i for i in range(max(len(before), len(self._known)))
+                if i >= len(before) or i >= len(self._known) or before[i] != self._known[i]]
+
+
+class LazyCurriculum(LessonSequence):
+    # Read-only sequence over a lesson bundle: one JSON lesson per line, plus
+    # a sidecar .idx file holding the byte offset of every line. Indexing
+    # reads and parses just that one line, so import cost and memory do not
+    # grow with the number of lessons.
+    INDEX_MAGIC = b"JSLIDX01"
+    INDEX_HEADER = struct.Struct("<8sQQ")  # magic, bundle size, lesson count
+
+    def __init__(self, path, use_mmap=False, cache_size=8):
+        super().__init__(cache_size)
+        self.path = path
+        self.index_path = os.path.splitext(path)[0] + ".idx"
+        self.use_mmap = use_mmap
+        self._offsets = None
+        self._map = None
+
+    def _load_index(self):
+        size = os.path.getsize(self.path)
+        try:
+            with open(self.index_path, "rb") as f:
+                magic, indexed_size, count = self.INDEX_HEADER.unpack(f.read(self.INDEX_HEADER.size))
+                raw = f.read()
+            if magic == self.INDEX_MAGIC and indexed_size == size and len(raw) == (count + 1) * 8:
+                return list(struct.unpack(f"<{count + 1}Q", raw))
+        except (OSError, struct.error):
+            pass
+        return self.build_index()
+
+    def build_index(self):
+        with open(self.path, "rb") as f:
+            data = f.read()
+        offsets, position = [], 0
+        for line in data.splitlines(keepends=True):
+            if line.strip():  # blank lines (e.g. a trailing newline) are not lessons
+                offsets.append(position)
+            position += len(line)
+        offsets.append(len(data))
+        count = len(offsets) - 1
+        try:
+            tmp = f"{self.index_path}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(self.INDEX_HEADER.pack(self.INDEX_MAGIC, len(data), count))
+                f.write(struct.pack(f"<{count + 1}Q", *offsets))
+            os.replace(tmp, self.index_path)
+        except OSError:
+            pass  # read-only checkout: keep the index in memory only
+        return offsets
+
+    @property
+    def offsets(self):
+        if self._offsets is None:
+            self._offsets = self._load_index()
+        return self._offsets
+
+    def _read(self, start, end):
+        if self.use_mmap:
+            if self._map is None:
+                with open(self.path, "rb") as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._map[start:end]
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            return f.read(end - start)
+
+    def _raw(self, index):
+        start, end = self.offsets[index], self.offsets[index + 1]
+        raw = self._read(start, end)
+        # Same-size edits that move line boundaries leave the size check
+        # happy, so make sure we landed exactly on one line.
+        if (start and self._read(start - 1, start) != b"\n") or not raw.rstrip().endswith(b"}"):
+            self.reload()
+            start, end = self.offsets[index], self.offsets[index + 1]
+            raw = self._read(start, end)
+        return raw.rstrip()
+
+    def reload(self):
+        super().reload()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._offsets = self.build_index()
+
+    def _count(self):
+        return len(self.offsets) - 1
+
+
+class ArchiveCurriculum(LessonSequence):
+    # Packed course archive (.jsla). Every lesson is deflated on its own
+    # against a shared preset dictionary, and a footer index maps day ->
+    # (offset, length), so reading one day never inflates any other.
+    #
+    #   header  "JSLA" version:u8 pad:3 dict_len:u32, then the dictionary
+    #   records zlib streams, one per lesson
+    #   index   per lesson: offset:u64 packed_len:u32 raw_len:u32 crc32:u32
+    #   trailer index_offset:u64 count:u32 "JSLA"
+    MAGIC = b"JSLA"
+    VERSION = 1
+    HEADER = struct.Struct("<4sB3xI")
+    ENTRY = struct.Struct("<QIII")
+    TRAILER = struct.Struct("<QI4s")
+
+    def __init__(self, path, use_mmap=False, cache_size=8):
+        super().__init__(cache_size)
+        self.path = path
+        self.use_mmap = use_mmap
+        self._entries = None
+        self._zdict = b""
+        self._map = None
+
+    def _read(self, start, length):
+        if self.use_mmap:
+            if self._map is None:
+                with open(self.path, "rb") as f:
+                    self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return self._map[start:start + length]
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            return f.read(length)
+
+    def _load_index(self):
+        with open(self.path, "rb") as f:
+            magic, version, dict_len = self.HEADER.unpack(f.read(self.HEADER.size))
+            if magic != self.MAGIC or version != self.VERSION:
+                raise ValueError(f"{self.path}: not a version {self.VERSION} lesson archive")
+            self._zdict = f.read(dict_len)
+            f.seek(-self.TRAILER.size, os.SEEK_END)
+            index_offset, count, magic = self.TRAILER.unpack(f.read(self.TRAILER.size))
+            if magic != self.MAGIC:
+                raise ValueError(f"{self.path}: truncated lesson archive")
+            f.seek(index_offset)
+            raw = f.read(count * self.ENTRY.size)
+        return [self.ENTRY.unpack_from(raw, i * self.ENTRY.size) for i in range(count)]
+
+    @property
+    def entries(self):
+        if self._entries is None:
+            self._entries = self._load_index()
+        return self._entries
+
+    def _count(self):
+        return len(self.entries)
+
+    def _raw(self, index):
+        offset, packed_len, raw_len, crc = self.entries[index]
+        inflater = zlib.decompressobj(zdict=self._zdict) if self._zdict else zlib.decompressobj()
+        raw = inflater.decompress(self._read(offset, packed_len))
+        if len(raw) != raw_len or zlib.crc32(raw) != crc:
+            raise ValueError(f"{self.path}: lesson {index + 1} is corrupt")
+        return raw
+
+    def reload(self):
+        super().reload()
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._entries = None
+
+    @staticmethod
+    def build_dictionary(payloads, limit=2048):
+        # Preset dictionary of markup and words shared by many lessons (tags
+        # with their inline styles, "function", "console", ...). Ranked by
+        # how many lessons use a string times its length; the best strings go
+        # last, where zlib can reach them with the shortest distances.
+        lessons_using = {}
+        for payload in payloads:
+            for token in set(re.findall(rb"<[^<>]+>|[A-Za-z_]{4,}", payload)):
+                lessons_using[token] = lessons_using.get(token, 0) + 1
+        ranked = sorted((t for t, n in lessons_using.items() if n > 1),
+                        key=lambda t: lessons_using[t] * len(t), reverse=True)
+        picked, size = [], 0
+        for token in ranked:
+            if size + len(token) > limit:
+                break
+            picked.append(token)
+            size += len(token)
+        return b"".join(reversed(picked))
+
+    @classmethod
+    def write(cls, lessons, path, use_dictionary=True):
+        payloads = [json.dumps(lesson, ensure_ascii=False).encode("utf-8") for lesson in lessons]
+        zdict = cls.build_dictionary(payloads) if use_dictionary else b""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(cls.HEADER.pack(cls.MAGIC, cls.VERSION, len(zdict)))
+            f.write(zdict)
+            entries = []
+            for payload in payloads:
+                deflater = zlib.compressobj(9, zdict=zdict) if zdict else zlib.compressobj(9)
+                packed = deflater.compress(payload) + deflater.flush()
+                entries.append((f.tell(), len(packed), len(payload), zlib.crc32(payload)))
+                f.write(packed)
+            index_offset = f.tell()
+            for entry in entries:
+                f.write(cls.ENTRY.pack(*entry))
+            f.write(cls.TRAILER.pack(index_offset, len(entries), cls.MAGIC))
+        os.replace(tmp, path)
+
+
+def load_curriculum(path, use_mmap=False):
+    if path.endswith(".jsla"):
+        return ArchiveCurriculum(path, use_mmap=use_mmap)
+    return LazyCurriculum(path, use_mmap=use_mmap)
+
+
+def pack_curriculum(lessons, path, use_dictionary=True, lookups=2000):
+    lessons = list(lessons)
+    ArchiveCurriculum.write(lessons, path, use_dictionary=use_dictionary)
+
+    raw_size = sum(len(json.dumps(lesson, ensure_ascii=False).encode("utf-8")) + 1 for lesson in lessons)
+    packed_size = os.path.getsize(path)
+    print(f"📦 Packed {len(lessons)} lessons into {path}")
+    print(f"   {raw_size:,} → {packed_size:,} bytes ({raw_size / packed_size:.1f}x)")
+
+    # Lookups bypass the LRU so every one pays the seek + inflate + parse.
+    archive = ArchiveCurriculum(path, cache_size=0)
+    len(archive)
+    timings = []
+    for n in range(lookups):
+        index = (n * 7919) % len(lessons)
+        start = time.perf_counter()
+        lesson = archive[index]
+        timings.append(time.perf_counter() - start)
+        if lesson != lessons[index]:
+            raise ValueError(f"{path}: lesson {index + 1} did not round-trip")
+    timings.sort()
+    p50 = timings[len(timings) // 2] * 1e6
+    p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))] * 1e6
+    print(f"   lookup latency: p50 {p50:.0f} µs, p99 {p99:.0f} µs over {lookups} random reads")
+
+
 # =====================================================
 # THE COMPLETE 30-DAY ADVANCED JAVASCRIPT CURRICULUM
 # =====================================================
-CURRICULUM = [
-
-    # ===================================================
-    # PHASE 1: ENGINE INTERNALS (Day 1-5)
-    # ===================================================
-    {
-        "day": 1,
-        "phase": "Phase 1: Engine Internals",
-        "title": "How the V8 Engine Works",
-        "content": """
-        <h3>JavaScript is NOT interpreted — it's JIT compiled</h3>
-        <p>Most people think JavaScript is an interpreted language. That was true in the 90s. Modern engines like Google's <strong>V8</strong> (used in Chrome & Node.js) use <strong>Just-In-Time (JIT) Compilation</strong> — a hybrid approach.</p>
-
-        <h4>The Pipeline: Source Code → Machine Code</h4>
-        <ol>
-            <li><strong>Parser:</strong> Reads your source code and converts it into an <strong>Abstract Syntax Tree (AST)</strong>. 
-                The AST is a tree representation of your code. You can visualize any JS code's AST at <code>astexplorer.net</code>.</li>
-            <li><strong>Ignition (Interpreter):</strong> Takes the AST and generates <strong>Bytecode</strong>. 
-                Bytecode is a lower-level representation that can run immediately. This gives you <em>fast startup</em>.</li>
-            <li><strong>TurboFan (Optimizing Compiler):</strong> While the code is running, V8 monitors which functions 
-                are called frequently ("hot" functions). It sends these to TurboFan, which compiles them into highly 
-                optimized <strong>machine code</strong>. This gives you <em>fast execution</em>.</li>
-            <li><strong>Deoptimization:</strong> If TurboFan made assumptions that turn out to be wrong 
-                (e.g., a variable changed type), it throws away the optimized code and falls back to Bytecode. 
-                This is called <em>deoptimization</em> or "bailing out."</li>
-        </ol>
-
-        <h4>Why this matters to you as a developer</h4>
-        <p>If you write code where a variable keeps changing types (number → string → object), 
-        V8 cannot optimize it. It keeps deoptimizing. This is why <strong>consistent types</strong> lead to faster code.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// BAD: V8 cannot optimize this function</span>
-<span style="color:#569cd6;">function</span> add(a, b) { <span style="color:#569cd6;">return</span> a + b; }
-add(1, 2);        <span style="color:#6a9955;">// V8 assumes: integers</span>
-add("hello", " ") <span style="color:#6a9955;">// DEOPTIMIZED! Now it's strings</span>
-add([], {})       <span style="color:#6a9955;">// DEOPTIMIZED AGAIN!</span>
-
-<span style="color:#6a9955;">// GOOD: Consistent types</span>
-<span style="color:#569cd6;">function</span> addNums(a, b) { <span style="color:#569cd6;">return</span> a + b; }
-addNums(1, 2);
-addNums(3, 4);
-addNums(5, 6);    <span style="color:#6a9955;">// V8 optimizes: always integers ✅</span>
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>What is the difference between an Interpreter and a Compiler? Why does V8 use both?</li>
-            <li>What is an Abstract Syntax Tree (AST), and at what stage is it created?</li>
-            <li>Why does frequently changing a variable's type slow down JavaScript execution?</li>
-        </ol>
-        """
-    },
-    {
-        "day": 2,
-        "phase": "Phase 1: Engine Internals",
-        "title": "Execution Context & Call Stack",
-        "content": """
-        <h3>Every line of JavaScript runs inside an Execution Context</h3>
-        <p>When the JS engine runs your code, it creates an environment called an <strong>Execution Context</strong>. 
-        Think of it as a box that contains: the code being executed, the variables, and the value of <code>this</code>.</p>
-
-        <h4>Three Types of Execution Contexts</h4>
-        <ul>
-            <li><strong>Global Execution Context (GEC):</strong> Created when the file first loads. Only ONE exists. 
-                It creates the <code>window</code> object (browser) or <code>global</code> (Node.js) and sets <code>this</code> to it.</li>
-            <li><strong>Function Execution Context (FEC):</strong> Created every time a function is <em>called</em>. 
-                Each function call gets its own FEC.</li>
-            <li><strong>Eval Execution Context:</strong> Created inside <code>eval()</code>. Rarely used. Avoid it.</li>
-        </ul>
-
-        <h4>Two Phases of Every Execution Context</h4>
-        <table border="1" cellpadding="8" style="border-collapse: collapse; width:100%;">
-            <tr style="background:#eee;"><th>Creation Phase</th><th>Execution Phase</th></tr>
-            <tr>
-                <td>
-                    1. Create the Variable Object (VO)<br>
-                    2. Functions stored entirely in memory<br>
-                    3. Variables set to <code>undefined</code> (hoisting)<br>
-                    4. <code>this</code> is determined<br>
-                    5. Scope chain is created
-                </td>
-                <td>
-                    1. Code is executed line by line<br>
-                    2. Variables are assigned actual values<br>
-                    3. Functions are called (new FEC is pushed)
-                </td>
-            </tr>
-        </table>
-
-        <h4>The Call Stack</h4>
-        <p>The Call Stack is a <strong>LIFO (Last In, First Out)</strong> data structure. When a function is called, 
-        its Execution Context is pushed onto the stack. When it returns, it is popped off.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> third()  { <span style="color:#569cd6;">return</span> "done"; }
-<span style="color:#569cd6;">function</span> second() { <span style="color:#569cd6;">return</span> third(); }
-<span style="color:#569cd6;">function</span> first()  { <span style="color:#569cd6;">return</span> second(); }
-first();
-
-<span style="color:#6a9955;">// Call Stack (bottom to top):
-// | third()  |  ← currently running
-// | second() |
-// | first()  |
-// | Global   |  ← always at the bottom</span>
-        </pre>
-
-        <h4>Stack Overflow</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> recurse() { recurse(); }
-recurse(); <span style="color:#6a9955;">// RangeError: Maximum call stack size exceeded</span>
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>During the Creation Phase, what value does a <code>var</code> variable hold?</li>
-            <li>How many Global Execution Contexts can exist in a single JS program?</li>
-            <li>Draw the call stack for this code: <code>function a() { b(); } function b() { c(); } function c() {} a();</code></li>
-        </ol>
-        """
-    },
-    {
-        "day": 3,
-        "phase": "Phase 1: Engine Internals",
-        "title": "Memory: Stack vs Heap",
-        "content": """
-        <h3>Where does your data actually live?</h3>
-        <p>JavaScript uses two memory structures: the <strong>Stack</strong> and the <strong>Heap</strong>. 
-        Understanding this prevents one of the most common bugs: accidentally mutating shared objects.</p>
-
-        <h4>The Stack (Primitive Values)</h4>
-        <p>Primitive types: <code>Number</code>, <code>String</code>, <code>Boolean</code>, <code>null</code>, 
-        <code>undefined</code>, <code>Symbol</code>, <code>BigInt</code>.</p>
-        <p>These are stored <strong>directly in the Stack</strong>. They are copied <strong>by value</strong>.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">let</span> a = 10;
-<span style="color:#569cd6;">let</span> b = a;    <span style="color:#6a9955;">// A COPY is made</span>
-b = 20;
-console.log(a); <span style="color:#6a9955;">// 10 — unchanged. They are independent.</span>
-        </pre>
-
-        <h4>The Heap (Reference Values)</h4>
-        <p>Objects, Arrays, Functions, Dates — anything complex is stored in the <strong>Heap</strong>. 
-        The Stack only holds a <strong>pointer (memory address)</strong> to the location in the Heap.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">let</span> obj1 = { name: "Alice" };
-<span style="color:#569cd6;">let</span> obj2 = obj1; <span style="color:#6a9955;">// Copies the POINTER, not the object!</span>
-
-obj2.name = "Bob";
-console.log(obj1.name); <span style="color:#6a9955;">// "Bob" — BOTH changed!</span>
-
-<span style="color:#6a9955;">// STACK:                    HEAP:
-// obj1 → 0x001  ────────→  { name: "Bob" }
-// obj2 → 0x001  ────────↗</span>
-        </pre>
-
-        <h4>How to Create True Copies</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// Shallow Copy (1 level deep only)</span>
-<span style="color:#569cd6;">const</span> copy1 = { ...original };
-<span style="color:#569cd6;">const</span> copy2 = Object.assign({}, original);
-
-<span style="color:#6a9955;">// Deep Copy (all nested levels)</span>
-<span style="color:#569cd6;">const</span> deepCopy = structuredClone(original); <span style="color:#6a9955;">// Modern</span>
-<span style="color:#569cd6;">const</span> deepCopy2 = JSON.parse(JSON.stringify(original)); <span style="color:#6a9955;">// Old way (loses functions!)</span>
-        </pre>
-
-        <h4>Why <code>[] === []</code> is <code>false</code></h4>
-        <p>Each <code>[]</code> creates a NEW object at a DIFFERENT address in the Heap. 
-        <code>===</code> compares the memory addresses, not the contents. Two different addresses = not equal.</p>
-        """,
-        "quiz": """
-        <ol>
-            <li>If you pass an object to a function and modify it inside, does the original change? Why?</li>
-            <li>What is the difference between a shallow copy and a deep copy? When does it matter?</li>
-            <li>Why does <code>JSON.parse(JSON.stringify(obj))</code> fail for objects containing functions or <code>Date</code>?</li>
-        </ol>
-        """
-    },
-    {
-        "day": 4,
-        "phase": "Phase 1: Engine Internals",
-        "title": "Garbage Collection: Mark & Sweep",
-        "content": """
-        <h3>How JavaScript automatically frees memory</h3>
-        <p>Unlike C/C++, you don't manually allocate or free memory. JavaScript uses <strong>automatic garbage collection</strong>. 
-        The most common algorithm is <strong>Mark-and-Sweep</strong>.</p>
-
-        <h4>The Algorithm</h4>
-        <ol>
-            <li><strong>Mark Phase:</strong> The GC starts from "roots" (global object, currently executing functions). 
-                It traverses all references from these roots and <em>marks</em> every object it can reach as "alive."</li>
-            <li><strong>Sweep Phase:</strong> It scans the entire Heap. Any object that was NOT marked is considered 
-                unreachable and is <em>deleted</em> (memory freed).</li>
-        </ol>
-
-        <h4>What is "Reachable"?</h4>
-        <p>A value is reachable if it can be accessed through any chain of references starting from a root.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">let</span> user = { name: "John" };  <span style="color:#6a9955;">// Object is reachable via 'user'</span>
-user = <span style="color:#569cd6;">null</span>;                    <span style="color:#6a9955;">// Reference removed. Object is now UNREACHABLE.</span>
-                                    <span style="color:#6a9955;">// GC will collect it. ✅</span>
-        </pre>
-
-        <h4>Circular References</h4>
-        <p>Old engines used "Reference Counting" which broke on circular references. Mark-and-Sweep handles this correctly.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> createCycle() {
-    <span style="color:#569cd6;">let</span> a = {};
-    <span style="color:#569cd6;">let</span> b = {};
-    a.ref = b;
-    b.ref = a;
-    <span style="color:#6a9955;">// Both reference each other (cycle).</span>
-}
-createCycle();
-<span style="color:#6a9955;">// After function ends, neither 'a' nor 'b' is reachable from root.</span>
-<span style="color:#6a9955;">// Mark-and-Sweep correctly collects BOTH. ✅</span>
-        </pre>
-
-        <h4>V8's Generational Garbage Collection</h4>
-        <p>V8 splits the Heap into two areas:</p>
-        <ul>
-            <li><strong>Young Generation (Nursery):</strong> Newly created objects live here. GC runs here very frequently (Scavenger). 
-                Most objects die young (temporary variables).</li>
-            <li><strong>Old Generation:</strong> Objects that survive multiple GC cycles are "promoted" here. 
-                GC runs here less frequently (Mark-Sweep-Compact).</li>
-        </ul>
-        """,
-        "quiz": """
-        <ol>
-            <li>Why was "Reference Counting" replaced by "Mark-and-Sweep" in modern engines?</li>
-            <li>What does it mean for an object to be "reachable"?</li>
-            <li>Why does V8 split the Heap into "Young" and "Old" generations?</li>
-        </ol>
-        """
-    },
-    {
-        "day": 5,
-        "phase": "Phase 1: Engine Internals",
-        "title": "Memory Leaks & How to Prevent Them",
-        "content": """
-        <h3>When garbage collection fails to clean up</h3>
-        <p>A memory leak happens when your code unintentionally keeps a reference to an object, 
-        preventing the GC from collecting it. The memory usage keeps growing over time.</p>
-
-        <h4>Common Memory Leak Patterns</h4>
-
-        <p><strong>1. Accidental Global Variables</strong></p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> leaky() {
-    mistake = "I am global now!"; <span style="color:#6a9955;">// No var/let/const = global variable!</span>
-}
-<span style="color:#6a9955;">// Fix: Always use 'use strict' or let/const.</span>
-        </pre>
-
-        <p><strong>2. Forgotten Timers</strong></p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> data = fetchHugeData();
-<span style="color:#569cd6;">const</span> timer = setInterval(() => {
-    process(data); <span style="color:#6a9955;">// 'data' can NEVER be collected while timer runs</span>
-}, 1000);
-<span style="color:#6a9955;">// Fix: clearInterval(timer) when done.</span>
-        </pre>
-
-        <p><strong>3. Detached DOM Elements</strong></p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> button = document.getElementById('btn');
-document.body.removeChild(button);
-<span style="color:#6a9955;">// The DOM element is removed from the page,
-// but 'button' variable STILL references it in memory!
-// Fix: button = null;</span>
-        </pre>
-
-        <p><strong>4. Closures Holding Large Data</strong></p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> outer() {
-    <span style="color:#569cd6;">const</span> hugeArray = <span style="color:#569cd6;">new</span> Array(1000000).fill("data");
-    <span style="color:#569cd6;">return</span> <span style="color:#569cd6;">function</span> inner() {
-        console.log(hugeArray.length); <span style="color:#6a9955;">// Closure keeps hugeArray alive!</span>
-    }
-}
-<span style="color:#569cd6;">const</span> leak = outer();
-<span style="color:#6a9955;">// hugeArray is stuck in memory as long as 'leak' exists.
-// Fix: Only capture what you need, not the entire array.</span>
-        </pre>
-
-        <p><strong>5. Event Listeners Not Removed</strong></p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> setup() {
-    <span style="color:#569cd6;">const</span> el = document.getElementById('btn');
-    el.addEventListener('click', <span style="color:#569cd6;">function</span> handler() { <span style="color:#6a9955;">/* ... */</span> });
-    <span style="color:#6a9955;">// If 'el' is removed from DOM but handler is not removed,</span>
-    <span style="color:#6a9955;">// both the handler AND any variables it closes over stay in memory.</span>
-}
-<span style="color:#6a9955;">// Fix: el.removeEventListener('click', handler);</span>
-        </pre>
-
-        <h4>How to Detect Memory Leaks</h4>
-        <p>Chrome DevTools → Performance Tab → Record → Look for increasing memory. 
-        Or use the Memory Tab → Take Heap Snapshots → Compare them.</p>
-        """,
-        "quiz": """
-        <ol>
-            <li>Name 3 common causes of memory leaks in a Single Page Application (SPA).</li>
-            <li>How does <code>'use strict'</code> help prevent accidental global variables?</li>
-            <li>How would you use Chrome DevTools to confirm a memory leak?</li>
-        </ol>
-        """
-    },
-
-    # ===================================================
-    # PHASE 2: SCOPE & CLOSURES (Day 6-10)
-    # ===================================================
-    {
-        "day": 6,
-        "phase": "Phase 2: Scope & Closures",
-        "title": "Scope Chain & Lexical Environment",
-        "content": """
-        <h3>JavaScript uses Lexical (Static) Scoping</h3>
-        <p><strong>Lexical Scope</strong> means scope is determined by WHERE the code is physically written, 
-        not where or how it is called.</p>
-
-        <h4>Every Execution Context Has</h4>
-        <ul>
-            <li>A <strong>Variable Environment</strong> — where its local variables live.</li>
-            <li>A reference to its <strong>Outer Environment</strong> — the environment of the parent scope 
-                (where the function was <em>defined</em>).</li>
-        </ul>
-
-        <h4>The Scope Chain</h4>
-        <p>When JS needs a variable, it first looks in the current scope. If not found, it follows the chain 
-        to the outer scope, then the outer-outer scope, all the way to the Global scope. If still not found: <code>ReferenceError</code>.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> global = "I'm global";
-
-<span style="color:#569cd6;">function</span> outer() {
-    <span style="color:#569cd6;">const</span> outerVar = "I'm outer";
-    
-    <span style="color:#569cd6;">function</span> inner() {
-        <span style="color:#569cd6;">const</span> innerVar = "I'm inner";
-        console.log(innerVar);  <span style="color:#6a9955;">// ✅ Found locally</span>
-        console.log(outerVar);  <span style="color:#6a9955;">// ✅ Found in outer scope</span>
-        console.log(global);    <span style="color:#6a9955;">// ✅ Found in global scope</span>
-    }
-    inner();
-}
-outer();
-        </pre>
+# Lessons live in curriculum/js_deep_dive.jsonl, one lesson per line, in day
+# order. Point COURSE_BUNDLE at another bundle, or at a packed .jsla archive
+# (see `daily_js.py pack`), to run a different course.
+CURRICULUM = load_curriculum(COURSE_BUNDLE, use_mmap=CURRICULUM_MMAP)
 
-        <h4>Tricky Example: Lexical vs Dynamic</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> b() {
-    console.log(myVar); <span style="color:#6a9955;">// Where does it look?</span>
-}
-<span style="color:#569cd6;">function</span> a() {
-    <span style="color:#569cd6;">var</span> myVar = 2;
-    b(); <span style="color:#6a9955;">// Called INSIDE 'a', but...</span>
-}
-<span style="color:#569cd6;">var</span> myVar = 1;
-a();
-
-<span style="color:#6a9955;">// Output: 1 (NOT 2!)
-// Because 'b' is DEFINED in the global scope.
-// Its outer environment is Global, not 'a'.
-// Lexical scope = where WRITTEN, not where CALLED.</span>
-        </pre>
-
-        <h4>Block Scope vs Function Scope</h4>
-        <p><code>var</code> is function-scoped. <code>let</code> and <code>const</code> are block-scoped 
-        (they respect <code>{}</code> blocks like <code>if</code>, <code>for</code>).</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">if</span> (<span style="color:#569cd6;">true</span>) {
-    <span style="color:#569cd6;">var</span> x = 10;    <span style="color:#6a9955;">// Leaks out of the block!</span>
-    <span style="color:#569cd6;">let</span> y = 20;    <span style="color:#6a9955;">// Stays inside the block</span>
-}
-console.log(x); <span style="color:#6a9955;">// 10</span>
-console.log(y); <span style="color:#6a9955;">// ReferenceError</span>
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>What is the difference between Lexical Scope and Dynamic Scope?</li>
-            <li>In the tricky example above, why does <code>b()</code> log <code>1</code> instead of <code>2</code>?</li>
-            <li>Why should you prefer <code>let/const</code> over <code>var</code> from a scoping perspective?</li>
-        </ol>
-        """
-    },
-    {
-        "day": 7,
-        "phase": "Phase 2: Scope & Closures",
-        "title": "Hoisting & Temporal Dead Zone",
-        "content": """
-        <h3>Hoisting is NOT moving code to the top</h3>
-        <p>It's a side effect of the <strong>Creation Phase</strong> of the Execution Context. 
-        Before any code runs, the engine scans for declarations and allocates memory for them.</p>
-
-        <h4>Function Declarations: Fully Hoisted</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-sayHi(); <span style="color:#6a9955;">// ✅ Works!</span>
-<span style="color:#569cd6;">function</span> sayHi() { console.log("hi"); }
-<span style="color:#6a9955;">// The ENTIRE function is stored in memory during Creation Phase.</span>
-        </pre>
-
-        <h4>Function Expressions: NOT Hoisted</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-sayHi(); <span style="color:#6a9955;">// ❌ TypeError: sayHi is not a function</span>
-<span style="color:#569cd6;">var</span> sayHi = <span style="color:#569cd6;">function</span>() { console.log("hi"); };
-<span style="color:#6a9955;">// 'sayHi' is hoisted as 'undefined' (it's a var).
-// You're trying to call undefined().</span>
-        </pre>
-
-        <h4><code>var</code> Hoisting</h4>
-        <p>The variable name is hoisted, but initialized as <code>undefined</code>.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-console.log(x); <span style="color:#6a9955;">// undefined (not ReferenceError!)</span>
-<span style="color:#569cd6;">var</span> x = 5;
-        </pre>
-
-        <h4><code>let/const</code> and the Temporal Dead Zone (TDZ)</h4>
-        <p><code>let</code> and <code>const</code> ARE hoisted — but they are NOT initialized. 
-        They sit in the <strong>Temporal Dead Zone</strong> from the start of the block until the declaration line.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// ┌── TDZ for 'x' starts here ──┐</span>
-console.log(x); <span style="color:#6a9955;">// ❌ ReferenceError    │</span>
-<span style="color:#569cd6;">let</span> x = 10;     <span style="color:#6a9955;">// ← TDZ ends here ───┘</span>
-console.log(x); <span style="color:#6a9955;">// 10 ✅</span>
-        </pre>
-
-        <h4>Class Hoisting</h4>
-        <p>Classes are also hoisted but are in the TDZ, similar to <code>let</code>.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> obj = <span style="color:#569cd6;">new</span> MyClass(); <span style="color:#6a9955;">// ❌ ReferenceError</span>
-<span style="color:#569cd6;">class</span> MyClass {}
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>Is <code>let</code> hoisted? If yes, why does accessing it before declaration throw an error?</li>
-            <li>What is the output? <code>var a = 1; function a() {} console.log(typeof a);</code></li>
-            <li>What is the Temporal Dead Zone, and which declarations are affected by it?</li>
-        </ol>
-        """
-    },
-    {
-        "day": 8,
-        "phase": "Phase 2: Scope & Closures",
-        "title": "IIFE & The Module Pattern",
-        "content": """
-        <h3>IIFE: Immediately Invoked Function Expressions</h3>
-        <p>An IIFE is a function that runs as soon as it is defined. It was the primary way to create private scope before ES6 modules.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-(<span style="color:#569cd6;">function</span>() {
-    <span style="color:#569cd6;">var</span> secret = "hidden";
-    console.log("I run immediately!");
-})();
-console.log(secret); <span style="color:#6a9955;">// ❌ ReferenceError — private!</span>
-        </pre>
-
-        <h4>Why wrap in parentheses?</h4>
-        <p>Without them, JS sees <code>function</code> as a <em>declaration</em> (which needs a name). 
-        The <code>()</code> wrapping tells the parser: "this is an <em>expression</em>, not a declaration."</p>
-
-        <h4>The Revealing Module Pattern</h4>
-        <p>Before ES6 <code>import/export</code>, this was THE way to create modules with public and private members:</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> Counter = (<span style="color:#569cd6;">function</span>() {
-    <span style="color:#6a9955;">// Private variable — cannot be accessed from outside</span>
-    <span style="color:#569cd6;">let</span> count = 0;
-    
-    <span style="color:#6a9955;">// Private function</span>
-    <span style="color:#569cd6;">function</span> log() { console.log(<span style="color:#ce9178;">`Count: </span><span style="color:#569cd6;">${count}</span><span style="color:#ce9178;">`</span>); }
-    
-    <span style="color:#6a9955;">// Public API — only these are exposed</span>
-    <span style="color:#569cd6;">return</span> {
-        increment: <span style="color:#569cd6;">function</span>() { count++; log(); },
-        decrement: <span style="color:#569cd6;">function</span>() { count--; log(); },
-        getCount:  <span style="color:#569cd6;">function</span>() { <span style="color:#569cd6;">return</span> count; }
-    };
-})();
-
-Counter.increment(); <span style="color:#6a9955;">// Count: 1</span>
-Counter.increment(); <span style="color:#6a9955;">// Count: 2</span>
-Counter.count;       <span style="color:#6a9955;">// undefined — it's private!</span>
-        </pre>
-
-        <h4>Modern Equivalent: ES Modules</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// counter.js</span>
-<span style="color:#569cd6;">let</span> count = 0; <span style="color:#6a9955;">// Private by default in a module</span>
-<span style="color:#569cd6;">export function</span> increment() { count++; }
-<span style="color:#569cd6;">export function</span> getCount() { <span style="color:#569cd6;">return</span> count; }
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>Why can't external code access variables inside an IIFE?</li>
-            <li>In the Module Pattern, what mechanism allows <code>increment()</code> to access <code>count</code> even after the IIFE has finished?</li>
-            <li>What advantages do ES Modules have over the IIFE Module Pattern?</li>
-        </ol>
-        """
-    },
-    {
-        "day": 9,
-        "phase": "Phase 2: Scope & Closures",
-        "title": "Closures Deep Dive",
-        "content": """
-        <h3>A closure is a function + its lexical environment</h3>
-        <p>When a function is returned from another function, it "remembers" the variables from its parent scope — 
-        even after the parent has finished executing. This bundled combination is a <strong>closure</strong>.</p>
-
-        <h4>The Core Mechanism</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> createCounter() {
-    <span style="color:#569cd6;">let</span> count = 0; <span style="color:#6a9955;">// This should be garbage collected... but it won't be.</span>
-    
-    <span style="color:#569cd6;">return</span> <span style="color:#569cd6;">function</span>() {
-        count++;
-        <span style="color:#569cd6;">return</span> count;
-    };
-}
 
-<span style="color:#569cd6;">const</span> counter = createCounter();
-console.log(counter()); <span style="color:#6a9955;">// 1</span>
-console.log(counter()); <span style="color:#6a9955;">// 2</span>
-console.log(counter()); <span style="color:#6a9955;">// 3</span>
-
-<span style="color:#6a9955;">// createCounter() has LONG finished executing.
-// But 'count' is still alive because the inner function holds a reference.
-// The GC sees this reference and keeps 'count' in the Heap.</span>
-        </pre>
-
-        <h4>The Classic Loop Problem</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// ❌ BUG: Prints "3" three times</span>
-<span style="color:#569cd6;">for</span> (<span style="color:#569cd6;">var</span> i = 0; i < 3; i++) {
-    setTimeout(<span style="color:#569cd6;">function</span>() {
-        console.log(i); <span style="color:#6a9955;">// All callbacks share the SAME 'i'</span>
-    }, 1000);
+# =====================================================
+# JS SYNTAX HIGHLIGHTING
+# =====================================================
+# Lessons carry plain code inside <pre> blocks; colouring is done here when a
+# lesson is rendered, with the same VS Code dark palette the lessons have
+# always used. Only inline styles are emitted, so it survives Gmail/Outlook.
+HIGHLIGHTER_VERSION = 2
+HIGHLIGHT_COLORS = {
+    "keyword": "#569cd6",
+    "comment": "#6a9955",
+    "string": "#ce9178",
 }
-<span style="color:#6a9955;">// By the time setTimeout fires, the loop is done and i === 3.</span>
 
-<span style="color:#6a9955;">// ✅ FIX 1: Use 'let' (creates a new binding per iteration)</span>
-<span style="color:#569cd6;">for</span> (<span style="color:#569cd6;">let</span> i = 0; i < 3; i++) {
-    setTimeout(() => console.log(i), 1000); <span style="color:#6a9955;">// 0, 1, 2</span>
-}
+JS_KEYWORDS = frozenset("""
+    async await break case catch class const continue debugger default delete do
+    else export extends false finally for from function get if import in
+    instanceof let new null of return set static super switch this throw true
+    try typeof undefined var void while with yield
+""".split())
+
+JS_TOKEN = re.compile(r"""
+    (?P<comment>//[^\n]*|/\*[\s\S]*?\*/)
+  | (?P<string>"(?:\\.|[^"\\\n])*"?|'(?:\\.|[^'\\\n])*'?)
+  | (?P<template>`)
+  | (?P<word>[A-Za-z_$][\w$]*\*?)
+  | (?P<number>\d[\w.]*)
+  | (?P<regex>/(?![*/])(?:\\.|\[(?:\\.|[^\]\\\n])*\]|[^/\\\n\[])+/[a-z]*)
+  | (?P<space>\s+)
+  | (?P<other>.)
+""", re.VERBOSE)
+
+# A "/" after one of these starts a regex literal rather than a division.
+_REGEX_PREFIX = frozenset("(,=:[!&|?{};+-*%<>~^") | {"return", "typeof", "case", ""}
+
+_highlight_cache = {}
+
+
+def _scan_template(code, pos):
+    # Returns (end, parts) for the template literal whose backtick is at pos;
+    # ${...} substitutions are coloured as keywords like in the old lessons.
+    parts, start, i = [], pos, pos + 1
+    while i < len(code):
+        ch = code[i]
+        if ch == "\\":
+            i += 2
+            continue
+        if ch == "`":
+            parts.append(("string", code[start:i + 1]))
+            return i + 1, parts
+        if code.startswith("${", i):
+            parts.append(("string", code[start:i]))
+            depth, j = 1, i + 2
+            while j < len(code) and depth:
+                depth += {"{": 1, "}": -1}.get(code[j], 0)
+                j += 1
+            parts.append(("keyword", code[i:j]))
+            start = i = j
+            continue
+        i += 1
+    parts.append(("string", code[start:]))
+    return len(code), parts
+
+
+def _js_tokens(code):
+    pos, previous = 0, ""
+    while pos < len(code):
+        if code[pos] == "`":
+            pos, parts = _scan_template(code, pos)
+            yield from parts
+            previous = "`"
+            continue
+        match = JS_TOKEN.match(code, pos)
+        kind, text = match.lastgroup, match.group()
+        if kind == "regex" and previous not in _REGEX_PREFIX:
+            kind, text = "other", "/"
+        pos += len(text)
+        if kind == "word":
+            # After "." it is a property name (m.get, promise.catch), not a keyword.
+            kind = "keyword" if previous != "." and text.rstrip("*") in JS_KEYWORDS else None
+        elif kind == "regex":
+            kind = "string"
+        elif kind not in HIGHLIGHT_COLORS:
+            kind = None
+        if match.lastgroup != "space" and match.lastgroup != "comment":
+            previous = text if match.lastgroup in ("word", "other") else ")"
+        yield kind, text
+
+
+def highlight_js(code):
+    key = hashlib.sha1(code.encode("utf-8")).hexdigest()
+    cached = _highlight_cache.get(key)
+    if cached is not None:
+        return cached
+
+    # Merge neighbouring tokens of one colour ("async function") into a
+    # single span; only plain spaces may sit between them.
+    runs = []
+    for kind, text in _js_tokens(code):
+        if runs and kind and runs[-1][0] == kind:
+            runs[-1][1] += text
+        elif (len(runs) > 1 and kind and runs[-2][0] == kind
+              and runs[-1][0] is None and runs[-1][1].strip(" ") == ""):
+            runs[-2][1] += runs.pop()[1] + text
+        else:
+            runs.append([kind, text])
+
+    out = []
+    for kind, text in runs:
+        text = text.replace("&", "&amp;").replace("<", "&lt;")
+        if kind:
+            out.append(f'<span style="color:{HIGHLIGHT_COLORS[kind]};">{text}</span>')
+        else:
+            out.append(text)
+    highlighted = _highlight_cache[key] = "".join(out)
+    return highlighted
+
+
+PRE_BLOCK = re.compile(r"(<pre\b[^>]*>)(.*?)(</pre>)", re.S | re.I)
+SPAN_TAG = re.compile(r"</?span\b[^>]*>", re.I)
+BOX_DRAWING_LINE = re.compile(r"^[ \t]*[\u2500-\u257f]", re.M)
+
+
+def highlight_code_blocks(markup):
+    # Older lessons still carry hand-written spans; drop them and re-colour
+    # so every block is consistent.
+    def replace(match):
+        code = html.unescape(SPAN_TAG.sub("", match.group(2)))
+        if BOX_DRAWING_LINE.search(code):
+            return match.group(0)  # an ASCII-art diagram, not code
+        return match.group(1) + highlight_js(code) + match.group(3)
+
+    return PRE_BLOCK.sub(replace, markup)
+
+
+def benchmark_highlighter(lessons, rounds=20):
+    snippets = [m.group(2) for lesson in lessons for m in PRE_BLOCK.finditer(lesson["content"])]
+    snippets = [html.unescape(SPAN_TAG.sub("", s)) for s in snippets]
+    if not snippets:
+        print("No code blocks found.")
+        return
 
-<span style="color:#6a9955;">// ✅ FIX 2: Use a closure (IIFE captures current value)</span>
-<span style="color:#569cd6;">for</span> (<span style="color:#569cd6;">var</span> i = 0; i < 3; i++) {
-    (<span style="color:#569cd6;">function</span>(j) {
-        setTimeout(() => console.log(j), 1000);
-    })(i); <span style="color:#6a9955;">// Pass 'i' as argument 'j' — creates a new scope</span>
-}
-        </pre>
-
-        <h4>Closures in DevTools</h4>
-        <p>You can see closures in Chrome DevTools: Set a breakpoint inside a nested function → 
-        Look at the <strong>Scope</strong> panel → You'll see a section labeled <code>Closure</code> listing the captured variables.</p>
-        """,
-        "quiz": """
-        <ol>
-            <li>Why does using <code>let</code> in a for-loop fix the closure problem, but <code>var</code> does not?</li>
-            <li>Are closures stored on the Stack or the Heap? Why?</li>
-            <li>Write a function <code>multiplier(x)</code> that returns another function which multiplies its argument by <code>x</code>. Use a closure.</li>
-        </ol>
-        """
-    },
-    {
-        "day": 10,
-        "phase": "Phase 2: Scope & Closures",
-        "title": "Closure Use Cases: Memoization & Data Privacy",
-        "content": """
-        <h3>Practical uses of closures in real code</h3>
-
-        <h4>1. Memoization (Caching expensive computations)</h4>
-        <p>A memoized function stores the results of previous calls. If called again with the same arguments, 
-        it returns the cached result instantly instead of recalculating.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> memoize(fn) {
-    <span style="color:#569cd6;">const</span> cache = {}; <span style="color:#6a9955;">// Closure keeps this alive</span>
-    
-    <span style="color:#569cd6;">return</span> <span style="color:#569cd6;">function</span>(...args) {
-        <span style="color:#569cd6;">const</span> key = JSON.stringify(args);
-        
-        <span style="color:#569cd6;">if</span> (cache[key] !== <span style="color:#569cd6;">undefined</span>) {
-            console.log("From cache!");
-            <span style="color:#569cd6;">return</span> cache[key];
-        }
-        
-        <span style="color:#569cd6;">const</span> result = fn(...args);
-        cache[key] = result;
-        <span style="color:#569cd6;">return</span> result;
-    };
-}
+    start = time.perf_counter()
+    for _ in range(rounds):
+        _highlight_cache.clear()
+        for snippet in snippets:
+            highlight_js(snippet)
+    cold = len(snippets) * rounds / (time.perf_counter() - start)
 
-<span style="color:#569cd6;">const</span> expensiveAdd = memoize((a, b) => {
-    console.log("Calculating...");
-    <span style="color:#569cd6;">return</span> a + b;
-});
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for snippet in snippets:
+            highlight_js(snippet)
+    warm = len(snippets) * rounds / (time.perf_counter() - start)
 
-expensiveAdd(1, 2); <span style="color:#6a9955;">// "Calculating..." → 3</span>
-expensiveAdd(1, 2); <span style="color:#6a9955;">// "From cache!" → 3 (instant!)</span>
-        </pre>
-
-        <h4>2. Data Privacy (Private Variables)</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> createBankAccount(initialBalance) {
-    <span style="color:#569cd6;">let</span> balance = initialBalance; <span style="color:#6a9955;">// Private! Cannot be accessed directly.</span>
-    
-    <span style="color:#569cd6;">return</span> {
-        deposit(amount) {
-            <span style="color:#569cd6;">if</span> (amount > 0) balance += amount;
-            <span style="color:#569cd6;">return</span> balance;
-        },
-        withdraw(amount) {
-            <span style="color:#569cd6;">if</span> (amount > 0 && amount <= balance) balance -= amount;
-            <span style="color:#569cd6;">return</span> balance;
-        },
-        getBalance() { <span style="color:#569cd6;">return</span> balance; }
-    };
-}
+    size = sum(len(s) for s in snippets)
+    print(f"🎨 {len(snippets)} snippets ({len(set(snippets))} unique, {size:,} chars) × {rounds} rounds")
+    print(f"   cold: {cold:,.0f} snippets/s ({cold * size / len(snippets) / 1e6:.2f} MB/s)")
+    print(f"   memoized: {warm:,.0f} snippets/s")
 
-<span style="color:#569cd6;">const</span> account = createBankAccount(100);
-account.deposit(50);     <span style="color:#6a9955;">// 150</span>
-account.withdraw(30);    <span style="color:#6a9955;">// 120</span>
-account.balance;         <span style="color:#6a9955;">// undefined — can't access directly!</span>
-account.getBalance();    <span style="color:#6a9955;">// 120</span>
-        </pre>
-
-        <h4>3. Function Factories</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> createGreeter(greeting) {
-    <span style="color:#569cd6;">return</span> <span style="color:#569cd6;">function</span>(name) {
-        <span style="color:#569cd6;">return</span> <span style="color:#ce9178;">`</span><span style="color:#569cd6;">${greeting}</span><span style="color:#ce9178;">, </span><span style="color:#569cd6;">${name}</span><span style="color:#ce9178;">!`</span>;
-    };
-}
-<span style="color:#569cd6;">const</span> sayHello = createGreeter("Hello");
-<span style="color:#569cd6;">const</span> sayHola  = createGreeter("Hola");
-sayHello("Alice"); <span style="color:#6a9955;">// "Hello, Alice!"</span>
-sayHola("Bob");    <span style="color:#6a9955;">// "Hola, Bob!"</span>
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>In the memoize function, what would happen if <code>cache</code> was declared outside of <code>memoize</code> as a global? What problem could that cause?</li>
-            <li>Why is the <code>balance</code> variable in the bank account example truly private? Can you think of any way to hack into it?</li>
-            <li>Implement a <code>once(fn)</code> function using closures that only allows <code>fn</code> to be called one time. Subsequent calls should return the first result.</li>
-        </ol>
-        """
-    },
-
-    # ===================================================
-    # PHASE 3: THIS & OBJECTS (Day 11-15)
-    # ===================================================
-    {
-        "day": 11,
-        "phase": "Phase 3: this & Objects",
-        "title": "The 'this' Keyword — 4 Rules",
-        "content": """
-        <h3><code>this</code> is determined by HOW a function is called, not where it's defined</h3>
-        <p>Unlike most concepts in JS (which are lexical), <code>this</code> is <strong>dynamic</strong>. 
-        It can change depending on the call site.</p>
-
-        <h4>Rule 1: Default Binding (Standalone Call)</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> show() { console.log(<span style="color:#569cd6;">this</span>); }
-show(); <span style="color:#6a9955;">// window (browser) or global (Node)</span>
-        <span style="color:#6a9955;">// In strict mode: undefined</span>
-        </pre>
-
-        <h4>Rule 2: Implicit Binding (Method Call)</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> obj = {
-    name: "JS",
-    greet() { console.log(<span style="color:#569cd6;">this</span>.name); }
-};
-obj.greet(); <span style="color:#6a9955;">// "JS" — 'this' = the object BEFORE the dot</span>
-        </pre>
-
-        <h4>Rule 3: Explicit Binding (call / apply / bind)</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> greet() { console.log(<span style="color:#569cd6;">this</span>.name); }
-<span style="color:#569cd6;">const</span> person = { name: "Alice" };
-greet.call(person);  <span style="color:#6a9955;">// "Alice" — 'this' is explicitly set</span>
-        </pre>
-
-        <h4>Rule 4: <code>new</code> Binding (Constructor Call)</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> User(name) { <span style="color:#569cd6;">this</span>.name = name; }
-<span style="color:#569cd6;">const</span> u = <span style="color:#569cd6;">new</span> User("Bob");
-<span style="color:#6a9955;">// 'new' creates a brand new empty object {}</span>
-<span style="color:#6a9955;">// 'this' inside User points to that new object</span>
-<span style="color:#6a9955;">// The object is returned automatically</span>
-        </pre>
-
-        <h4>Priority Order (Highest to Lowest)</h4>
-        <p><code>new</code> > <code>call/apply/bind</code> > <code>obj.method()</code> > <code>standalone()</code></p>
-
-        <h4>The Implicit Binding Loss Problem</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> obj = {
-    name: "JS",
-    greet() { console.log(<span style="color:#569cd6;">this</span>.name); }
-};
-<span style="color:#569cd6;">const</span> fn = obj.greet; <span style="color:#6a9955;">// Extracting the function</span>
-fn(); <span style="color:#6a9955;">// undefined! 'this' is now window, not obj.</span>
-<span style="color:#6a9955;">// The dot context is LOST. It's now a standalone call (Rule 1).</span>
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>What are the 4 rules of <code>this</code> binding in order of priority?</li>
-            <li>Why does extracting a method (<code>const fn = obj.method</code>) cause <code>this</code> to change?</li>
-            <li>What does <code>this</code> refer to inside a function in <code>'use strict'</code> mode when called standalone?</li>
-        </ol>
-        """
-    },
-    {
-        "day": 12,
-        "phase": "Phase 3: this & Objects",
-        "title": "call, apply, bind & Arrow Functions",
-        "content": """
-        <h3>Explicitly controlling <code>this</code></h3>
-
-        <h4><code>.call(thisArg, arg1, arg2, ...)</code></h4>
-        <p>Calls the function immediately with a specific <code>this</code>. Arguments passed individually.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> introduce(greeting) {
-    console.log(<span style="color:#ce9178;">`</span><span style="color:#569cd6;">${greeting}</span><span style="color:#ce9178;">, I'm </span><span style="color:#569cd6;">${this.name}</span><span style="color:#ce9178;">`</span>);
-}
-introduce.call({ name: "Alice" }, "Hello"); <span style="color:#6a9955;">// "Hello, I'm Alice"</span>
-        </pre>
-
-        <h4><code>.apply(thisArg, [argsArray])</code></h4>
-        <p>Same as <code>call</code>, but arguments are passed as an array.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-introduce.apply({ name: "Bob" }, ["Hi"]); <span style="color:#6a9955;">// "Hi, I'm Bob"</span>
-<span style="color:#6a9955;">// Useful for: Math.max.apply(null, [1,2,3]) → 3</span>
-        </pre>
-
-        <h4><code>.bind(thisArg)</code></h4>
-        <p>Does NOT call the function. Returns a <strong>new function</strong> with <code>this</code> permanently set.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> boundFn = introduce.bind({ name: "Charlie" });
-boundFn("Hey"); <span style="color:#6a9955;">// "Hey, I'm Charlie"</span>
-boundFn("Yo");  <span style="color:#6a9955;">// "Yo, I'm Charlie" — 'this' is locked forever</span>
-        </pre>
-
-        <h4>Arrow Functions: Lexical <code>this</code></h4>
-        <p>Arrow functions do NOT have their own <code>this</code>. They inherit <code>this</code> from the 
-        enclosing scope (lexically). <code>call/apply/bind</code> CANNOT override it.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> obj = {
-    name: "JS",
-    regular: <span style="color:#569cd6;">function</span>() { console.log(<span style="color:#569cd6;">this</span>.name); },
-    arrow: () => { console.log(<span style="color:#569cd6;">this</span>.name); }
-};
-obj.regular(); <span style="color:#6a9955;">// "JS"       — 'this' = obj</span>
-obj.arrow();   <span style="color:#6a9955;">// undefined  — 'this' = window (parent scope)</span>
-
-<span style="color:#6a9955;">// WHEN TO USE ARROWS: Inside methods, for callbacks</span>
-<span style="color:#569cd6;">const</span> team = {
-    members: ["Alice", "Bob"],
-    name: "Dev Team",
-    list() {
-        <span style="color:#6a9955;">// Arrow inherits 'this' from list(), which is 'team'</span>
-        <span style="color:#569cd6;">this</span>.members.forEach(m => {
-            console.log(<span style="color:#ce9178;">`</span><span style="color:#569cd6;">${m}</span><span style="color:#ce9178;"> belongs to </span><span style="color:#569cd6;">${this.name}</span><span style="color:#ce9178;">`</span>); <span style="color:#6a9955;">// ✅ Works!</span>
-        });
-    }
-};
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>What is the key difference between <code>call</code> and <code>apply</code>?</li>
-            <li>Can you use <code>.bind()</code> on an arrow function to change its <code>this</code>? Why or why not?</li>
-            <li>Write a <code>polyfill</code> (your own implementation) for <code>Function.prototype.bind</code>.</li>
-        </ol>
-        """
-    },
-    {
-        "day": 13,
-        "phase": "Phase 3: this & Objects",
-        "title": "Prototypal Inheritance",
-        "content": """
-        <h3>JavaScript does NOT have classical inheritance. It has prototypes.</h3>
-        <p>Every object in JavaScript has a hidden property called <code>[[Prototype]]</code> 
-        (accessible via <code>__proto__</code> or <code>Object.getPrototypeOf()</code>). 
-        This links to another object — the prototype.</p>
-
-        <h4>How Property Lookup Works</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> animal = {
-    eats: <span style="color:#569cd6;">true</span>,
-    walk() { console.log("Walking"); }
-};
-
-<span style="color:#569cd6;">const</span> dog = Object.create(animal); <span style="color:#6a9955;">// dog's [[Prototype]] → animal</span>
-dog.barks = <span style="color:#569cd6;">true</span>;
-
-console.log(dog.barks); <span style="color:#6a9955;">// true — found on 'dog' itself</span>
-console.log(dog.eats);  <span style="color:#6a9955;">// true — NOT on 'dog', found on prototype (animal)</span>
-dog.walk();             <span style="color:#6a9955;">// "Walking" — inherited from animal</span>
-        </pre>
-
-        <h4>Constructor Functions (Pre-ES6 way)</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> Person(name) {
-    <span style="color:#569cd6;">this</span>.name = name;
-}
-Person.prototype.greet = <span style="color:#569cd6;">function</span>() {
-    console.log(<span style="color:#ce9178;">`Hi, I'm </span><span style="color:#569cd6;">${this.name}</span><span style="color:#ce9178;">`</span>);
-};
-
-<span style="color:#569cd6;">const</span> alice = <span style="color:#569cd6;">new</span> Person("Alice");
-alice.greet(); <span style="color:#6a9955;">// "Hi, I'm Alice"</span>
-
-<span style="color:#6a9955;">// What 'new' does internally:
-// 1. Creates empty object: {}
-// 2. Sets its [[Prototype]] to Person.prototype
-// 3. Calls Person() with 'this' = new object
-// 4. Returns the object</span>
-        </pre>
-
-        <h4>Own vs Inherited Properties</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-alice.hasOwnProperty('name');  <span style="color:#6a9955;">// true  — defined directly on alice</span>
-alice.hasOwnProperty('greet'); <span style="color:#6a9955;">// false — inherited from prototype</span>
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>What is the difference between <code>__proto__</code> and <code>.prototype</code>?</li>
-            <li>What are the 4 things the <code>new</code> keyword does internally?</li>
-            <li>Why is it better to put methods on <code>.prototype</code> instead of inside the constructor?</li>
-        </ol>
-        """
-    },
-    {
-        "day": 14,
-        "phase": "Phase 3: this & Objects",
-        "title": "The Prototype Chain",
-        "content": """
-        <h3>Everything leads to <code>Object.prototype</code>, then <code>null</code></h3>
-        <p>The Prototype Chain is the linked list of prototypes that JS traverses when looking up a property.</p>
-
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> arr = [1, 2, 3];
-
-<span style="color:#6a9955;">// Chain:
-// arr → Array.prototype → Object.prototype → null
-//
-// arr.push(4)     — found on Array.prototype ✅
-// arr.toString()  — found on Object.prototype ✅
-// arr.fly()       — not found anywhere → undefined</span>
-        </pre>
-
-        <h4>Visualizing the Chain</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> Animal(name) { <span style="color:#569cd6;">this</span>.name = name; }
-Animal.prototype.eat = <span style="color:#569cd6;">function</span>() { console.log("eating"); };
-
-<span style="color:#569cd6;">function</span> Dog(name, breed) {
-    Animal.call(<span style="color:#569cd6;">this</span>, name); <span style="color:#6a9955;">// Call parent constructor</span>
-    <span style="color:#569cd6;">this</span>.breed = breed;
-}
-Dog.prototype = Object.create(Animal.prototype); <span style="color:#6a9955;">// Link prototypes</span>
-Dog.prototype.constructor = Dog; <span style="color:#6a9955;">// Fix constructor reference</span>
-Dog.prototype.bark = <span style="color:#569cd6;">function</span>() { console.log("Woof!"); };
-
-<span style="color:#569cd6;">const</span> rex = <span style="color:#569cd6;">new</span> Dog("Rex", "Labrador");
-rex.bark(); <span style="color:#6a9955;">// "Woof!"   — found on Dog.prototype</span>
-rex.eat();  <span style="color:#6a9955;">// "eating"  — found on Animal.prototype</span>
-
-<span style="color:#6a9955;">// Chain: rex → Dog.prototype → Animal.prototype → Object.prototype → null</span>
-        </pre>
-
-        <h4>ES6 Class Syntax (Sugar over Prototypes)</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">class</span> Animal {
-    constructor(name) { <span style="color:#569cd6;">this</span>.name = name; }
-    eat() { console.log("eating"); }
-}
 
-<span style="color:#569cd6;">class</span> Dog <span style="color:#569cd6;">extends</span> Animal {
-    constructor(name, breed) {
-        <span style="color:#569cd6;">super</span>(name); <span style="color:#6a9955;">// Calls Animal's constructor</span>
-        <span style="color:#569cd6;">this</span>.breed = breed;
-    }
-    bark() { console.log("Woof!"); }
-}
-<span style="color:#6a9955;">// Under the hood: EXACT same prototype chain as above!</span>
-        </pre>
-
-        <h4>Performance Note</h4>
-        <p>Looking up deeply nested prototype chains is slower. If you access <code>obj.x</code> and <code>x</code> 
-        is 5 levels up the chain, the engine must traverse all 5. V8 optimizes this with <strong>Inline Caches</strong>, 
-        but awareness of chain depth matters.</p>
-        """,
-        "quiz": """
-        <ol>
-            <li>What is at the very end of every prototype chain in JavaScript?</li>
-            <li>What does <code>Object.create(null)</code> create, and why might you use it?</li>
-            <li>ES6 <code>class</code> syntax is often called "syntactic sugar." What does it translate to under the hood?</li>
-        </ol>
-        """
-    },
-    {
-        "day": 15,
-        "phase": "Phase 3: this & Objects",
-        "title": "Property Descriptors & Object.defineProperty",
-        "content": """
-        <h3>Properties are more than just key-value pairs</h3>
-        <p>Every property on an object has hidden attributes called <strong>Property Descriptors</strong>.</p>
-
-        <h4>The Descriptor Object</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> obj = { name: "JS" };
-console.log(Object.getOwnPropertyDescriptor(obj, 'name'));
-<span style="color:#6a9955;">// {
-//   value: "JS",
-//   writable: true,      — Can the value be changed?
-//   enumerable: true,    — Does it show up in for...in loops?
-//   configurable: true   — Can the descriptor be modified / property deleted?
-// }</span>
-        </pre>
-
-        <h4>Creating Controlled Properties</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> user = {};
-Object.defineProperty(user, 'id', {
-    value: 42,
-    writable: <span style="color:#569cd6;">false</span>,      <span style="color:#6a9955;">// Cannot change</span>
-    enumerable: <span style="color:#569cd6;">false</span>,    <span style="color:#6a9955;">// Hidden from loops</span>
-    configurable: <span style="color:#569cd6;">false</span>  <span style="color:#6a9955;">// Cannot delete or reconfigure</span>
-});
+# =====================================================
+# EMAIL SIZE OPTIMIZER
+# =====================================================
+# Lesson HTML inherits deep indentation from the old triple-quoted literals
+# and repeats the same long inline styles on every block. This pass keeps
+# the rendering identical while cutting bytes on the wire:
+#   - whitespace runs outside <pre> collapse to one space, and disappear
+#     next to block-level tags where browsers ignore them anyway;
+#   - style="a: b; c: d;" loses its optional spaces and trailing ";";
+#   - colour-only spans become <font color>, which Gmail and Outlook (Word
+#     engine) both honour and which is a third shorter;
+#   - trailing spaces on code lines, which never render, are dropped.
+# Bodies are also sent quoted-printable rather than base64 (see
+# build_message), which is far smaller for mostly-ASCII markup.
+OPTIMIZER_VERSION = 1
+
+HTML_CHARSET = Charset("utf-8")
+HTML_CHARSET.body_encoding = QP
+
+BLOCK_TAG_SPACE = re.compile(
+    r"\s*(</?(?:html|head|body|div|p|h[1-6]|ol|ul|li|table|thead|tbody|tr|td|th|blockquote|br|hr)\b[^>]*>)\s*",
+    re.I)
+STYLE_ATTR = re.compile(r'style="([^"]*)"', re.I)
+COLOR_SPAN = re.compile(r'<span style="color:(#[0-9a-fA-F]{3,6})">(.*?)</span>', re.S)
+
+
+def _compact_style(match):
+    rules = [rule.strip() for rule in match.group(1).split(";") if rule.strip()]
+    rules = [re.sub(r"\s*:\s*", ":", rule, count=1) for rule in rules]
+    return f'style="{";".join(rules)}"'
+
+
+def _minify_text(markup):
+    markup = re.sub(r"\s+", " ", markup)
+    return BLOCK_TAG_SPACE.sub(r"\1", markup)
+
+
+def optimize_html(markup):
+    markup = STYLE_ATTR.sub(_compact_style, markup)
+    markup = COLOR_SPAN.sub(r'<font color="\1">\2</font>', markup)
+
+    out, position = [], 0
+    for match in PRE_BLOCK.finditer(markup):
+        out.append(_minify_text(markup[position:match.start()]))
+        out.append(re.sub(r"[ \t]+\n", "\n", match.group(0)))
+        position = match.end()
+    out.append(_minify_text(markup[position:]))
+    return "".join(out).strip()
+
+
+def report_html_sizes(lessons):
+    # "wire" is the encoded text/html part as it goes over SMTP: the old
+    # unoptimized body in base64 versus the optimized one as sent now.
+    totals = [0, 0, 0, 0]
+    for day_index, lesson in enumerate(lessons):
+        before = render_html_body(lesson, day_index, optimize=False)
+        after = render_html_body(lesson, day_index, optimize=True)
+        sizes = [
+            len(before.encode("utf-8")),
+            len(after.encode("utf-8")),
+            len(MIMEText(before, 'html', 'utf-8').as_bytes()),
+            len(MIMEText(after, 'html', HTML_CHARSET).as_bytes()),
+        ]
+        totals = [t + n for t, n in zip(totals, sizes)]
+        print(f"Day {day_index + 1:>2}: html {sizes[0]:>7,} → {sizes[1]:>7,}  "
+              f"wire {sizes[2]:>7,} → {sizes[3]:>7,} (-{1 - sizes[3] / sizes[2]:.0%})  {lesson['title']}")
+    print(f"Total:  html {totals[0]:>7,} → {totals[1]:>7,}  "
+          f"wire {totals[2]:>7,} → {totals[3]:>7,} (-{1 - totals[3] / totals[2]:.0%})")
 
-user.id = 100; <span style="color:#6a9955;">// Silently fails (or throws in strict mode)</span>
-console.log(user.id); <span style="color:#6a9955;">// 42</span>
-console.log(Object.keys(user)); <span style="color:#6a9955;">// [] — 'id' is hidden!</span>
-        </pre>
-
-        <h4>Getters and Setters</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> person = {
-    firstName: "John",
-    lastName: "Doe",
-    
-    <span style="color:#569cd6;">get</span> fullName() {
-        <span style="color:#569cd6;">return</span> <span style="color:#ce9178;">`</span><span style="color:#569cd6;">${this.firstName} ${this.lastName}</span><span style="color:#ce9178;">`</span>;
-    },
-    <span style="color:#569cd6;">set</span> fullName(value) {
-        [<span style="color:#569cd6;">this</span>.firstName, <span style="color:#569cd6;">this</span>.lastName] = value.split(" ");
-    }
-};
-
-console.log(person.fullName);       <span style="color:#6a9955;">// "John Doe" (getter)</span>
-person.fullName = "Jane Smith";     <span style="color:#6a9955;">// (setter)</span>
-console.log(person.firstName);      <span style="color:#6a9955;">// "Jane"</span>
-        </pre>
-
-        <h4>Freezing Objects</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> config = { api: "https://...", debug: <span style="color:#569cd6;">false</span> };
-Object.freeze(config);   <span style="color:#6a9955;">// Nothing can be changed, added, or deleted</span>
-Object.seal(config);     <span style="color:#6a9955;">// Values can change, but no add/delete</span>
-Object.preventExtensions(config); <span style="color:#6a9955;">// No new properties, but can modify/delete</span>
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>What is the difference between <code>Object.freeze()</code> and <code>Object.seal()</code>?</li>
-            <li>Is <code>Object.freeze()</code> deep or shallow? How would you deep-freeze an object?</li>
-            <li>How would you create a truly constant object where nested objects are also immutable?</li>
-        </ol>
-        """
-    },
-
-    # ===================================================
-    # PHASE 4: ADVANCED FUNCTIONS (Day 16-20)
-    # ===================================================
-    {
-        "day": 16,
-        "phase": "Phase 4: Advanced Functions",
-        "title": "Higher-Order Functions & Function Composition",
-        "content": """
-        <h3>Functions that operate on other functions</h3>
-        <p>A <strong>Higher-Order Function (HOF)</strong> is a function that either:</p>
-        <ul>
-            <li>Takes a function as an argument, OR</li>
-            <li>Returns a function as its result</li>
-        </ul>
-
-        <h4>Examples You Already Use</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// .map(), .filter(), .reduce() are all HOFs</span>
-<span style="color:#569cd6;">const</span> nums = [1, 2, 3, 4, 5];
-<span style="color:#569cd6;">const</span> doubled = nums.map(n => n * 2);       <span style="color:#6a9955;">// [2, 4, 6, 8, 10]</span>
-<span style="color:#569cd6;">const</span> evens = nums.filter(n => n % 2 === 0); <span style="color:#6a9955;">// [2, 4]</span>
-<span style="color:#569cd6;">const</span> sum = nums.reduce((acc, n) => acc + n, 0); <span style="color:#6a9955;">// 15</span>
-        </pre>
-
-        <h4>Building Your Own HOF</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> withLogging(fn) {
-    <span style="color:#569cd6;">return</span> <span style="color:#569cd6;">function</span>(...args) {
-        console.log(<span style="color:#ce9178;">`Calling </span><span style="color:#569cd6;">${fn.name}</span><span style="color:#ce9178;"> with`</span>, args);
-        <span style="color:#569cd6;">const</span> result = fn(...args);
-        console.log(<span style="color:#ce9178;">`Result:`</span>, result);
-        <span style="color:#569cd6;">return</span> result;
-    };
-}
 
-<span style="color:#569cd6;">const</span> add = (a, b) => a + b;
-<span style="color:#569cd6;">const</span> loggedAdd = withLogging(add);
-loggedAdd(2, 3); <span style="color:#6a9955;">// "Calling add with [2, 3]" → "Result: 5"</span>
-        </pre>
-
-        <h4>Function Composition</h4>
-        <p>Combining small functions to build complex behavior:</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> compose = (...fns) => (x) => fns.reduceRight((acc, fn) => fn(acc), x);
-<span style="color:#569cd6;">const</span> pipe    = (...fns) => (x) => fns.reduce((acc, fn) => fn(acc), x);
-
-<span style="color:#569cd6;">const</span> double = x => x * 2;
-<span style="color:#569cd6;">const</span> addOne = x => x + 1;
-<span style="color:#569cd6;">const</span> square = x => x * x;
-
-<span style="color:#569cd6;">const</span> transform = pipe(double, addOne, square);
-transform(3); <span style="color:#6a9955;">// 3 → double(3)=6 → addOne(6)=7 → square(7)=49</span>
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>What is the difference between <code>compose</code> and <code>pipe</code>?</li>
-            <li>Is <code>Array.prototype.map</code> a higher-order function? Why?</li>
-            <li>Write a <code>repeat(fn, n)</code> HOF that calls <code>fn</code> exactly <code>n</code> times.</li>
-        </ol>
-        """
-    },
-    {
-        "day": 17,
-        "phase": "Phase 4: Advanced Functions",
-        "title": "Pure Functions & Side Effects",
-        "content": """
-        <h3>The foundation of predictable code</h3>
-        <p>A <strong>Pure Function</strong> has two properties:</p>
-        <ol>
-            <li><strong>Deterministic:</strong> Same input ALWAYS produces same output.</li>
-            <li><strong>No Side Effects:</strong> It does not modify anything outside itself.</li>
-        </ol>
-
-        <h4>Pure vs Impure</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// ✅ PURE: Depends only on inputs, changes nothing outside</span>
-<span style="color:#569cd6;">function</span> add(a, b) { <span style="color:#569cd6;">return</span> a + b; }
-<span style="color:#569cd6;">function</span> toUpper(str) { <span style="color:#569cd6;">return</span> str.toUpperCase(); }
-
-<span style="color:#6a9955;">// ❌ IMPURE: Modifies external state</span>
-<span style="color:#569cd6;">let</span> total = 0;
-<span style="color:#569cd6;">function</span> addToTotal(x) { total += x; <span style="color:#569cd6;">return</span> total; }
-
-<span style="color:#6a9955;">// ❌ IMPURE: Non-deterministic (different output each call)</span>
-<span style="color:#569cd6;">function</span> now() { <span style="color:#569cd6;">return</span> Date.now(); }
-
-<span style="color:#6a9955;">// ❌ IMPURE: Side effect (console output, DOM manipulation, HTTP request)</span>
-<span style="color:#569cd6;">function</span> logName(name) { console.log(name); }
-        </pre>
-
-        <h4>Why This Matters</h4>
-        <ul>
-            <li><strong>Testability:</strong> Pure functions need no mocks or setup. Just pass input, assert output.</li>
-            <li><strong>Cacheability:</strong> Since output depends only on input, results can be memoized.</li>
-            <li><strong>Parallelization:</strong> Pure functions can run in parallel without race conditions.</li>
-            <li><strong>Referential Transparency:</strong> You can replace <code>add(2,3)</code> with <code>5</code> anywhere without changing behavior.</li>
-        </ul>
-
-        <h4>Avoiding Mutation</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// ❌ Mutates the original array</span>
-<span style="color:#569cd6;">function</span> addItem(arr, item) { arr.push(item); <span style="color:#569cd6;">return</span> arr; }
-
-<span style="color:#6a9955;">// ✅ Returns a NEW array</span>
-<span style="color:#569cd6;">function</span> addItem(arr, item) { <span style="color:#569cd6;">return</span> [...arr, item]; }
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>Is <code>Math.random()</code> a pure function? Why?</li>
-            <li>Can a function that reads from the DOM be pure? Explain.</li>
-            <li>Rewrite this impure function as pure: <code>let count = 0; function increment() { count++; return count; }</code></li>
-        </ol>
-        """
-    },
-    {
-        "day": 18,
-        "phase": "Phase 4: Advanced Functions",
-        "title": "Currying & Partial Application",
-        "content": """
-        <h3>Transforming functions for reusability</h3>
-
-        <h4>Currying</h4>
-        <p>Currying transforms a function with multiple arguments into a sequence of functions that each take one argument.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// Normal function</span>
-<span style="color:#569cd6;">function</span> add(a, b, c) { <span style="color:#569cd6;">return</span> a + b + c; }
-add(1, 2, 3); <span style="color:#6a9955;">// 6</span>
-
-<span style="color:#6a9955;">// Curried version</span>
-<span style="color:#569cd6;">function</span> curriedAdd(a) {
-    <span style="color:#569cd6;">return</span> <span style="color:#569cd6;">function</span>(b) {
-        <span style="color:#569cd6;">return</span> <span style="color:#569cd6;">function</span>(c) {
-            <span style="color:#569cd6;">return</span> a + b + c;
-        };
-    };
-}
-curriedAdd(1)(2)(3); <span style="color:#6a9955;">// 6</span>
-
-<span style="color:#6a9955;">// Arrow function version</span>
-<span style="color:#569cd6;">const</span> curriedAdd = a => b => c => a + b + c;
-        </pre>
-
-        <h4>Generic Curry Utility</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> curry(fn) {
-    <span style="color:#569cd6;">return</span> <span style="color:#569cd6;">function</span> curried(...args) {
-        <span style="color:#569cd6;">if</span> (args.length >= fn.length) {
-            <span style="color:#569cd6;">return</span> fn.apply(<span style="color:#569cd6;">this</span>, args);
-        }
-        <span style="color:#569cd6;">return</span> <span style="color:#569cd6;">function</span>(...args2) {
-            <span style="color:#569cd6;">return</span> curried.apply(<span style="color:#569cd6;">this</span>, args.concat(args2));
-        };
-    };
-}
+# =====================================================
+# STAGE METRICS
+# =====================================================
+# Wall-clock spans around each step of a send, aggregated into fixed-bucket
+# histograms and written out once per run:
+#   METRICS_DIR/daily_js.prom   - Prometheus text format (node_exporter's
+#                                 textfile collector picks it up as is)
+#   METRICS_DIR/stages.jsonl    - one line per stage per run, for diffing runs
+# With METRICS_DIR unset, span() hands back a shared no-op context manager, so
+# an instrumented call costs one attribute check.
+STAGE_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "sum")
+
+    def __init__(self):
+        self.counts = [0] * (len(STAGE_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(STAGE_BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation.
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(STAGE_BUCKETS, self.counts):
+            seen += n
+            if seen >= rank:
+                return bound
+        return math.inf
+
+
+class _Span:
+    __slots__ = ("metrics", "stage", "start")
+
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+
+
+_NO_SPAN = nullcontext()
+
+
+class StageMetrics:
+    def __init__(self, root=METRICS_DIR):
+        self.root = root
+        self.enabled = bool(root)
+        self.histograms = {}
+        self._lock = threading.Lock()
+
+    def span(self, stage):
+        if not self.enabled:
+            return _NO_SPAN
+        return _Span(self, stage)
+
+    def observe(self, stage, seconds):
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(seconds)
+
+    def prometheus(self):
+        lines = [
+            "# HELP daily_js_stage_seconds Time spent in each stage of sending a lesson.",
+            "# TYPE daily_js_stage_seconds histogram",
+        ]
+        for stage, h in sorted(self.histograms.items()):
+            cumulative = 0
+            for bound, n in zip(STAGE_BUCKETS + ("+Inf",), h.counts):
+                cumulative += n
+                lines.append(f'daily_js_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+            lines.append(f'daily_js_stage_seconds_sum{{stage="{stage}"}} {h.sum:.6f}')
+            lines.append(f'daily_js_stage_seconds_count{{stage="{stage}"}} {h.count}')
+        lines.append(f"daily_js_last_run_timestamp_seconds {time.time():.0f}")
+        return "\n".join(lines) + "\n"
+
+    def flush(self):
+        # Called at the end of a run; a no-op when disabled or idle.
+        if not self.enabled or not self.histograms:
+            return
+        os.makedirs(self.root, exist_ok=True)
+        path = os.path.join(self.root, "daily_js.prom")
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(self.prometheus())
+        os.replace(tmp, path)
+
+        run = datetime.now(timezone.utc).isoformat(timespec="seconds")
+        with open(os.path.join(self.root, "stages.jsonl"), "a", encoding="utf-8") as f:
+            for stage, h in sorted(self.histograms.items()):
+                f.write(json.dumps({
+                    "run": run,
+                    "stage": stage,
+                    "count": h.count,
+                    "sum": round(h.sum, 6),
+                    "p50_le": h.quantile(0.5),
+                    "p99_le": h.quantile(0.99),
+                    "buckets": dict(zip(map(str, STAGE_BUCKETS + ("+Inf",)), h.counts)),
+                }) + "\n")
+        self.histograms = {}
+
+
+METRICS = StageMetrics()
 
-<span style="color:#569cd6;">const</span> sum = curry((a, b, c) => a + b + c);
-sum(1)(2)(3);    <span style="color:#6a9955;">// 6</span>
-sum(1, 2)(3);    <span style="color:#6a9955;">// 6</span>
-sum(1)(2, 3);    <span style="color:#6a9955;">// 6</span>
-        </pre>
 
-        <h4>Practical Use Case</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> log = curry((level, timestamp, message) => {
-    console.log(<span style="color:#ce9178;">`[</span><span style="color:#569cd6;">${level}</span><span style="color:#ce9178;">] </span><span style="color:#569cd6;">${timestamp}</span><span style="color:#ce9178;">: </span><span style="color:#569cd6;">${message}</span><span style="color:#ce9178;">`</span>);
-});
+# =====================================================
+# LESSON RENDERING
+# =====================================================
+EMAIL_TEMPLATE = """
+    <html>
+    <body style="font-family: 'Segoe UI', Arial, sans-serif; line-height: 1.7; color: #333; max-width: 700px; margin: auto; padding: 10px;">
 
-<span style="color:#569cd6;">const</span> errorLog = log("ERROR");           <span style="color:#6a9955;">// Partially applied</span>
-<span style="color:#569cd6;">const</span> todayError = errorLog("2024-01-01"); <span style="color:#6a9955;">// More partial</span>
-todayError("Server crashed");             <span style="color:#6a9955;">// "[ERROR] 2024-01-01: Server crashed"</span>
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>What is the difference between Currying and Partial Application?</li>
-            <li>What does <code>fn.length</code> return, and why is it important in the curry utility?</li>
-            <li>Write a curried function <code>multiply</code> such that <code>multiply(2)(3)(4)</code> returns <code>24</code>.</li>
-        </ol>
-        """
-    },
-    {
-        "day": 19,
-        "phase": "Phase 4: Advanced Functions",
-        "title": "Recursion & Tail Call Optimization",
-        "content": """
-        <h3>When a function calls itself</h3>
-        <p>Recursion needs two things: a <strong>base case</strong> (when to stop) and a <strong>recursive case</strong> (the self-call).</p>
-
-        <h4>Classic Example: Factorial</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> factorial(n) {
-    <span style="color:#569cd6;">if</span> (n <= 1) <span style="color:#569cd6;">return</span> 1;     <span style="color:#6a9955;">// Base case</span>
-    <span style="color:#569cd6;">return</span> n * factorial(n - 1); <span style="color:#6a9955;">// Recursive case</span>
-}
-<span style="color:#6a9955;">// factorial(5) → 5 * factorial(4) → 5 * 4 * factorial(3) → ...
-// Each call ADDS to the call stack. factorial(10000) = Stack Overflow!</span>
-        </pre>
-
-        <h4>Tail Call Optimization (TCO)</h4>
-        <p>A <strong>tail call</strong> is when the recursive call is the LAST operation in the function 
-        (no multiplication after). This allows the engine to reuse the current stack frame.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// Tail-recursive version</span>
-<span style="color:#569cd6;">function</span> factorial(n, accumulator = 1) {
-    <span style="color:#569cd6;">if</span> (n <= 1) <span style="color:#569cd6;">return</span> accumulator;
-    <span style="color:#569cd6;">return</span> factorial(n - 1, n * accumulator); <span style="color:#6a9955;">// Tail position!</span>
-}
-<span style="color:#6a9955;">// Note: Only Safari implements TCO. V8 does NOT.</span>
-        </pre>
-
-        <h4>Converting Recursion to Iteration (Safer)</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// Trampoline pattern: avoids stack overflow</span>
-<span style="color:#569cd6;">function</span> trampoline(fn) {
-    <span style="color:#569cd6;">return</span> <span style="color:#569cd6;">function</span>(...args) {
-        <span style="color:#569cd6;">let</span> result = fn(...args);
-        <span style="color:#569cd6;">while</span> (<span style="color:#569cd6;">typeof</span> result === 'function') {
-            result = result();
-        }
-        <span style="color:#569cd6;">return</span> result;
-    };
-}
+        <div style="background-color: #f7df1e; padding: 20px; text-align: center; border-radius: 8px 8px 0 0;">
+            <h1 style="margin:0; color: #000; font-size: 26px;">JavaScript Daily</h1>
+            <p style="margin:5px 0 0 0; color: #555; font-size: 14px;">{phase}</p>
+        </div>
 
-<span style="color:#569cd6;">function</span> factorial(n, acc = 1) {
-    <span style="color:#569cd6;">if</span> (n <= 1) <span style="color:#569cd6;">return</span> acc;
-    <span style="color:#569cd6;">return</span> () => factorial(n - 1, n * acc); <span style="color:#6a9955;">// Returns a function, not a call</span>
-}
+        <div style="background-color: #fff; padding: 25px; border: 1px solid #eee;">
+            <h2 style="color: #2c3e50; border-bottom: 2px solid #f7df1e; padding-bottom: 10px;">{title}</h2>
 
-<span style="color:#569cd6;">const</span> safeFactorial = trampoline(factorial);
-safeFactorial(100000); <span style="color:#6a9955;">// No stack overflow! ✅</span>
-        </pre>
-
-        <h4>Real Use Cases for Recursion</h4>
-        <p>Tree traversal (DOM, file systems), JSON deep clone, flattening nested arrays, parsing nested structures.</p>
-        """,
-        "quiz": """
-        <ol>
-            <li>Why does V8 (Chrome/Node) NOT implement Tail Call Optimization? (Hint: debugging)</li>
-            <li>Convert this recursive Fibonacci function to use the Trampoline pattern.</li>
-            <li>Write a recursive function to deep-flatten an array: <code>[1, [2, [3, [4]]]]</code> → <code>[1, 2, 3, 4]</code></li>
-        </ol>
-        """
-    },
-    {
-        "day": 20,
-        "phase": "Phase 4: Advanced Functions",
-        "title": "Generator Functions & Iterators",
-        "content": """
-        <h3>Functions that can pause and resume</h3>
-        <p>A Generator function can stop midway through execution, yield a value, and later resume from where it left off.</p>
-
-        <h4>Syntax</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function*</span> countUp() {
-    <span style="color:#569cd6;">yield</span> 1;
-    <span style="color:#569cd6;">yield</span> 2;
-    <span style="color:#569cd6;">yield</span> 3;
-}
+            {content}
 
-<span style="color:#569cd6;">const</span> gen = countUp(); <span style="color:#6a9955;">// Does NOT run the function! Returns an iterator.</span>
-gen.next(); <span style="color:#6a9955;">// { value: 1, done: false }</span>
-gen.next(); <span style="color:#6a9955;">// { value: 2, done: false }</span>
-gen.next(); <span style="color:#6a9955;">// { value: 3, done: false }</span>
-gen.next(); <span style="color:#6a9955;">// { value: undefined, done: true }</span>
-        </pre>
-
-        <h4>The Iterator Protocol</h4>
-        <p>Any object with a <code>next()</code> method that returns <code>{ value, done }</code> is an iterator. 
-        Generators automatically implement this protocol.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// Custom iterable using Symbol.iterator</span>
-<span style="color:#569cd6;">const</span> range = {
-    from: 1,
-    to: 5,
-    [Symbol.iterator]() {
-        <span style="color:#569cd6;">let</span> current = <span style="color:#569cd6;">this</span>.from;
-        <span style="color:#569cd6;">const</span> last = <span style="color:#569cd6;">this</span>.to;
-        <span style="color:#569cd6;">return</span> {
-            next() {
-                <span style="color:#569cd6;">return</span> current <= last
-                    ? { value: current++, done: <span style="color:#569cd6;">false</span> }
-                    : { done: <span style="color:#569cd6;">true</span> };
-            }
-        };
-    }
-};
-<span style="color:#569cd6;">for</span> (<span style="color:#569cd6;">const</span> num <span style="color:#569cd6;">of</span> range) console.log(num); <span style="color:#6a9955;">// 1, 2, 3, 4, 5</span>
-        </pre>
-
-        <h4>Infinite Sequences</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function*</span> fibonacci() {
-    <span style="color:#569cd6;">let</span> a = 0, b = 1;
-    <span style="color:#569cd6;">while</span> (<span style="color:#569cd6;">true</span>) { <span style="color:#6a9955;">// Infinite! But safe because it's lazy.</span>
-        <span style="color:#569cd6;">yield</span> a;
-        [a, b] = [b, a + b];
-    }
-}
-<span style="color:#569cd6;">const</span> fib = fibonacci();
-fib.next().value; <span style="color:#6a9955;">// 0</span>
-fib.next().value; <span style="color:#6a9955;">// 1</span>
-fib.next().value; <span style="color:#6a9955;">// 1</span>
-fib.next().value; <span style="color:#6a9955;">// 2</span>
-        </pre>
-
-        <h4>Two-Way Communication</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function*</span> conversation() {
-    <span style="color:#569cd6;">const</span> name = <span style="color:#569cd6;">yield</span> "What is your name?";
-    <span style="color:#569cd6;">const</span> age = <span style="color:#569cd6;">yield</span> <span style="color:#ce9178;">`Hello </span><span style="color:#569cd6;">${name}</span><span style="color:#ce9178;">! How old are you?`</span>;
-    <span style="color:#569cd6;">yield</span> <span style="color:#ce9178;">`</span><span style="color:#569cd6;">${name}</span><span style="color:#ce9178;"> is </span><span style="color:#569cd6;">${age}</span><span style="color:#ce9178;"> years old.`</span>;
-}
-<span style="color:#569cd6;">const</span> chat = conversation();
-chat.next();          <span style="color:#6a9955;">// { value: "What is your name?" }</span>
-chat.next("Alice");   <span style="color:#6a9955;">// { value: "Hello Alice! How old are you?" }</span>
-chat.next(30);        <span style="color:#6a9955;">// { value: "Alice is 30 years old." }</span>
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>What is the difference between a Generator and a regular function in terms of memory?</li>
-            <li>What does <code>yield</code> do differently from <code>return</code>?</li>
-            <li>How are Generators related to <code>async/await</code>? (Hint: async/await is built on top of generators)</li>
-        </ol>
-        """
-    },
-
-    # ===================================================
-    # PHASE 5: ASYNC JAVASCRIPT (Day 21-25)
-    # ===================================================
-    {
-        "day": 21,
-        "phase": "Phase 5: Async JavaScript",
-        "title": "The Event Loop & Concurrency Model",
-        "content": """
-        <h3>How single-threaded JS handles async operations</h3>
-        <p>JS has ONE thread, ONE call stack, but it can handle thousands of async operations. 
-        The secret: the <strong>Event Loop</strong> + <strong>Web APIs</strong> + <strong>Callback Queue</strong>.</p>
-
-        <h4>The Architecture</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-┌───────────────┐   ┌───────────────┐
-│  Call Stack    │   │   Web APIs    │
-│ (Your JS code)│──→│ (setTimeout,  │
-│               │   │  fetch, DOM)  │
-└───────┬───────┘   └───────┬───────┘
-        │                   │
-        │           ┌───────▼───────┐
-        │           │ Callback Queue │
-        │           │ (Task Queue)   │
-        │           └───────┬───────┘
-        │                   │
-        └───────────────────┘
-          Event Loop checks:
-          "Is the Call Stack empty?
-           If yes, push next callback."
-        </pre>
-
-        <h4>Step-by-Step Example</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-console.log("1");
-
-setTimeout(() => {
-    console.log("2");
-}, 0); <span style="color:#6a9955;">// 0ms delay! But still async.</span>
-
-console.log("3");
-
-<span style="color:#6a9955;">// Output: "1", "3", "2"
-// Why? setTimeout callback goes to the Web API, then the Callback Queue.
-// The Event Loop waits until "1" and "3" finish (stack is empty),
-// THEN pushes the callback.</span>
-        </pre>
-
-        <h4>Key Rule</h4>
-        <p>The Event Loop will NEVER push a callback from the queue if the Call Stack is not empty. 
-        This is why a <code>while(true)</code> loop freezes the browser — the stack is never empty, 
-        so no callbacks can run.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// This setTimeout will NEVER fire!</span>
-setTimeout(() => console.log("I'm stuck"), 0);
-<span style="color:#569cd6;">while</span>(<span style="color:#569cd6;">true</span>) {} <span style="color:#6a9955;">// Stack is never empty. Event Loop is blocked.</span>
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>Why does <code>setTimeout(fn, 0)</code> not execute immediately?</li>
-            <li>Is <code>setTimeout</code> part of JavaScript? Or is it a Web API?</li>
-            <li>What would happen if you put a very CPU-heavy computation (e.g., sorting 10 million items) on the main thread? How would it affect UI?</li>
-        </ol>
-        """
-    },
-    {
-        "day": 22,
-        "phase": "Phase 5: Async JavaScript",
-        "title": "Promises: Internal Mechanics",
-        "content": """
-        <h3>A Promise is a state machine</h3>
-        <p>A Promise is an object representing the eventual completion (or failure) of an async operation. 
-        It has 3 states:</p>
-        <ul>
-            <li><strong>Pending:</strong> Initial state. Neither fulfilled nor rejected.</li>
-            <li><strong>Fulfilled:</strong> Operation completed. <code>.then()</code> handlers run.</li>
-            <li><strong>Rejected:</strong> Operation failed. <code>.catch()</code> handlers run.</li>
-        </ul>
-        <p>Once settled (fulfilled or rejected), a promise <strong>cannot change state</strong>.</p>
-
-        <h4>Creating Promises</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> promise = <span style="color:#569cd6;">new</span> Promise((resolve, reject) => {
-    <span style="color:#6a9955;">// The executor runs SYNCHRONOUSLY</span>
-    <span style="color:#569cd6;">const</span> success = <span style="color:#569cd6;">true</span>;
-    <span style="color:#569cd6;">if</span> (success) resolve("Data loaded");
-    <span style="color:#569cd6;">else</span> reject(<span style="color:#569cd6;">new</span> Error("Failed"));
-});
+            <div style="background-color: #f0f7ff; border-left: 4px solid #3498db; padding: 15px; margin-top: 30px; border-radius: 4px;">
+                <h3 style="color: #2980b9; margin-top: 0;">🧠 Daily Quiz</h3>
+                {quiz}
+                <p style="font-style: italic; color: #777; font-size: 12px;">Try to answer before looking anything up. Write your answers down.</p>
+            </div>
+        </div>
 
-promise
-    .then(data => console.log(data))   <span style="color:#6a9955;">// "Data loaded"</span>
-    .catch(err => console.error(err));
-        </pre>
-
-        <h4>Chaining: Each <code>.then()</code> returns a NEW Promise</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-fetch('/api/user')
-    .then(res => res.json())          <span style="color:#6a9955;">// Returns new Promise with parsed data</span>
-    .then(user => fetch(<span style="color:#ce9178;">`/api/posts/</span><span style="color:#569cd6;">${user.id}</span><span style="color:#ce9178;">`</span>)) <span style="color:#6a9955;">// Returns new Promise</span>
-    .then(res => res.json())
-    .then(posts => console.log(posts))
-    .catch(err => console.error(err)); <span style="color:#6a9955;">// Catches ANY error in the chain</span>
-        </pre>
-
-        <h4>Promise Static Methods</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// Wait for ALL to succeed (fails if ANY rejects)</span>
-Promise.all([p1, p2, p3]).then(([r1, r2, r3]) => {});
-
-<span style="color:#6a9955;">// Wait for ALL to settle (never rejects)</span>
-Promise.allSettled([p1, p2]).then(results => {
-    <span style="color:#6a9955;">// [{ status: "fulfilled", value: ... }, { status: "rejected", reason: ... }]</span>
-});
+        <div style="text-align: center; padding: 15px; font-size: 13px; color: #888; background-color: #f9f9f9; border-radius: 0 0 8px 8px; border: 1px solid #eee; border-top: 0;">
+            Day {day} of {total} • Automated via GitHub Actions
+        </div>
+    </body>
+    </html>
+    """
 
-<span style="color:#6a9955;">// First to settle wins (fulfilled OR rejected)</span>
-Promise.race([p1, p2]).then(first => {});
-
-<span style="color:#6a9955;">// First to FULFILL wins (ignores rejections)</span>
-Promise.any([p1, p2]).then(first => {});
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>Does the executor function inside <code>new Promise(executor)</code> run synchronously or asynchronously?</li>
-            <li>What is the difference between <code>Promise.all</code> and <code>Promise.allSettled</code>?</li>
-            <li>What happens if you don't attach a <code>.catch()</code> to a rejected promise?</li>
-        </ol>
-        """
-    },
-    {
-        "day": 23,
-        "phase": "Phase 5: Async JavaScript",
-        "title": "Microtask vs Macrotask Queue",
-        "content": """
-        <h3>Not all async callbacks are treated equally</h3>
-        <p>The Event Loop has TWO queues, and <strong>Microtasks always run before Macrotasks</strong>.</p>
-
-        <h4>Macrotask Queue (Task Queue)</h4>
-        <p>Sources: <code>setTimeout</code>, <code>setInterval</code>, <code>setImmediate</code> (Node), I/O, UI rendering.</p>
-
-        <h4>Microtask Queue</h4>
-        <p>Sources: <code>Promise.then/catch/finally</code>, <code>queueMicrotask()</code>, <code>MutationObserver</code>.</p>
-
-        <h4>Execution Order</h4>
-        <ol>
-            <li>Execute ALL synchronous code (Call Stack).</li>
-            <li>Drain the ENTIRE Microtask queue.</li>
-            <li>Execute ONE Macrotask.</li>
-            <li>Drain the ENTIRE Microtask queue again.</li>
-            <li>Repeat from step 3.</li>
-        </ol>
-
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-console.log("1"); <span style="color:#6a9955;">// Sync</span>
-
-setTimeout(() => console.log("2"), 0); <span style="color:#6a9955;">// Macrotask</span>
-
-Promise.resolve().then(() => console.log("3")); <span style="color:#6a9955;">// Microtask</span>
-
-Promise.resolve().then(() => {
-    console.log("4"); <span style="color:#6a9955;">// Microtask</span>
-    setTimeout(() => console.log("5"), 0); <span style="color:#6a9955;">// Macrotask (queued from microtask)</span>
-});
+_rendered_bodies = {}
+
+
+def render_html_body(lesson, day_index, optimize=None):
+    html_body = EMAIL_TEMPLATE.format(
+        phase=lesson.get("phase", ""),
+        title=lesson['title'],
+        content=highlight_code_blocks(lesson['content']),
+        quiz=lesson['quiz'],
+        day=day_index + 1,
+        total=len(CURRICULUM),
+    )
+    if OPTIMIZE_HTML if optimize is None else optimize:
+        html_body = optimize_html(html_body)
+    return html_body
+
+
+def render_cache_key(lesson, day_index):
+    # Anything that changes the rendered bytes must feed the key, so edits to
+    # a lesson or to EMAIL_TEMPLATE simply miss and re-render.
+    h = hashlib.sha256()
+    h.update(json.dumps(lesson, sort_keys=True).encode("utf-8"))
+    h.update(EMAIL_TEMPLATE.encode("utf-8"))
+    h.update(f"highlight:{HIGHLIGHTER_VERSION}:{sorted(HIGHLIGHT_COLORS.items())}".encode("utf-8"))
+    h.update(f"optimize:{OPTIMIZER_VERSION if OPTIMIZE_HTML else 0}".encode("ascii"))
+    h.update(f"{day_index + 1}/{len(CURRICULUM)}".encode("ascii"))
+    return h.hexdigest()
+
+
+def _read_through(key, suffix, render):
+    # Memory, then RENDER_CACHE_DIR/<key><suffix>, then render() and store.
+    if key in _rendered_bodies:
+        return _rendered_bodies[key]
+
+    path = os.path.join(RENDER_CACHE_DIR, key + suffix)
+    try:
+        with open(path, encoding="utf-8") as f:
+            body = f.read()
+    except FileNotFoundError:
+        with METRICS.span("render"):
+            body = render()
+        os.makedirs(RENDER_CACHE_DIR, exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(body)
+        os.replace(tmp, path)
+
+    _rendered_bodies[key] = body
+    return body
+
+
+def get_html_body(lesson, day_index):
+    return _read_through(render_cache_key(lesson, day_index), ".html", lambda: render_html_body(lesson, day_index))
+
+
+def live_cache_files():
+    # Render-cache file names that some current lesson still maps to.
+    live = {render_cache_key(lesson, i) + ".html" for i, lesson in enumerate(CURRICULUM)}
+    live |= {text_cache_key(lesson) + ".txt" for lesson in CURRICULUM}
+    live |= {fragment_cache_key(lesson, i) + ".section.html" for i, lesson in enumerate(CURRICULUM)}
+    return live
+
+
+def prune_render_cache():
+    live = live_cache_files()
+    pruned = 0
+    for name in os.listdir(RENDER_CACHE_DIR) if os.path.isdir(RENDER_CACHE_DIR) else []:
+        if name not in live:
+            os.remove(os.path.join(RENDER_CACHE_DIR, name))
+            pruned += 1
+    return pruned
+
+
+def prefetch_lessons(day_indexes):
+    # Warm the cache ahead of the send window and drop bodies that no longer
+    # match any lesson, so the cache directory does not grow forever.
+    for day_index in day_indexes:
+        if 0 <= day_index < len(CURRICULUM):
+            get_html_body(CURRICULUM[day_index], day_index)
+            get_text_body(CURRICULUM[day_index])
+            print(f"📦 Cached: Day {day_index + 1} — {CURRICULUM[day_index]['title']}")
+    prune_render_cache()
+
+
+def refresh_curriculum():
+    # For long-running processes: pick up edits to the course file without a
+    # restart. Only in-memory entries of changed lessons are dropped; every
+    # cache is keyed by content, so unchanged lessons keep their rendered
+    # bodies, highlighted code blocks and encoded messages.
+    changed = CURRICULUM.refresh()
+    if not changed:
+        return changed
+    live = {name.split(".", 1)[0] for name in live_cache_files()}
+    for key in [k for k in _rendered_bodies if k not in live]:
+        del _rendered_bodies[key]
+    bodies = set(_rendered_bodies.values())
+    for key in [k for k in _message_factories if k[1] not in bodies]:
+        del _message_factories[key]
+    print(f"♻️  {os.path.basename(CURRICULUM.path)} changed: day(s) {', '.join(str(i + 1) for i in changed)}")
+    return changed
+
+
+def rebuild_render_cache():
+    # Renders whatever is missing from the cache (i.e. new or edited lessons)
+    # and prunes what no lesson maps to any more.
+    rebuilt = []
+    for day_index, lesson in enumerate(CURRICULUM):
+        html_path = os.path.join(RENDER_CACHE_DIR, render_cache_key(lesson, day_index) + ".html")
+        text_path = os.path.join(RENDER_CACHE_DIR, text_cache_key(lesson) + ".txt")
+        if not (os.path.exists(html_path) and os.path.exists(text_path)):
+            rebuilt.append(day_index)
+        get_html_body(lesson, day_index)
+        get_text_body(lesson)
+    pruned = prune_render_cache()
+    if rebuilt:
+        print(f"🔨 Rebuilt day(s) {', '.join(str(i + 1) for i in rebuilt)}; "
+              f"{len(CURRICULUM) - len(rebuilt)} unchanged, {pruned} stale file(s) removed")
+    else:
+        print(f"✔️  All {len(CURRICULUM)} lessons up to date")
+    return rebuilt
 
-console.log("6"); <span style="color:#6a9955;">// Sync</span>
-
-<span style="color:#6a9955;">// Output: 1, 6, 3, 4, 2, 5
-// Step 1: Sync → "1", "6"
-// Step 2: Microtasks → "3", "4"
-// Step 3: One Macrotask → "2"
-// Step 4: Microtasks → (none)
-// Step 5: One Macrotask → "5"</span>
-        </pre>
-
-        <h4>Why This Matters</h4>
-        <p>If you create microtasks inside microtasks infinitely, the macrotask queue (including UI rendering) 
-        will STARVE. The page will freeze.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// ❌ DANGER: Infinite microtask loop</span>
-<span style="color:#569cd6;">function</span> loop() {
-    Promise.resolve().then(loop);
-}
-loop(); <span style="color:#6a9955;">// Page freezes! Microtask queue never empties.</span>
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>What is the output? <code>setTimeout(() => console.log('a'), 0); Promise.resolve().then(() => console.log('b')); console.log('c');</code></li>
-            <li>Why do Microtasks have higher priority than Macrotasks?</li>
-            <li>Can starving the Macrotask queue prevent the browser from rendering? Why?</li>
-        </ol>
-        """
-    },
-    {
-        "day": 24,
-        "phase": "Phase 5: Async JavaScript",
-        "title": "async/await Under The Hood",
-        "content": """
-        <h3><code>async/await</code> is syntactic sugar over Promises + Generators</h3>
-        <p>When you write <code>async/await</code>, the engine transforms it into Promise chains internally.</p>
-
-        <h4>What <code>async</code> does</h4>
-        <p>Wraps the function's return value in a Promise automatically.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">async function</span> greet() { <span style="color:#569cd6;">return</span> "Hello"; }
-<span style="color:#6a9955;">// Equivalent to:</span>
-<span style="color:#569cd6;">function</span> greet() { <span style="color:#569cd6;">return</span> Promise.resolve("Hello"); }
-
-greet().then(msg => console.log(msg)); <span style="color:#6a9955;">// "Hello"</span>
-        </pre>
-
-        <h4>What <code>await</code> does</h4>
-        <p><code>await</code> pauses the async function, unwraps the Promise, and resumes when it settles. 
-        Crucially, it yields control back to the Event Loop while waiting.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">async function</span> fetchUser() {
-    console.log("A");
-    <span style="color:#569cd6;">const</span> res = <span style="color:#569cd6;">await</span> fetch('/api/user'); <span style="color:#6a9955;">// Pauses here</span>
-    console.log("B"); <span style="color:#6a9955;">// Resumes after fetch completes</span>
-    <span style="color:#569cd6;">return</span> res.json();
-}
 
-<span style="color:#6a9955;">// Under the hood, it's like:</span>
-<span style="color:#569cd6;">function</span> fetchUser() {
-    console.log("A");
-    <span style="color:#569cd6;">return</span> fetch('/api/user')
-        .then(res => {
-            console.log("B");
-            <span style="color:#569cd6;">return</span> res.json();
-        });
-}
-        </pre>
-
-        <h4>Common Patterns</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// Sequential (slow — each waits for the previous)</span>
-<span style="color:#569cd6;">const</span> user = <span style="color:#569cd6;">await</span> fetchUser();
-<span style="color:#569cd6;">const</span> posts = <span style="color:#569cd6;">await</span> fetchPosts(user.id);
-
-<span style="color:#6a9955;">// Parallel (fast — both run at the same time)</span>
-<span style="color:#569cd6;">const</span> [user, posts] = <span style="color:#569cd6;">await</span> Promise.all([
-    fetchUser(),
-    fetchPosts()
-]);
-
-<span style="color:#6a9955;">// Error handling</span>
-<span style="color:#569cd6;">try</span> {
-    <span style="color:#569cd6;">const</span> data = <span style="color:#569cd6;">await</span> riskyOperation();
-} <span style="color:#569cd6;">catch</span> (err) {
-    console.error("Failed:", err.message);
-} <span style="color:#569cd6;">finally</span> {
-    cleanup();
-}
-        </pre>
-
-        <h4>Top-Level Await</h4>
-        <p>In ES Modules (not CommonJS), you can use <code>await</code> at the top level without wrapping in an async function.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// In a .mjs file or type="module" script</span>
-<span style="color:#569cd6;">const</span> data = <span style="color:#569cd6;">await</span> fetch('/api').then(r => r.json());
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>What happens to the code AFTER an <code>await</code> statement — does it go to the Microtask or Macrotask queue?</li>
-            <li>Why is <code>await</code> in a loop (sequential) slower than <code>Promise.all()</code> (parallel)?</li>
-            <li>Can you use <code>await</code> inside a regular (non-async) function? What error do you get?</li>
-        </ol>
-        """
-    },
-    {
-        "day": 25,
-        "phase": "Phase 5: Async JavaScript",
-        "title": "Async Error Handling Patterns",
-        "content": """
-        <h3>Errors in async code behave differently</h3>
-        <p>Unlike synchronous errors, async errors can be silently swallowed if not caught properly.</p>
-
-        <h4>The Unhandled Rejection Problem</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// ❌ This rejection is UNHANDLED — crashes Node.js!</span>
-<span style="color:#569cd6;">async function</span> fail() { <span style="color:#569cd6;">throw new</span> Error("oops"); }
-fail(); <span style="color:#6a9955;">// No .catch(), no try/catch → Unhandled Promise Rejection</span>
-
-<span style="color:#6a9955;">// ✅ Fix 1: try/catch</span>
-<span style="color:#569cd6;">try</span> { <span style="color:#569cd6;">await</span> fail(); } <span style="color:#569cd6;">catch</span> (e) { console.error(e); }
-
-<span style="color:#6a9955;">// ✅ Fix 2: .catch()</span>
-fail().catch(e => console.error(e));
-        </pre>
-
-        <h4>Global Error Handlers</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// Browser</span>
-window.addEventListener('unhandledrejection', (event) => {
-    console.error('Unhandled:', event.reason);
-    event.preventDefault(); <span style="color:#6a9955;">// Prevents default logging</span>
-});
+# =====================================================
+# PLAIN-TEXT RENDERING
+# =====================================================
+# The text/plain alternative: headings underlined, paragraphs wrapped at
+# TEXT_WIDTH, lists numbered or bulleted, <pre> blocks kept verbatim and
+# indented, inline <code> in backticks. It depends only on the lesson, so it
+# is rendered once per content hash and reused for every recipient.
+TEXT_RENDERER_VERSION = 1
+TEXT_WIDTH = 72
+
+
+class LessonTextRenderer(HTMLParser):
+    BLOCKS = {"p", "h3", "h4", "li", "pre", "tr", "th", "td", "table", "ul", "ol"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []
+        self.lists = []
+        self.buffer = []
+        self.kind = None
+        self.row = None
+
+    def flush(self):
+        text = "".join(self.buffer)
+        self.buffer = []
+        if self.kind == "pre":
+            code = textwrap.dedent(text.strip("\n")).rstrip()
+            if code:
+                self.blocks.append(textwrap.indent(code, "    "))
+            return
+        lines = [" ".join(line.split()) for line in text.split("\n")]
+        text = "\n".join(line for line in lines if line)
+        if not text:
+            return
+        if self.kind in ("h3", "h4"):
+            self.blocks.append(f"{text}\n{('-' if self.kind == 'h3' else '~') * len(text)}")
+        elif self.kind == "li" and self.lists:
+            depth = "  " * (len(self.lists) - 1)
+            marker = self.lists[-1]
+            if marker:
+                self.lists[-1] += 1
+                bullet = f"{depth}{marker}. "
+            else:
+                bullet = f"{depth}- "
+            self.blocks.append(textwrap.fill(text, TEXT_WIDTH, initial_indent=bullet,
+                                             subsequent_indent=" " * len(bullet), break_on_hyphens=False))
+        elif self.kind == "th":
+            self.row.append(text)
+        elif self.kind == "td":
+            self.blocks.append(text)
+        else:
+            self.blocks.append("\n".join(textwrap.fill(line, TEXT_WIDTH, break_on_hyphens=False) for line in text.split("\n")))
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.BLOCKS:
+            self.flush()
+            self.kind = tag
+            if tag in ("ul", "ol"):
+                self.lists.append(1 if tag == "ol" else 0)
+            elif tag == "tr":
+                self.row = []
+        elif tag == "br":
+            self.buffer.append("\n")
+        elif tag == "code" and self.kind != "pre":
+            self.buffer.append("`")
+
+    def handle_endtag(self, tag):
+        if tag in self.BLOCKS:
+            self.flush()
+            if tag in ("ul", "ol") and self.lists:
+                self.lists.pop()
+            elif tag == "tr" and self.row:
+                self.blocks.append(" | ".join(self.row))
+                self.row = None
+            self.kind = "li" if self.lists and tag != "li" else None
+        elif tag == "code" and self.kind != "pre":
+            self.buffer.append("`")
+
+    def handle_data(self, data):
+        if self.kind != "pre":
+            # Source indentation and line breaks are markup, not content.
+            data = data.replace("\n", " ")
+        self.buffer.append(data)
+
+    def close(self):
+        super().close()
+        self.flush()
+        return "\n\n".join(self.blocks)
+
+
+def html_to_text(markup):
+    parser = LessonTextRenderer()
+    parser.feed(markup)
+    return parser.close()
+
+
+def render_text_body(lesson):
+    title = lesson['title']
+    parts = [
+        f"JavaScript Daily — {lesson.get('phase', '')}",
+        f"{title}\n{'=' * len(title)}",
+        html_to_text(lesson['content']),
+        f"DAILY QUIZ\n\n{html_to_text(lesson['quiz'])}\n\n"
+        "Try to answer before looking anything up. Write your answers down.",
+    ]
+    if "day" in lesson:
+        parts.append(f"Day {lesson['day']} of {len(CURRICULUM)}")
+    return "\n\n".join(parts) + "\n"
+
+
+def text_cache_key(lesson):
+    h = hashlib.sha256()
+    h.update(json.dumps(lesson, sort_keys=True).encode("utf-8"))
+    h.update(f"text:{TEXT_RENDERER_VERSION}:{TEXT_WIDTH}:{len(CURRICULUM)}".encode("ascii"))
+    return h.hexdigest()
+
+
+def get_text_body(lesson):
+    return _read_through(text_cache_key(lesson), ".txt", lambda: render_text_body(lesson))
 
-<span style="color:#6a9955;">// Node.js</span>
-process.on('unhandledRejection', (reason, promise) => {
-    console.error('Unhandled:', reason);
-});
-        </pre>
-
-        <h4>Error-First Pattern (Inspired by Go)</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// Utility: wraps async functions to return [error, data]</span>
-<span style="color:#569cd6;">async function</span> to(promise) {
-    <span style="color:#569cd6;">try</span> {
-        <span style="color:#569cd6;">const</span> data = <span style="color:#569cd6;">await</span> promise;
-        <span style="color:#569cd6;">return</span> [<span style="color:#569cd6;">null</span>, data];
-    } <span style="color:#569cd6;">catch</span> (err) {
-        <span style="color:#569cd6;">return</span> [err, <span style="color:#569cd6;">null</span>];
-    }
-}
 
-<span style="color:#6a9955;">// Usage: Clean, no try/catch blocks everywhere</span>
-<span style="color:#569cd6;">const</span> [err, user] = <span style="color:#569cd6;">await</span> to(fetchUser());
-<span style="color:#569cd6;">if</span> (err) {
-    console.error("Failed:", err);
-    <span style="color:#569cd6;">return</span>;
-}
-console.log(user);
-        </pre>
-
-        <h4>Retry Pattern</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">async function</span> retry(fn, retries = 3, delay = 1000) {
-    <span style="color:#569cd6;">for</span> (<span style="color:#569cd6;">let</span> i = 0; i < retries; i++) {
-        <span style="color:#569cd6;">try</span> {
-            <span style="color:#569cd6;">return await</span> fn();
-        } <span style="color:#569cd6;">catch</span> (err) {
-            <span style="color:#569cd6;">if</span> (i === retries - 1) <span style="color:#569cd6;">throw</span> err;
-            console.log(<span style="color:#ce9178;">`Retry </span><span style="color:#569cd6;">${i+1}</span><span style="color:#ce9178;">...</span><span style="color:#ce9178;">`</span>);
-            <span style="color:#569cd6;">await new</span> Promise(r => setTimeout(r, delay));
-        }
-    }
-}
-<span style="color:#569cd6;">const</span> data = <span style="color:#569cd6;">await</span> retry(() => fetch('/unstable-api'));
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>What is an "Unhandled Promise Rejection" and why is it dangerous in Node.js?</li>
-            <li>Implement the <code>to()</code> utility function from scratch.</li>
-            <li>In the retry pattern, why do we use <code>await new Promise(r => setTimeout(r, delay))</code> instead of just <code>setTimeout</code>?</li>
-        </ol>
-        """
-    },
-
-    # ===================================================
-    # PHASE 6: PERFORMANCE & PATTERNS (Day 26-30)
-    # ===================================================
-    {
-        "day": 26,
-        "phase": "Phase 6: Performance & Patterns",
-        "title": "V8 Hidden Classes & Inline Caching",
-        "content": """
-        <h3>How V8 makes property access fast</h3>
-        <p>Accessing <code>obj.x</code> in a dynamic language like JS should be slow (hash table lookup). 
-        V8 uses two tricks to make it nearly as fast as C++.</p>
-
-        <h4>Hidden Classes (Shapes / Maps)</h4>
-        <p>V8 assigns a <strong>Hidden Class</strong> to every object. Objects with the same properties 
-        added in the same order share the same Hidden Class.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// ✅ GOOD: Same property order → same Hidden Class</span>
-<span style="color:#569cd6;">function</span> Point(x, y) {
-    <span style="color:#569cd6;">this</span>.x = x; <span style="color:#6a9955;">// Hidden Class C0 → C1 (added x)</span>
-    <span style="color:#569cd6;">this</span>.y = y; <span style="color:#6a9955;">// Hidden Class C1 → C2 (added y)</span>
-}
-<span style="color:#569cd6;">const</span> p1 = <span style="color:#569cd6;">new</span> Point(1, 2); <span style="color:#6a9955;">// Hidden Class: C2</span>
-<span style="color:#569cd6;">const</span> p2 = <span style="color:#569cd6;">new</span> Point(3, 4); <span style="color:#6a9955;">// Hidden Class: C2 (same!)</span>
-
-<span style="color:#6a9955;">// ❌ BAD: Different property order → different Hidden Classes</span>
-<span style="color:#569cd6;">const</span> a = {}; a.x = 1; a.y = 2; <span style="color:#6a9955;">// Class: {x,y}</span>
-<span style="color:#569cd6;">const</span> b = {}; b.y = 2; b.x = 1; <span style="color:#6a9955;">// Class: {y,x} — DIFFERENT!</span>
-        </pre>
-
-        <h4>Inline Caching (IC)</h4>
-        <p>When a function accesses <code>obj.x</code>, V8 caches the Hidden Class and the memory offset. 
-        Next time the same function runs with an object of the same Hidden Class, it skips the lookup entirely.</p>
-        <ul>
-            <li><strong>Monomorphic:</strong> Always the same Hidden Class → fastest (1 cache entry).</li>
-            <li><strong>Polymorphic:</strong> 2-4 different classes → slower (multiple cache entries).</li>
-            <li><strong>Megamorphic:</strong> 5+ classes → slowest (cache abandoned, full lookup).</li>
-        </ul>
-
-        <h4>Performance Tips</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// ✅ Initialize all properties in the constructor</span>
-<span style="color:#569cd6;">function</span> User(name, age) {
-    <span style="color:#569cd6;">this</span>.name = name;
-    <span style="color:#569cd6;">this</span>.age = age;
-    <span style="color:#569cd6;">this</span>.email = <span style="color:#569cd6;">null</span>; <span style="color:#6a9955;">// Even if unknown, declare it!</span>
-}
+# =====================================================
+# SMTP CONNECTION POOL
+# =====================================================
+def is_connection_error(exc):
+    # 421 means the server is closing the channel; anything socket-level is
+    # a dead session too. Other SMTP replies are about the message itself.
+    if isinstance(exc, smtplib.SMTPServerDisconnected):
+        return True
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return exc.smtp_code == 421
+    if isinstance(exc, smtplib.SMTPException):
+        return False
+    return isinstance(exc, OSError)
+
+
+class PooledConnection:
+    def __init__(self, pool, number):
+        self.pool = pool
+        self.number = number
+        self.server = None
+        self.sent = 0
+        self.connects = 0
+        self.last_used = 0.0
+
+    def connect(self):
+        self.close()
+        with METRICS.span("connect"):
+            server = smtplib.SMTP(self.pool.host, self.pool.port, timeout=self.pool.timeout)
+        try:
+            if self.pool.starttls:
+                with METRICS.span("starttls"):
+                    server.starttls()
+            if self.pool.user:
+                with METRICS.span("login"):
+                    server.login(self.pool.user, self.pool.password)
+        except Exception:
+            server.close()
+            raise
+        self.server = server
+        self.connects += 1
+        self.last_used = time.monotonic()
+
+    def close(self):
+        if self.server is None:
+            return
+        try:
+            self.server.quit()
+        except (smtplib.SMTPException, OSError):
+            self.server.close()
+        self.server = None
+
+    def ensure_alive(self):
+        if self.server is None:
+            self.connect()
+            return
+        if time.monotonic() - self.last_used < self.pool.idle_timeout:
+            return
+        try:
+            code = self.server.noop()[0]
+        except (smtplib.SMTPException, OSError):
+            code = None
+        if code != 250:
+            self.connect()
+
+    def sendmail(self, sender, recipient, message):
+        self.ensure_alive()
+        try:
+            with METRICS.span("sendmail"):
+                self.server.sendmail(sender, recipient, message)
+        except Exception as e:
+            if isinstance(e, (UnicodeError, ValueError)):
+                # Refused locally mid-transaction (e.g. a non-ASCII address
+                # in RCPT); smtplib leaves the MAIL open, so reset it or the
+                # next message's MAIL FROM gets "503 nested MAIL command".
+                try:
+                    self.server.rset()
+                except (smtplib.SMTPException, OSError):
+                    self.close()
+                raise
+            if not is_connection_error(e):
+                raise
+            # The server dropped us (idle timeout, 421, reset). Reconnect once
+            # and retry; a second failure is a real error.
+            self.connect()
+            with METRICS.span("sendmail"):
+                self.server.sendmail(sender, recipient, message)
+        self.sent += 1
+        self.last_used = time.monotonic()
+
+
+class SMTPConnectionPool:
+    def __init__(self, size=SMTP_POOL_SIZE, host=SMTP_HOST, port=SMTP_PORT,
+                 user=SENDER_EMAIL, password=EMAIL_PASSWORD,
+                 timeout=SMTP_TIMEOUT, idle_timeout=SMTP_IDLE_TIMEOUT, starttls=SMTP_STARTTLS):
+        self.size = max(1, size)
+        self.host = host
+        self.port = port
+        self.starttls = starttls
+        self.user = user
+        self.password = password
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.connections = [PooledConnection(self, n + 1) for n in range(self.size)]
+        # LIFO so a warm session is preferred and cold ones are only opened
+        # when every warm one is busy.
+        self._idle = LifoQueue()
+        for conn in reversed(self.connections):
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    def sendmail(self, sender, recipient, message):
+        with self.connection() as conn:
+            conn.sendmail(sender, recipient, message)
+
+    def close(self):
+        for conn in self.connections:
+            conn.close()
+
+    def report(self):
+        for conn in self.connections:
+            if conn.connects:
+                print(f"🔌 Connection #{conn.number}: {conn.sent} sent, {conn.connects} connect(s)")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
-<span style="color:#6a9955;">// ❌ Don't add properties later dynamically</span>
-<span style="color:#569cd6;">const</span> u = <span style="color:#569cd6;">new</span> User("Alice", 30);
-u.phone = "123"; <span style="color:#6a9955;">// Creates a NEW Hidden Class → deoptimizes</span>
-
-<span style="color:#6a9955;">// ❌ Don't delete properties</span>
-<span style="color:#569cd6;">delete</span> u.age; <span style="color:#6a9955;">// Forces Hidden Class change → slow</span>
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>Why does adding properties in a different order to two objects make V8 slower?</li>
-            <li>What is the difference between Monomorphic, Polymorphic, and Megamorphic inline caches?</li>
-            <li>Why should you avoid using <code>delete</code> on object properties in performance-critical code?</li>
-        </ol>
-        """
-    },
-    {
-        "day": 27,
-        "phase": "Phase 6: Performance & Patterns",
-        "title": "Proxy & Reflect",
-        "content": """
-        <h3>Intercepting and customizing object operations</h3>
-        <p>A <strong>Proxy</strong> wraps an object and lets you intercept operations like 
-        property access, assignment, deletion, function calls, etc.</p>
-
-        <h4>Basic Syntax</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> target = { name: "Alice", age: 30 };
-
-<span style="color:#569cd6;">const</span> handler = {
-    get(target, prop) {
-        console.log(<span style="color:#ce9178;">`Accessing: </span><span style="color:#569cd6;">${prop}</span><span style="color:#ce9178;">`</span>);
-        <span style="color:#569cd6;">return</span> prop <span style="color:#569cd6;">in</span> target ? target[prop] : <span style="color:#ce9178;">"Property not found"</span>;
-    },
-    set(target, prop, value) {
-        <span style="color:#569cd6;">if</span> (prop === 'age' && <span style="color:#569cd6;">typeof</span> value !== 'number') {
-            <span style="color:#569cd6;">throw new</span> TypeError("Age must be a number");
-        }
-        target[prop] = value;
-        <span style="color:#569cd6;">return true</span>;
-    }
-};
-
-<span style="color:#569cd6;">const</span> proxy = <span style="color:#569cd6;">new</span> Proxy(target, handler);
-proxy.name;       <span style="color:#6a9955;">// "Accessing: name" → "Alice"</span>
-proxy.age = "hi"; <span style="color:#6a9955;">// TypeError: Age must be a number</span>
-proxy.unknown;    <span style="color:#6a9955;">// "Property not found"</span>
-        </pre>
-
-        <h4>Real-World Use Cases</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// 1. VALIDATION</span>
-<span style="color:#569cd6;">const</span> validator = <span style="color:#569cd6;">new</span> Proxy({}, {
-    set(obj, prop, val) {
-        <span style="color:#569cd6;">if</span> (prop === 'email' && !val.includes('@')) <span style="color:#569cd6;">throw</span> Error('Invalid email');
-        obj[prop] = val;
-        <span style="color:#569cd6;">return true</span>;
-    }
-});
 
-<span style="color:#6a9955;">// 2. LOGGING / DEBUGGING</span>
-<span style="color:#569cd6;">function</span> createLogged(obj) {
-    <span style="color:#569cd6;">return new</span> Proxy(obj, {
-        get(t, p) { console.log(<span style="color:#ce9178;">`GET </span><span style="color:#569cd6;">${p}</span><span style="color:#ce9178;">`</span>); <span style="color:#569cd6;">return</span> Reflect.get(t, p); },
-        set(t, p, v) { console.log(<span style="color:#ce9178;">`SET </span><span style="color:#569cd6;">${p}</span><span style="color:#ce9178;"> = </span><span style="color:#569cd6;">${v}</span><span style="color:#ce9178;">`</span>); <span style="color:#569cd6;">return</span> Reflect.set(t, p, v); }
-    });
-}
+# =====================================================
+# DELIVERY OUTCOMES & RETRIES
+# =====================================================
+# Every failed attempt is classified:
+#   permanent  - 5xx reply to RCPT or DATA, or refused locally before the
+#                server replied (an address smtplib cannot encode raises
+#                UnicodeError/ValueError): this address or this message is
+#                bad, and retrying is pointless
+#   transient  - 4xx reply (greylisting, 451 local error, mailbox busy)
+#   connection - session died (421, reset, timeout) even after one reconnect
+#   session    - the session itself was refused with a 5xx or no reply code
+#                (login, MAIL FROM/sending quota, STARTTLS, HELO), or
+#                something else went wrong. Nobody else on the list would
+#                fare better, so the run stops; see SendAborted.
+# Transient and connection failures go into a delayed-retry heap with
+# jittered exponential backoff; senders keep working through the rest of
+# the batch and pick retries up as they come due.
+def classify_smtp_error(exc):
+    if is_connection_error(exc):
+        return "connection"
+    if isinstance(exc, smtplib.SMTPRecipientsRefused):
+        codes = [code for code, _ in exc.recipients.values()]
+        return "permanent" if codes and all(code >= 500 for code in codes) else "transient"
+    if isinstance(exc, smtplib.SMTPDataError):
+        return "permanent" if exc.smtp_code >= 500 else "transient"
+    if isinstance(exc, smtplib.SMTPResponseException):
+        return "session" if exc.smtp_code >= 500 else "transient"
+    if isinstance(exc, (UnicodeError, ValueError)):
+        return "permanent"
+    return "session"
+
+
+class SendAborted(RuntimeError):
+    # Raised once a run has wound down after a "session" failure. Recipients
+    # reached before it keep their ledger records; nobody is marked rejected.
+    pass
+
+
+class DeliveryTracker:
+    def __init__(self, max_attempts=SEND_MAX_ATTEMPTS, base_delay=RETRY_BASE_DELAY, max_delay=RETRY_MAX_DELAY):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.attempts = {}  # recipient -> attempts made
+        self.outcomes = {}  # recipient -> "sent" or the final failure class
+        self.errors = {}    # recipient -> last error message
+        self.settled = {}   # outcome -> count, for recipients dropped by forget()
+        self.settled_retries = 0
+        self.aborted = None  # the first "session" failure; stops new attempts
+        self._retries = []  # heap of (due, seq, recipient, message)
+        self._seq = count()
+        self._lock = threading.Lock()
+
+    def backoff(self, attempt):
+        # "Equal jitter": at least half the exponential delay, so retries
+        # always back off, plus a random half so they do not arrive in lockstep.
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay / 2 + random.uniform(0, delay / 2)
+
+    def started(self, recipient):
+        with self._lock:
+            self.attempts[recipient] = self.attempts.get(recipient, 0) + 1
+
+    def succeeded(self, recipient):
+        with self._lock:
+            self.outcomes[recipient] = "sent"
+
+    def failed(self, recipient, message, exc):
+        # Returns the final outcome, or None if a retry was scheduled.
+        kind = classify_smtp_error(exc)
+        with self._lock:
+            self.errors[recipient] = str(exc)
+            attempts = self.attempts.get(recipient, 1)
+            if kind == "session" and self.aborted is None:
+                self.aborted = exc
+            if kind in ("permanent", "session") or attempts >= self.max_attempts:
+                self.outcomes[recipient] = kind
+                return kind
+            due = time.monotonic() + self.backoff(attempts)
+            heapq.heappush(self._retries, (due, next(self._seq), recipient, message))
+            return None
+
+    def pop_due(self):
+        with self._lock:
+            if self._retries and self.aborted is None and self._retries[0][0] <= time.monotonic():
+                _, _, recipient, message = heapq.heappop(self._retries)
+                return recipient, message
+        return None
+
+    def next_due_in(self):
+        with self._lock:
+            if not self._retries or self.aborted is not None:
+                return None
+            return max(0.0, self._retries[0][0] - time.monotonic())
+
+    def raise_if_aborted(self):
+        if self.aborted is not None:
+            raise SendAborted(f"SMTP session refused, stopping: {self.aborted}")
+
+    def forget(self, recipient):
+        # Fold a finished recipient into the totals and drop its entries, so
+        # streaming runs keep a constant-size tracker.
+        with self._lock:
+            outcome = self.outcomes.pop(recipient)
+            self.settled[outcome] = self.settled.get(outcome, 0) + 1
+            self.settled_retries += self.attempts.pop(recipient, 1) - 1
+            self.errors.pop(recipient, None)
+
+    @property
+    def delivered(self):
+        return [r for r, outcome in self.outcomes.items() if outcome == "sent"]
+
+    @property
+    def retries(self):
+        return self.settled_retries + sum(n - 1 for n in self.attempts.values())
+
+    def summary(self):
+        counts = dict(self.settled)
+        for outcome in self.outcomes.values():
+            counts[outcome] = counts.get(outcome, 0) + 1
+        return ", ".join(f"{n} {outcome}" for outcome, n in sorted(counts.items()))
+
+    def write_report(self, path, day_index):
+        # Appends one CSV row per recipient: day, address, attempts, outcome, error.
+        with open(path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.writer(f)
+            for recipient, outcome in self.outcomes.items():
+                writer.writerow([day_index + 1, recipient, self.attempts.get(recipient, 0),
+                                 outcome, self.errors.get(recipient, "") if outcome != "sent" else ""])
 
-<span style="color:#6a9955;">// 3. NEGATIVE ARRAY INDICES (like Python!)</span>
-<span style="color:#569cd6;">const</span> arr = <span style="color:#569cd6;">new</span> Proxy([1,2,3,4,5], {
-    get(target, prop) {
-        <span style="color:#569cd6;">const</span> index = Number(prop);
-        <span style="color:#569cd6;">if</span> (index < 0) <span style="color:#569cd6;">return</span> target[target.length + index];
-        <span style="color:#569cd6;">return</span> Reflect.get(target, prop);
-    }
-});
-arr[-1]; <span style="color:#6a9955;">// 5 (last element!)</span>
-        </pre>
-
-        <h4>Reflect</h4>
-        <p><code>Reflect</code> provides methods that mirror Proxy traps. It's the "default behavior" 
-        you can fall back to inside a handler.</p>
-        """,
-        "quiz": """
-        <ol>
-            <li>What is the relationship between <code>Proxy</code> traps and <code>Reflect</code> methods?</li>
-            <li>How does Vue.js 3 use Proxy for reactivity (detecting when data changes)?</li>
-            <li>Can the target object tell if it's being accessed through a Proxy?</li>
-        </ol>
-        """
-    },
-    {
-        "day": 28,
-        "phase": "Phase 6: Performance & Patterns",
-        "title": "WeakMap, WeakSet & Weak References",
-        "content": """
-        <h3>Data structures that don't prevent garbage collection</h3>
-        <p>A regular <code>Map</code> keeps strong references to its keys. 
-        Even if nothing else references the key, the Map prevents GC. 
-        <code>WeakMap</code> uses <strong>weak references</strong> — if the key is garbage collected, the entry vanishes.</p>
-
-        <h4>WeakMap</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> cache = <span style="color:#569cd6;">new</span> WeakMap();
-
-<span style="color:#569cd6;">function</span> process(obj) {
-    <span style="color:#569cd6;">if</span> (cache.has(obj)) <span style="color:#569cd6;">return</span> cache.get(obj);
-    <span style="color:#569cd6;">const</span> result = <span style="color:#6a9955;">/* expensive computation */</span> obj.data * 2;
-    cache.set(obj, result);
-    <span style="color:#569cd6;">return</span> result;
-}
 
-<span style="color:#569cd6;">let</span> myObj = { data: 42 };
-process(myObj); <span style="color:#6a9955;">// Computed and cached</span>
-process(myObj); <span style="color:#6a9955;">// From cache</span>
-
-myObj = <span style="color:#569cd6;">null</span>;   <span style="color:#6a9955;">// myObj is GC'd → WeakMap entry auto-removed! No leak!</span>
-        </pre>
-
-        <h4>WeakMap Constraints</h4>
-        <ul>
-            <li>Keys MUST be objects (not primitives).</li>
-            <li>NOT iterable (no <code>.forEach</code>, no <code>.size</code>).</li>
-            <li>Cannot be cleared entirely.</li>
-        </ul>
-
-        <h4>Real Use Cases</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// 1. PRIVATE DATA (used by many frameworks)</span>
-<span style="color:#569cd6;">const</span> privateData = <span style="color:#569cd6;">new</span> WeakMap();
-
-<span style="color:#569cd6;">class</span> User {
-    constructor(name, password) {
-        <span style="color:#569cd6;">this</span>.name = name;
-        privateData.set(<span style="color:#569cd6;">this</span>, { password }); <span style="color:#6a9955;">// Truly private!</span>
-    }
-    checkPassword(input) {
-        <span style="color:#569cd6;">return</span> privateData.get(<span style="color:#569cd6;">this</span>).password === input;
-    }
-}
-<span style="color:#569cd6;">const</span> u = <span style="color:#569cd6;">new</span> User("Alice", "secret123");
-u.password;            <span style="color:#6a9955;">// undefined — not on the object</span>
-u.checkPassword("secret123"); <span style="color:#6a9955;">// true</span>
-
-<span style="color:#6a9955;">// 2. DOM ELEMENT METADATA</span>
-<span style="color:#569cd6;">const</span> metadata = <span style="color:#569cd6;">new</span> WeakMap();
-<span style="color:#569cd6;">const</span> btn = document.querySelector('#btn');
-metadata.set(btn, { clicks: 0 });
-<span style="color:#6a9955;">// If btn is removed from DOM and dereferenced,
-// the metadata is automatically cleaned up.</span>
-        </pre>
-
-        <h4>WeakSet</h4>
-        <p>Same concept: stores objects weakly. Perfect for tracking "has this object been seen before?" 
-        without preventing garbage collection.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> visited = <span style="color:#569cd6;">new</span> WeakSet();
-<span style="color:#569cd6;">function</span> track(obj) {
-    <span style="color:#569cd6;">if</span> (visited.has(obj)) { console.log("Already seen"); <span style="color:#569cd6;">return</span>; }
-    visited.add(obj);
-    console.log("First visit");
-}
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>Why can't WeakMap keys be primitive values (strings, numbers)?</li>
-            <li>Why is WeakMap not iterable? (Think about what garbage collection means for iteration)</li>
-            <li>How would you use a WeakMap to implement a caching decorator for API calls?</li>
-        </ol>
-        """
-    },
-    {
-        "day": 29,
-        "phase": "Phase 6: Performance & Patterns",
-        "title": "Web Workers & Multithreading",
-        "content": """
-        <h3>Running JavaScript off the main thread</h3>
-        <p>Heavy computation (image processing, data parsing, crypto) blocks the main thread and freezes the UI. 
-        <strong>Web Workers</strong> let you run JS in a separate background thread.</p>
-
-        <h4>Key Constraints</h4>
-        <ul>
-            <li>Workers have NO access to the DOM.</li>
-            <li>Workers have NO access to <code>window</code>, <code>document</code>, or <code>localStorage</code>.</li>
-            <li>Communication happens via <strong>message passing</strong> (<code>postMessage</code>).</li>
-            <li>Data is COPIED (structured clone), not shared (unless using SharedArrayBuffer).</li>
-        </ul>
-
-        <h4>Basic Example</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// main.js</span>
-<span style="color:#569cd6;">const</span> worker = <span style="color:#569cd6;">new</span> Worker('worker.js');
-
-worker.postMessage({ numbers: [1,2,3,4,5] }); <span style="color:#6a9955;">// Send data TO worker</span>
-
-worker.onmessage = (event) => {
-    console.log("Result:", event.data); <span style="color:#6a9955;">// Receive data FROM worker</span>
-};
-
-worker.onerror = (error) => {
-    console.error("Worker error:", error.message);
-};
-        </pre>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#6a9955;">// worker.js</span>
-self.onmessage = (event) => {
-    <span style="color:#569cd6;">const</span> { numbers } = event.data;
-    
-    <span style="color:#6a9955;">// Heavy computation happens here — doesn't block UI!</span>
-    <span style="color:#569cd6;">const</span> sum = numbers.reduce((a, b) => a + b, 0);
-    
-    self.postMessage(sum); <span style="color:#6a9955;">// Send result back to main thread</span>
-};
-        </pre>
-
-        <h4>Inline Worker (No separate file)</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> code = <span style="color:#ce9178;">`
-    self.onmessage = (e) => {
-        const result = e.data * 2;
-        self.postMessage(result);
-    };
-`</span>;
-<span style="color:#569cd6;">const</span> blob = <span style="color:#569cd6;">new</span> Blob([code], { type: 'application/javascript' });
-<span style="color:#569cd6;">const</span> worker = <span style="color:#569cd6;">new</span> Worker(URL.createObjectURL(blob));
-worker.postMessage(21);
-worker.onmessage = (e) => console.log(e.data); <span style="color:#6a9955;">// 42</span>
-        </pre>
-
-        <h4>Transferable Objects (Zero-Copy)</h4>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">const</span> buffer = <span style="color:#569cd6;">new</span> ArrayBuffer(1024 * 1024); <span style="color:#6a9955;">// 1MB</span>
-worker.postMessage(buffer, [buffer]); <span style="color:#6a9955;">// Transfer, not copy!</span>
-console.log(buffer.byteLength); <span style="color:#6a9955;">// 0 — ownership transferred to worker</span>
-        </pre>
-        """,
-        "quiz": """
-        <ol>
-            <li>Why can't a Web Worker access the DOM?</li>
-            <li>What is the difference between <code>postMessage</code> (copying) and Transferable Objects?</li>
-            <li>When would you use a Web Worker vs. <code>requestIdleCallback</code> for background tasks?</li>
-        </ol>
-        """
-    },
-    {
-        "day": 30,
-        "phase": "Phase 6: Performance & Patterns",
-        "title": "Design Patterns: Factory, Observer, Singleton",
-        "content": """
-        <h3>Reusable solutions to common problems</h3>
-
-        <h4>1. Factory Pattern</h4>
-        <p>Creates objects without using <code>new</code>. Useful when object creation is complex or conditional.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">function</span> createUser(type) {
-    <span style="color:#569cd6;">switch</span>(type) {
-        <span style="color:#569cd6;">case</span> 'admin':
-            <span style="color:#569cd6;">return</span> { role: 'admin', permissions: ['read','write','delete'] };
-        <span style="color:#569cd6;">case</span> 'viewer':
-            <span style="color:#569cd6;">return</span> { role: 'viewer', permissions: ['read'] };
-        <span style="color:#569cd6;">default</span>:
-            <span style="color:#569cd6;">throw new</span> Error('Unknown type');
-    }
-}
-<span style="color:#569cd6;">const</span> admin = createUser('admin');
-        </pre>
-
-        <h4>2. Observer Pattern (Pub/Sub)</h4>
-        <p>One-to-many relationship: when one object changes state, all dependents are notified. 
-        This is how event systems work.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">class</span> EventEmitter {
-    constructor() { <span style="color:#569cd6;">this</span>.events = {}; }
-    
-    on(event, callback) {
-        <span style="color:#569cd6;">if</span> (!<span style="color:#569cd6;">this</span>.events[event]) <span style="color:#569cd6;">this</span>.events[event] = [];
-        <span style="color:#569cd6;">this</span>.events[event].push(callback);
-        <span style="color:#569cd6;">return</span> <span style="color:#569cd6;">this</span>; <span style="color:#6a9955;">// For chaining</span>
-    }
-    
-    emit(event, ...args) {
-        (<span style="color:#569cd6;">this</span>.events[event] || []).forEach(cb => cb(...args));
-    }
-    
-    off(event, callback) {
-        <span style="color:#569cd6;">this</span>.events[event] = (<span style="color:#569cd6;">this</span>.events[event] || [])
-            .filter(cb => cb !== callback);
-    }
-}
+# =====================================================
+# SEND LEDGER
+# =====================================================
+# Durable record of what each run delivered, so a re-run, an overlapping
+# run or a resume after a crash never sends the same lesson twice.
+#
+#   ledger.log  append-only 20-byte records: key:u64 day:u16 status:u8 pad
+#               time:u32 crc32:u32, where key hashes (address, day)
+#   ledger.idx  memory-mapped open-addressing hash table key -> status,
+#               with a header saying how much of the log it covers
+#   ledger.lock flock()ed for the whole run
+#
+# A lookup is one or two probes into the mapped table. On open, only the
+# log tail the index has not seen yet is replayed, and a torn final record
+# from a crash is cut off. If the index is missing or claims more log than
+# exists, it is rebuilt from the log.
+LEDGER_SENT = 1
+LEDGER_FAILED = 2    # transient failure or aborted run; the next run tries again
+LEDGER_REJECTED = 3  # permanent failure; not retried
+
+
+class LedgerLocked(RuntimeError):
+    pass
+
+
+class SendLedger:
+    RECORD = struct.Struct("<QHBxI")
+    CRC = struct.Struct("<I")
+    RECORD_SIZE = RECORD.size + CRC.size
+    INDEX_MAGIC = b"JSLEDG01"
+    INDEX_HEADER = struct.Struct("<8sQQQ")  # magic, capacity, entries, log bytes indexed
+    SLOT = struct.Struct("<QB7x")
+
+    def __init__(self, root=LEDGER_DIR, fsync_every=LEDGER_FSYNC_EVERY, wait=False):
+        # wait=True blocks on the run lock instead of raising LedgerLocked.
+        self.root = root
+        self.fsync_every = fsync_every
+        self.wait = wait
+        self._lock = threading.Lock()
+        self._lock_file = None
+        self._log_fd = None
+        self._map = None
+        self._unsynced = 0
+
+    @staticmethod
+    def key(address, day_index):
+        digest = hashlib.blake2b(f"{address.lower()}\0{day_index}".encode("utf-8"), digest_size=8).digest()
+        return int.from_bytes(digest, "little") or 1  # 0 marks an empty slot
+
+    # --- lifecycle ---
+
+    def open(self):
+        os.makedirs(self.root, exist_ok=True)
+        self._lock_file = open(os.path.join(self.root, "ledger.lock"), "a")
+        try:
+            fcntl.flock(self._lock_file, fcntl.LOCK_EX if self.wait else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            self._lock_file.close()
+            self._lock_file = None
+            raise LedgerLocked(f"another run holds {self.root}/ledger.lock")
+
+        log_path = os.path.join(self.root, "ledger.log")
+        self._log_fd = os.open(log_path, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        log_size = os.fstat(self._log_fd).st_size
+        self._open_index(log_size)
+        self._replay(self._indexed_bytes, log_size)
+        return self
+
+    def close(self):
+        if self._log_fd is not None:
+            os.fsync(self._log_fd)
+            os.close(self._log_fd)
+            self._log_fd = None
+        if self._map is not None:
+            self._map.flush()
+            self._map.close()
+            self._map = None
+        if self._lock_file is not None:
+            self._lock_file.close()  # releases the flock
+            self._lock_file = None
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # --- index ---
+
+    def _index_path(self):
+        return os.path.join(self.root, "ledger.idx")
+
+    def _map_index(self):
+        with open(self._index_path(), "r+b") as f:
+            self._map = mmap.mmap(f.fileno(), 0)
+        _, self.capacity, self.entries, self._indexed_bytes = self.INDEX_HEADER.unpack_from(self._map)
+
+    def _create_index(self, capacity, slots=()):
+        path = self._index_path()
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.truncate(self.INDEX_HEADER.size + capacity * self.SLOT.size)
+        with open(tmp, "r+b") as f:
+            table = mmap.mmap(f.fileno(), 0)
+            self.INDEX_HEADER.pack_into(table, 0, self.INDEX_MAGIC, capacity, 0, 0)
+            table.close()
+        os.replace(tmp, path)
+        if self._map is not None:
+            self._map.close()
+        self._map_index()
+        for key, status in slots:
+            self._put(key, status)
+
+    def _open_index(self, log_size):
+        try:
+            self._map_index()
+            magic = self._map[:8]
+        except (OSError, ValueError, struct.error):
+            magic = None
+        if magic != self.INDEX_MAGIC or self._indexed_bytes > log_size:
+            records = log_size // self.RECORD_SIZE
+            capacity = 1024
+            while capacity < records * 2:
+                capacity *= 2
+            self._create_index(capacity)
+
+    def _find(self, key):
+        mask = self.capacity - 1
+        slot = key & mask
+        while True:
+            offset = self.INDEX_HEADER.size + slot * self.SLOT.size
+            found, status = self.SLOT.unpack_from(self._map, offset)
+            if found == key or found == 0:
+                return offset, found, status
+            slot = (slot + 1) & mask
+
+    def _put(self, key, status):
+        offset, found, _ = self._find(key)
+        if found == 0:
+            if (self.entries + 1) * 2 > self.capacity:
+                self._grow()
+                offset, _, _ = self._find(key)
+            self.entries += 1
+        self.SLOT.pack_into(self._map, offset, key, status)
+
+    def _grow(self):
+        slots = []
+        for slot in range(self.capacity):
+            key, status = self.SLOT.unpack_from(self._map, self.INDEX_HEADER.size + slot * self.SLOT.size)
+            if key:
+                slots.append((key, status))
+        indexed = self._indexed_bytes
+        self.entries = 0
+        self._create_index(self.capacity * 2, slots)
+        self._set_indexed(indexed)
+
+    def _set_indexed(self, log_bytes):
+        self._indexed_bytes = log_bytes
+        self.INDEX_HEADER.pack_into(self._map, 0, self.INDEX_MAGIC, self.capacity, self.entries, log_bytes)
+
+    def _replay(self, start, end):
+        position = start
+        with open(os.path.join(self.root, "ledger.log"), "rb") as f:
+            f.seek(start)
+            while position + self.RECORD_SIZE <= end:
+                raw = f.read(self.RECORD_SIZE)
+                body, (crc,) = raw[:self.RECORD.size], self.CRC.unpack(raw[self.RECORD.size:])
+                if zlib.crc32(body) != crc:
+                    break
+                key, _, status, _ = self.RECORD.unpack(body)
+                self._put(key, status)
+                position += self.RECORD_SIZE
+        if position < end:
+            os.ftruncate(self._log_fd, position)  # torn write from a crash
+        self._set_indexed(position)
+
+    # --- public API ---
+
+    def status(self, address, day_index):
+        with self._lock:  # record() may be remapping the index
+            return self._find(self.key(address, day_index))[2]
+
+    def already_sent(self, address, day_index):
+        return self.status(address, day_index) == LEDGER_SENT
+
+    def record(self, address, day_index, status):
+        key = self.key(address, day_index)
+        body = self.RECORD.pack(key, day_index, status, int(time.time()))
+        with self._lock:
+            # Log first, index second: after a crash the log is the truth and
+            # the index is brought up to date from it.
+            os.write(self._log_fd, body + self.CRC.pack(zlib.crc32(body)))
+            self._put(key, status)
+            self._set_indexed(self._indexed_bytes + self.RECORD_SIZE)
+            self._unsynced += 1
+            if self._unsynced >= self.fsync_every:
+                os.fsync(self._log_fd)
+                self._unsynced = 0
+
+
+# =====================================================
+# LOCAL SMTP SINK
+# =====================================================
+class LocalSMTPSink:
+    # Minimal in-process SMTP server that accepts and discards everything.
+    # Speaks just enough ESMTP for smtplib (no STARTTLS), and can add a fixed
+    # delay to every reply to stand in for network round-trips.
+    def __init__(self, host="127.0.0.1", port=0, latency=0.0):
+        sink = self
+        self.latency = latency
+        self.messages = 0
+        self.sessions = 0
+        self._lock = threading.Lock()
+
+        class Handler(socketserver.StreamRequestHandler):
+            # Each reply goes out in one write with Nagle off; a reply split
+            # across writes stalls on the client's delayed ACK (~40 ms).
+            disable_nagle_algorithm = True
+
+            def reply(self, *lines):
+                if sink.latency:
+                    time.sleep(sink.latency)
+                self.wfile.write("".join(f"{line}\r\n" for line in lines).encode("ascii"))
+
+            def handle(self):
+                with sink._lock:
+                    sink.sessions += 1
+                try:
+                    self.converse()
+                except ConnectionError:
+                    pass  # client went away mid-session
+
+            def converse(self):
+                self.reply("220 localhost ESMTP sink")
+                for raw in self.rfile:
+                    verb = raw[:4].upper()
+                    if verb == b"EHLO":
+                        self.reply("250-localhost", "250-8BITMIME", "250 AUTH PLAIN LOGIN")
+                    elif verb == b"AUTH":
+                        self.reply("235 2.7.0 Authentication successful")
+                    elif verb == b"DATA":
+                        self.reply("354 End data with <CR><LF>.<CR><LF>")
+                        for line in self.rfile:
+                            if line == b".\r\n":
+                                break
+                        with sink._lock:
+                            sink.messages += 1
+                        self.reply("250 2.0.0 Ok: queued")
+                    elif verb == b"QUIT":
+                        self.reply("221 2.0.0 Bye")
+                        return
+                    else:
+                        self.reply("250 2.0.0 Ok")
+
+        class Server(socketserver.ThreadingTCPServer):
+            allow_reuse_address = True
+            daemon_threads = True
+
+        self.server = Server((host, port), Handler)
+        self.host, self.port = self.server.server_address[:2]
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
 
-<span style="color:#569cd6;">const</span> emitter = <span style="color:#569cd6;">new</span> EventEmitter();
-emitter.on('userLogin', (user) => console.log(<span style="color:#ce9178;">`Welcome </span><span style="color:#569cd6;">${user}</span><span style="color:#ce9178;">`</span>));
-emitter.on('userLogin', (user) => analytics.track(user));
-emitter.emit('userLogin', 'Alice'); <span style="color:#6a9955;">// Both handlers fire</span>
-        </pre>
-
-        <h4>3. Singleton Pattern</h4>
-        <p>Ensures a class has only ONE instance globally.</p>
-        <pre style="background:#1e1e1e; color:#d4d4d4; padding:15px; border-radius:6px;">
-<span style="color:#569cd6;">class</span> Database {
-    constructor() {
-        <span style="color:#569cd6;">if</span> (Database.instance) <span style="color:#569cd6;">return</span> Database.instance;
-        <span style="color:#569cd6;">this</span>.connection = "connected";
-        Database.instance = <span style="color:#569cd6;">this</span>;
+# =====================================================
+# BENCHMARKS
+# =====================================================
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(round(q / 100 * (len(sorted_values) - 1))))]
+
+
+def latency_stats(samples, elapsed=None):
+    samples = sorted(samples)
+    elapsed = elapsed if elapsed is not None else sum(samples)
+    return {
+        "count": len(samples),
+        "seconds": round(elapsed, 6),
+        "per_sec": round(len(samples) / elapsed, 1) if elapsed else None,
+        "p50_ms": round(percentile(samples, 50) * 1e3, 4),
+        "p95_ms": round(percentile(samples, 95) * 1e3, 4),
+        "p99_ms": round(percentile(samples, 99) * 1e3, 4),
     }
-}
 
-<span style="color:#569cd6;">const</span> db1 = <span style="color:#569cd6;">new</span> Database();
-<span style="color:#569cd6;">const</span> db2 = <span style="color:#569cd6;">new</span> Database();
-console.log(db1 === db2); <span style="color:#6a9955;">// true — same instance!</span>
-
-<span style="color:#6a9955;">// Modern ES Module Singleton (simpler):</span>
-<span style="color:#6a9955;">// Since ES modules are cached after first import,</span>
-<span style="color:#6a9955;">// exporting an instance IS a singleton.</span>
-<span style="color:#6a9955;">// db.js</span>
-<span style="color:#569cd6;">export const</span> db = <span style="color:#569cd6;">new</span> Database();
-        </pre>
-
-        <h3 style="text-align:center; margin-top: 30px;">🎉 Congratulations!</h3>
-        <p style="text-align:center;">You have completed the 30-day Advanced JavaScript Deep Dive. 
-        You now understand how the engine works internally, how memory is managed, 
-        and how to write performant, well-structured code. Keep building!</p>
-        """,
-        "quiz": """
-        <ol>
-            <li>What is the main advantage of the Factory Pattern over using <code>new</code> directly?</li>
-            <li>How is the Observer Pattern different from simply calling functions directly? What problem does it solve?</li>
-            <li>Why is the ES Module singleton considered better than the class-based singleton pattern?</li>
-        </ol>
-        """
+
+BENCH_SENDER = "bench@example.com"
+
+
+class TimedPool:
+    # Wraps a pool so every sendmail() call is timed; the delivery code under
+    # test is the real one. The envelope sender is always BENCH_SENDER, so the
+    # bench does not depend on EMAIL_ADDRESS being set.
+    def __init__(self, pool):
+        self.pool = pool
+        self.size = pool.size
+        self.samples = []
+
+    def sendmail(self, sender, recipient, message):
+        start = time.perf_counter()
+        self.pool.sendmail(BENCH_SENDER, recipient, message)
+        self.samples.append(time.perf_counter() - start)
+
+
+def _check_sink(sink, before, expected, strategy):
+    # A strategy that fails every send would otherwise report 0 ops/s and
+    # look merely slow.
+    received = sink.messages - before
+    if received != expected:
+        raise RuntimeError(f"bench {strategy}: the sink received {received} of {expected} messages")
+
+
+def run_benchmarks(recipients=200, rounds=5, concurrency=SMTP_CONCURRENCY, pool_size=SMTP_POOL_SIZE, latency=0.0):
+    lessons = list(CURRICULUM)
+    addresses = [f"subscriber{n}@example.com" for n in range(recipients)]
+    report = {
+        "python": sys.version.split()[0],
+        "lessons": len(lessons),
+        "recipients": recipients,
+        "sink_latency_ms": latency * 1e3,
+        "stages": {},
+        "delivery": {},
     }
-]
+
+    # --- rendering stages, each lesson `rounds` times, cold highlighter ---
+    render, mime, serialize = [], [], []
+    for _ in range(rounds):
+        _highlight_cache.clear()
+        for day_index, lesson in enumerate(lessons):
+            start = time.perf_counter()
+            render_html_body(lesson, day_index)
+            render.append(time.perf_counter() - start)
+    html_bodies = [render_html_body(lesson, i) for i, lesson in enumerate(lessons)]
+    text_bodies = [render_text_body(lesson) for lesson in lessons]
+
+    messages = []
+    for n, recipient in enumerate(addresses):
+        day_index = n % len(lessons)
+        start = time.perf_counter()
+        msg = build_message(lessons[day_index], html_bodies[day_index], recipient, text_bodies[day_index])
+        built = time.perf_counter()
+        messages.append((recipient, msg.as_string()))
+        serialized = time.perf_counter()
+        mime.append(built - start)
+        serialize.append(serialized - built)
+    factory = []
+    _message_factories.clear()
+    for n, recipient in enumerate(addresses):
+        day_index = n % len(lessons)
+        start = time.perf_counter()
+        serialize_message(lessons[day_index], html_bodies[day_index], recipient)
+        factory.append(time.perf_counter() - start)
+    report["stages"]["render"] = latency_stats(render)
+    report["stages"]["mime_build"] = latency_stats(mime)
+    report["stages"]["serialize"] = latency_stats(serialize)
+    report["stages"]["message_factory"] = latency_stats(factory)
+
+    # --- delivery strategies against a local sink ---
+    with LocalSMTPSink(latency=latency) as sink:
+        def make_pool(size):
+            return SMTPConnectionPool(size=size, host=sink.host, port=sink.port,
+                                      user="bench", password="bench", starttls=False)
+
+        # 1. What send_daily_lesson() used to do: a full session per message.
+        samples = []
+        before = sink.messages
+        start = time.perf_counter()
+        for recipient, message in messages:
+            began = time.perf_counter()
+            server = smtplib.SMTP(sink.host, sink.port, timeout=SMTP_TIMEOUT)
+            server.login("bench", "bench")
+            server.sendmail(BENCH_SENDER, recipient, message)
+            server.quit()
+            samples.append(time.perf_counter() - began)
+        report["delivery"]["connection_per_message"] = latency_stats(samples, time.perf_counter() - start)
+        _check_sink(sink, before, len(messages), "connection_per_message")
+
+        # 2. Pooled sessions, threaded sender.
+        with make_pool(pool_size) as pool:
+            timed = TimedPool(pool)
+            before = sink.messages
+            start = time.perf_counter()
+            send_to_recipients(timed, iter(messages), DeliveryTracker())
+            report["delivery"]["pooled"] = latency_stats(timed.samples, time.perf_counter() - start)
+            report["delivery"]["pooled"]["sessions"] = sum(c.connects for c in pool.connections)
+            _check_sink(sink, before, len(messages), "pooled")
+
+        # 3. asyncio dispatcher; renders MIME on the loop as in production.
+        with make_pool(concurrency) as pool:
+            timed = TimedPool(pool)
+            lesson, html_body = lessons[0], html_bodies[0]
+            before = sink.messages
+            start = time.perf_counter()
+            asyncio.run(dispatch_async(timed, lesson, html_body, addresses, DeliveryTracker(), concurrency))
+            report["delivery"]["concurrent"] = latency_stats(timed.samples, time.perf_counter() - start)
+            report["delivery"]["concurrent"]["sessions"] = sum(c.connects for c in pool.connections)
+            _check_sink(sink, before, len(addresses), "concurrent")
+
+        report["sink"] = {"messages": sink.messages, "sessions": sink.sessions}
+    return report
+
+
+def print_benchmark_report(report):
+    rows = [(f"stage/{name}", stats) for name, stats in report["stages"].items()]
+    rows += [(f"delivery/{name}", stats) for name, stats in report["delivery"].items()]
+    print(f"{'':28} {'ops/s':>10} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, stats in rows:
+        print(f"{name:28} {stats['per_sec'] or 0:>10,.0f} {stats['p50_ms']:>9.3f} "
+              f"{stats['p95_ms']:>9.3f} {stats['p99_ms']:>9.3f}")
 
 
 # =====================================================
-# EMAIL SENDER (No changes needed here)
+# EMAIL SENDER
 # =====================================================
-def send_daily_lesson():
-    today = datetime.now()
+def get_day_index(today=None):
+    today = today or datetime.now()
     delta = today - COURSE_START_DATE
-    day_index = delta.days
+    return delta.days
+
+
+def read_recipients(path):
+    # One address per line; "#" starts a comment. Read lazily.
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.split("#", 1)[0].strip()
+            if line:
+                yield line
+
+
+def get_recipients(path=None):
+    if path:
+        return list(read_recipients(path))
+    recipients = [a.strip() for a in RECIPIENT_EMAILS.split(",") if a.strip()]
+    return recipients or [RECEIVER_EMAIL]
+
+
+def build_message(lesson, html_body, recipient, text_body=None):
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = f"JS Deep Dive — {lesson['title']}"
+    msg['From'] = SENDER_EMAIL
+    if recipient is not None:
+        msg['To'] = recipient
+    # Least preferred first: clients show the last part they can render.
+    if text_body is not None:
+        msg.attach(MIMEText(text_body, 'plain', HTML_CHARSET))
+    msg.attach(MIMEText(html_body, 'html', HTML_CHARSET))
+    return msg
+
+
+class MessageFactory:
+    # The MIME tree, body encoding and boundary are the same for everyone
+    # receiving a lesson; only the To header differs. Serialize the message
+    # once without it, keep the shared headers and the transfer-encoded body
+    # as strings, and splice the recipient in between, so per-message cost
+    # does not grow with the lesson.
+    def __init__(self, lesson, html_body, text_body=None):
+        if text_body is None:
+            text_body = get_text_body(lesson)
+        msg = build_message(lesson, html_body, None, text_body)
+        # Content-derived rather than random, so output is reproducible.
+        digest = hashlib.sha1(f"{lesson['title']}\0{text_body}\0{html_body}".encode("utf-8")).hexdigest()
+        msg.set_boundary(f"=_{digest}")
+        head, _, body = msg.as_string().partition("\n\n")
+        self.head = head + "\n"
+        self.body = "\n" + body
+
+    def render(self, recipient):
+        return f"{self.head}To: {recipient}\n{self.body}"
+
+
+_message_factories = {}
+
+
+def get_message_factory(lesson, html_body, text_body=None):
+    # Keyed on the body string itself: get_html_body hands out the same
+    # object every time, and str caches its hash, so a hit is a dict lookup.
+    key = (lesson['title'], html_body)
+    factory = _message_factories.get(key)
+    if factory is None:
+        with METRICS.span("mime_build"):
+            factory = _message_factories[key] = MessageFactory(lesson, html_body, text_body)
+    return factory
+
+
+def serialize_message(lesson, html_body, recipient):
+    factory = get_message_factory(lesson, html_body)
+    with METRICS.span("serialize"):
+        return factory.render(recipient)
+
+
+def render_message(job):
+    day_index, recipient = job
+    lesson = CURRICULUM[day_index]
+    html_body = get_html_body(lesson, day_index)
+    return serialize_message(lesson, html_body, recipient)
+
+
+def render_messages(jobs, workers=RENDER_WORKERS, chunksize=None):
+    # Yields rendered messages in job order. Rendering is pure Python, so large
+    # batches are fanned out to worker processes in big chunks: one pickle
+    # round-trip per chunk instead of per message keeps start-up and IPC
+    # cost small next to the rendering itself.
+    jobs = list(jobs)
+    if workers <= 1 or len(jobs) < 2:
+        yield from map(render_message, jobs)
+        return
+    chunksize = chunksize or max(1, math.ceil(len(jobs) / (workers * 4)))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(render_message, jobs, chunksize=chunksize)
+
+
+_output_lock = threading.Lock()
+
+
+def deliver(pool, tracker, recipient, message, on_result=None):
+    # One attempt. Failures are handed to the tracker, which either schedules
+    # a retry or settles the recipient; on_result only sees final outcomes.
+    tracker.started(recipient)
+    try:
+        pool.sendmail(SENDER_EMAIL, recipient, message)
+    except Exception as e:
+        outcome = tracker.failed(recipient, message, e)
+        if outcome:
+            with _output_lock:
+                print(f"❌ Error ({recipient}, {outcome}, {tracker.attempts[recipient]} attempt(s)): {e}")
+    else:
+        tracker.succeeded(recipient)
+        outcome = "sent"
+    if outcome and on_result:
+        on_result(recipient, outcome)
+
+
+def send_to_recipients(pool, messages, tracker, on_result=None):
+    # Threaded pooled sending. New messages and due retries share the same
+    # workers; at most two messages per session are queued at any time.
+    lock = threading.Lock()
+    slots = threading.Semaphore(pool.size * 2)
+    active = 0
+
+    def attempt(recipient, message):
+        deliver(pool, tracker, recipient, message, on_result)
+
+    def finished(_):
+        nonlocal active
+        with lock:
+            active -= 1
+        slots.release()
+
+    def submit(item):
+        nonlocal active
+        slots.acquire()
+        with lock:
+            active += 1
+        executor.submit(attempt, *item).add_done_callback(finished)
+
+    with ThreadPoolExecutor(max_workers=pool.size) as executor:
+        for item in messages:
+            if tracker.aborted:
+                break
+            retry = tracker.pop_due()
+            while retry:
+                submit(retry)
+                retry = tracker.pop_due()
+            submit(item)
+        # Drain: keep feeding retries until none are pending or in flight.
+        while True:
+            retry = tracker.pop_due()
+            if retry:
+                submit(retry)
+                continue
+            wait = tracker.next_due_in()
+            with lock:
+                idle = active == 0
+            if wait is None and idle:
+                break
+            time.sleep(min(wait if wait is not None else 0.05, 0.05))
+    return tracker.delivered
+
+
+async def dispatch_async(pool, lesson, html_body, recipients, tracker, concurrency=SMTP_CONCURRENCY, on_result=None):
+    # Each worker renders its next message on the event loop, then hands the
+    # blocking SMTP conversation to a thread. While up to `concurrency`
+    # conversations are in flight, the loop keeps building MIME messages.
+    # Due retries are taken before new recipients.
+    loop = asyncio.get_running_loop()
+    pending = iter(recipients)
+    active = 0
+
+    def next_item():
+        if tracker.aborted:
+            return None
+        retry = tracker.pop_due()
+        if retry:
+            return retry
+        for recipient in pending:
+            return recipient, serialize_message(lesson, html_body, recipient)
+        return None
+
+    async def worker():
+        nonlocal active
+        while True:
+            item = next_item()
+            if item is None:
+                wait = tracker.next_due_in()
+                if wait is None and active == 0:
+                    return
+                await asyncio.sleep(min(wait if wait is not None else 0.05, 0.05))
+                continue
+            recipient, message = item
+            tracker.started(recipient)
+            active += 1
+            try:
+                await loop.run_in_executor(executor, pool.sendmail, SENDER_EMAIL, recipient, message)
+            except Exception as e:
+                outcome = tracker.failed(recipient, message, e)
+                if outcome:
+                    print(f"❌ Error ({recipient}, {outcome}, {tracker.attempts[recipient]} attempt(s)): {e}")
+            else:
+                tracker.succeeded(recipient)
+                outcome = "sent"
+            finally:
+                active -= 1
+            if outcome and on_result:
+                on_result(recipient, outcome)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return tracker.delivered
+
+
+def send_lesson(day_index, recipients, concurrency=None, render_workers=RENDER_WORKERS, pool=None, ledger=None,
+                report=None):
+    # Returns a DeliveryTracker with per-recipient attempts and outcomes.
+    # Pass `pool` to share sessions across several lessons in one run,
+    # `ledger` to skip recipients already done and record new outcomes, and
+    # `report` to append the per-recipient outcomes to a CSV file.
+    with METRICS.span("lookup"):
+        lesson = CURRICULUM[day_index]
+    tracker = DeliveryTracker()
+    on_result = None
+    if ledger is not None:
+        pending = [r for r in recipients if ledger.status(r, day_index) not in (LEDGER_SENT, LEDGER_REJECTED)]
+        if len(pending) < len(recipients):
+            print(f"⏭️  Day {day_index + 1}: {len(recipients) - len(pending)} recipient(s) already done, skipping")
+        recipients = pending
+
+        def record_outcome(recipient, outcome):
+            status = {"sent": LEDGER_SENT, "permanent": LEDGER_REJECTED}.get(outcome, LEDGER_FAILED)
+            ledger.record(recipient, day_index, status)
+        on_result = record_outcome
+    if not recipients:
+        return tracker
+
+    html_body = get_html_body(lesson, day_index)
+    own_pool = pool is None
+
+    if concurrency:
+        concurrency = max(1, min(concurrency, len(recipients), pool.size if pool else concurrency))
+        pool = pool or SMTPConnectionPool(size=concurrency)
+        asyncio.run(dispatch_async(pool, lesson, html_body, recipients, tracker, concurrency, on_result))
+    else:
+        if render_workers > 1:
+            rendered = render_messages(((day_index, r) for r in recipients), render_workers)
+        else:
+            rendered = (serialize_message(lesson, html_body, r) for r in recipients)
+        pool = pool or SMTPConnectionPool(size=min(SMTP_POOL_SIZE, len(recipients)))
+        send_to_recipients(pool, zip(recipients, rendered), tracker, on_result)
+
+    if own_pool:
+        pool.report()
+        pool.close()
+    if report:
+        tracker.write_report(report, day_index)
+
+    delivered = len(tracker.delivered)
+    if delivered:
+        print(f"✅ Sent: {lesson['title']} (Day {day_index + 1}/{len(CURRICULUM)}) to {delivered}/{len(recipients)} recipient(s)")
+    if tracker.retries or delivered < len(recipients):
+        print(f"🔁 Day {day_index + 1}: {tracker.retries} retr{'y' if tracker.retries == 1 else 'ies'}; {tracker.summary()}")
+    tracker.raise_if_aborted()
+    return tracker
+
+
+def send_daily_lesson(recipients=None, concurrency=None, render_workers=RENDER_WORKERS, report=None,
+                      stream=None):
+    # `stream` is a (render, serialize) worker-count pair selecting the
+    # staged pipeline; `recipients` may then be a lazy iterable.
+    day_index = get_day_index()
 
     if day_index < 0:
         print("Course hasn't started yet.")
@@ -2069,53 +1996,1719 @@ def send_daily_lesson():
         print(f"Course completed! All {len(CURRICULUM)} days done. Stopping.")
         return
 
+    if recipients is None:
+        recipients = get_recipients()
+
+    try:
+        with SendLedger() as ledger:
+            if stream:
+                stream_lesson(day_index, recipients, ledger, *stream, report=report)
+            else:
+                send_lesson(day_index, recipients, concurrency, render_workers, ledger=ledger, report=report)
+    except LedgerLocked as e:
+        print(f"⏳ Not sending: {e}")
+    finally:
+        METRICS.flush()
+
+
+# =====================================================
+# STREAMING PIPELINE
+# =====================================================
+# Bulk delivery as a chain of stages joined by bounded queues:
+#
+#   recipients -> render -> serialize -> send
+#
+# Each stage has its own worker threads. A full queue blocks the stage
+# feeding it, so a slow SMTP server throttles rendering instead of letting
+# rendered messages pile up: at most queue_size items wait per stage, however
+# long the list is. Queue depths are sampled while the pipeline runs: the
+# slowest stage is the last one with a full inbox, and everything after it
+# runs near empty.
+PIPELINE_QUEUE_SIZE = int(os.environ.get("PIPELINE_QUEUE_SIZE", "256"))
+PIPELINE_REPORT_EVERY = float(os.environ.get("PIPELINE_REPORT_EVERY", "10"))
+
+_STOP = object()
+
+
+class PipelineStage:
+    def __init__(self, name, func, workers=1, queue_size=PIPELINE_QUEUE_SIZE):
+        self.name = name
+        self.func = func
+        self.workers = max(1, workers)
+        self.inbox = Queue(maxsize=max(1, queue_size))
+        self.processed = 0
+        self.errors = 0
+        self.peak_depth = 0
+        self.depth_total = 0
+        self._running = self.workers
+        self._lock = threading.Lock()
+
+    def work(self, downstream):
+        while True:
+            item = self.inbox.get()
+            if item is _STOP:
+                with self._lock:
+                    self._running -= 1
+                    last = self._running == 0
+                if last and downstream is not None:
+                    for _ in range(downstream.workers):
+                        downstream.inbox.put(_STOP)
+                return
+            try:
+                result = self.func(item)
+            except Exception as e:
+                with self._lock:
+                    self.errors += 1
+                with _output_lock:
+                    print(f"❌ {self.name}: {e}")
+                continue
+            with self._lock:
+                self.processed += 1
+            if downstream is not None and result is not None:
+                downstream.inbox.put(result)
+
+
+class StagedPipeline:
+    def __init__(self, stages, report_every=PIPELINE_REPORT_EVERY, sample_every=0.05):
+        self.stages = stages
+        self.report_every = report_every
+        self.sample_every = sample_every
+        self.samples = 0
+        self.fed = 0
+
+    def depths(self):
+        return [stage.inbox.qsize() for stage in self.stages]
+
+    def _sample(self, done):
+        last_report = time.monotonic()
+        while not done.wait(self.sample_every):
+            self.samples += 1
+            for stage, depth in zip(self.stages, self.depths()):
+                stage.peak_depth = max(stage.peak_depth, depth)
+                stage.depth_total += depth
+            if self.report_every and time.monotonic() - last_report >= self.report_every:
+                last_report = time.monotonic()
+                with _output_lock:
+                    print(f"📊 {self.stages[-1].processed:,}/{self.fed:,} done · " + " · ".join(
+                        f"{stage.name} {stage.inbox.qsize()}/{stage.inbox.maxsize}" for stage in self.stages))
+
+    def run(self, source):
+        threads = []
+        for stage, downstream in zip(self.stages, self.stages[1:] + [None]):
+            for _ in range(stage.workers):
+                thread = threading.Thread(target=stage.work, args=(downstream,), daemon=True)
+                thread.start()
+                threads.append(thread)
+        done = threading.Event()
+        sampler = threading.Thread(target=self._sample, args=(done,), daemon=True)
+        sampler.start()
+        first = self.stages[0]
+        try:
+            for item in source:
+                first.inbox.put(item)
+                self.fed += 1
+        finally:
+            for _ in range(first.workers):
+                first.inbox.put(_STOP)
+            for thread in threads:
+                thread.join()
+            done.set()
+            sampler.join()
+
+    def report(self):
+        for stage in self.stages:
+            mean = stage.depth_total / self.samples if self.samples else 0.0
+            errors = f", {stage.errors} error(s)" if stage.errors else ""
+            print(f"🧵 {stage.name}: {stage.workers} worker(s), {stage.processed:,} done{errors}; "
+                  f"queue peak {stage.peak_depth}/{stage.inbox.maxsize}, mean {mean:.1f}")
+
+
+def send_pipeline(pool, jobs, tracker, on_result=None, render_workers=1, serialize_workers=1,
+                  queue_size=PIPELINE_QUEUE_SIZE):
+    # `jobs` yields (day_index, recipient) and is consumed lazily. The send
+    # stage runs one worker per pool session and takes due retries first.
+    def render(job):
+        day_index, recipient = job
+        with METRICS.span("lookup"):
+            lesson = CURRICULUM[day_index]
+        return recipient, get_message_factory(lesson, get_html_body(lesson, day_index))
+
+    def serialize(item):
+        recipient, factory = item
+        with METRICS.span("serialize"):
+            return recipient, factory.render(recipient)
+
+    def send(item):
+        if tracker.aborted:
+            return  # drain what is already queued without sending it
+        retry = tracker.pop_due()
+        while retry:
+            deliver(pool, tracker, *retry, on_result=on_result)
+            retry = tracker.pop_due()
+        deliver(pool, tracker, *item, on_result=on_result)
+
+    pipeline = StagedPipeline([
+        PipelineStage("render", render, render_workers, queue_size),
+        PipelineStage("serialize", serialize, serialize_workers, queue_size),
+        PipelineStage("send", send, pool.size, queue_size),
+    ])
+    pipeline.run(takewhile(lambda _: tracker.aborted is None, jobs))
+    # Retries whose backoff had not expired when the last message went out.
+    send_to_recipients(pool, (), tracker, on_result)
+    pipeline.report()
+    return tracker
+
+
+def stream_lesson(day_index, recipients, ledger=None, render_workers=1, serialize_workers=1,
+                  queue_size=PIPELINE_QUEUE_SIZE, report=None):
+    # send_lesson() for lists too large to hold: `recipients` may be any
+    # iterable and is read as the pipeline drains. Without a report, finished
+    # recipients are folded into the tracker's totals as they complete.
     lesson = CURRICULUM[day_index]
-    phase = lesson.get("phase", "")
+    tracker = DeliveryTracker()
+    skipped = 0
+
+    def pending():
+        nonlocal skipped
+        for recipient in recipients:
+            if ledger is not None and ledger.status(recipient, day_index) in (LEDGER_SENT, LEDGER_REJECTED):
+                skipped += 1
+                continue
+            yield day_index, recipient
+
+    def on_result(recipient, outcome):
+        if ledger is not None:
+            ledger.record(recipient, day_index,
+                          {"sent": LEDGER_SENT, "permanent": LEDGER_REJECTED}.get(outcome, LEDGER_FAILED))
+        if not report:
+            tracker.forget(recipient)
+
+    with SMTPConnectionPool() as pool:
+        send_pipeline(pool, pending(), tracker, on_result, render_workers, serialize_workers, queue_size)
+        pool.report()
+    if report:
+        tracker.write_report(report, day_index)
+
+    if skipped:
+        print(f"⏭️  Day {day_index + 1}: {skipped} recipient(s) already done, skipping")
+    print(f"✅ Streamed: {lesson['title']} (Day {day_index + 1}/{len(CURRICULUM)}): {tracker.summary() or 'nothing to send'}")
+    if tracker.retries:
+        print(f"🔁 Day {day_index + 1}: {tracker.retries} retr{'y' if tracker.retries == 1 else 'ies'}")
+    tracker.raise_if_aborted()
+    return tracker
 
-    msg = MIMEMultipart('alternative')
-    msg['Subject'] = f"JS Deep Dive — {lesson['title']}"
-    msg['From'] = SENDER_EMAIL
-    msg['To'] = RECEIVER_EMAIL
 
-    html_body = f"""
-    <html>
-    <body style="font-family: 'Segoe UI', Arial, sans-serif; line-height: 1.7; color: #333; max-width: 700px; margin: auto; padding: 10px;">
-        
-        <div style="background-color: #f7df1e; padding: 20px; text-align: center; border-radius: 8px 8px 0 0;">
-            <h1 style="margin:0; color: #000; font-size: 26px;">JavaScript Daily</h1>
-            <p style="margin:5px 0 0 0; color: #555; font-size: 14px;">{phase}</p>
-        </div>
-        
-        <div style="background-color: #fff; padding: 25px; border: 1px solid #eee;">
-            <h2 style="color: #2c3e50; border-bottom: 2px solid #f7df1e; padding-bottom: 10px;">{lesson['title']}</h2>
-            
-            {lesson['content']}
-            
-            <div style="background-color: #f0f7ff; border-left: 4px solid #3498db; padding: 15px; margin-top: 30px; border-radius: 4px;">
-                <h3 style="color: #2980b9; margin-top: 0;">🧠 Daily Quiz</h3>
-                {lesson['quiz']}
-                <p style="font-style: italic; color: #777; font-size: 12px;">Try to answer before looking anything up. Write your answers down.</p>
-            </div>
-        </div>
+# =====================================================
+# MAILDIR SPOOL
+# =====================================================
+# Dry run: the full render and serialization path, written to a Maildir
+# instead of an SMTP server. Each batch is written into tmp/, every file is
+# fsynced, then renamed into new/ and the directory synced once, so a crash
+# never leaves a half-written message in new/. File names are derived from
+# day and recipient, and boundaries from content, so two spools of the same
+# input can be compared with `diff -r`.
+SPOOL_BATCH_SIZE = int(os.environ.get("SPOOL_BATCH_SIZE", "500"))
 
-        <div style="text-align: center; padding: 15px; font-size: 13px; color: #888; background-color: #f9f9f9; border-radius: 0 0 8px 8px; border: 1px solid #eee; border-top: 0;">
-            Day {day_index + 1} of {len(CURRICULUM)} • Automated via GitHub Actions
-        </div>
-    </body>
-    </html>
-    """
 
-    msg.attach(MIMEText(html_body, 'html'))
+def parse_days(spec):
+    # "1-5,9" -> [0, 1, 2, 3, 4, 8]; days are 1-based like the course.
+    days = []
+    for part in spec.split(","):
+        first, _, last = part.partition("-")
+        days.extend(range(int(first) - 1, int(last or first)))
+    return [d for d in days if 0 <= d < len(CURRICULUM)]
+
 
+def spool_file_name(day_index, recipient):
+    return f"day{day_index + 1:02d}.{quote(recipient, safe='@.+-_')}.eml"
+
+
+def _sync_directory(path):
+    fd = os.open(path, os.O_RDONLY)
     try:
-        server = smtplib.SMTP('smtp.gmail.com', 587)
-        server.starttls()
-        server.login(SENDER_EMAIL, EMAIL_PASSWORD)
-        server.sendmail(SENDER_EMAIL, RECEIVER_EMAIL, msg.as_string())
-        server.quit()
-        print(f"✅ Sent: {lesson['title']} (Day {day_index + 1}/{len(CURRICULUM)})")
-    except Exception as e:
-        print(f"❌ Error: {e}")
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def spool_messages(root, day_indexes, recipients, batch_size=SPOOL_BATCH_SIZE):
+    for sub in ("tmp", "new", "cur"):
+        os.makedirs(os.path.join(root, sub), exist_ok=True)
+    jobs = ((d, r) for d in day_indexes for r in recipients)
+    written = total_bytes = 0
+    render_seconds = write_seconds = 0.0
+
+    for batch in batched(jobs, batch_size):
+        start = time.perf_counter()
+        rendered = []
+        for day_index, recipient in batch:
+            lesson = CURRICULUM[day_index]
+            message = serialize_message(lesson, get_html_body(lesson, day_index), recipient)
+            rendered.append((spool_file_name(day_index, recipient), message.encode("utf-8")))
+        render_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        for name, data in rendered:
+            with open(os.path.join(root, "tmp", name), "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            total_bytes += len(data)
+        for name, _ in rendered:
+            os.replace(os.path.join(root, "tmp", name), os.path.join(root, "new", name))
+        _sync_directory(os.path.join(root, "new"))
+        write_seconds += time.perf_counter() - start
+        written += len(rendered)
+
+    if not written:
+        print("Nothing to spool.")
+        return written
+    print(f"📂 Spooled {written:,} message(s), {total_bytes / 1024:,.0f} KB, into {os.path.join(root, 'new')}")
+    for label, seconds in (("render+serialize", render_seconds), ("write+sync", write_seconds)):
+        print(f"   {label:17} {seconds:.2f}s ({written / max(seconds, 1e-9):,.0f} msg/s)")
+    return written
+
+
+# =====================================================
+# DIGESTS
+# =====================================================
+# Several lessons in one email: a table of contents, then each lesson as a
+# section with its own anchor, then all quizzes. Every section is a cached
+# per-lesson fragment (highlighted and optimized once, like a daily body),
+# and the plain-text part is the lessons' cached text bodies, so assembling
+# a digest is string joins. Digests go out when the week or phase they cover
+# ends, to DIGEST_EMAILS or a recipient file.
+DIGEST_EMAILS = os.environ.get("DIGEST_EMAILS", "")
+DIGEST_SECTION = (
+    '<h2 id="day-{day}" style="color: #2c3e50; border-bottom: 2px solid #f7df1e; padding-bottom: 10px; '
+    'margin-top: 40px;">Day {day}: {title}</h2>\n{content}'
+)
+
+
+def render_lesson_fragment(lesson, day_index):
+    fragment = DIGEST_SECTION.format(day=day_index + 1, title=lesson['title'],
+                                     content=highlight_code_blocks(lesson['content']))
+    return optimize_html(fragment) if OPTIMIZE_HTML else fragment
+
+
+def fragment_cache_key(lesson, day_index):
+    h = hashlib.sha256()
+    h.update(json.dumps(lesson, sort_keys=True).encode("utf-8"))
+    h.update(DIGEST_SECTION.encode("utf-8"))
+    h.update(f"highlight:{HIGHLIGHTER_VERSION}:{sorted(HIGHLIGHT_COLORS.items())}".encode("utf-8"))
+    h.update(f"optimize:{OPTIMIZER_VERSION if OPTIMIZE_HTML else 0}:day:{day_index + 1}".encode("ascii"))
+    return h.hexdigest()
+
+
+def get_lesson_fragment(lesson, day_index):
+    return _read_through(fragment_cache_key(lesson, day_index), ".section.html",
+                         lambda: render_lesson_fragment(lesson, day_index))
+
+
+def digest_groups(by):
+    # [(title, [day_index, ...]), ...] covering the whole course.
+    if by == "week":
+        return [(f"Week {n + 1}", list(range(start, min(start + 7, len(CURRICULUM)))))
+                for n, start in enumerate(range(0, len(CURRICULUM), 7))]
+    phases = OrderedDict()
+    for day_index, lesson in enumerate(CURRICULUM):
+        phases.setdefault(lesson.get("phase", ""), []).append(day_index)
+    return list(phases.items())
+
+
+def render_digest(day_indexes, title):
+    # Returns (lesson-shaped header dict, html_body, text_body).
+    lessons = [(d, CURRICULUM[d]) for d in day_indexes]
+    phases = " / ".join(OrderedDict.fromkeys(lesson.get("phase", "") for _, lesson in lessons))
+    toc = "<ol>" + "".join(f'<li><a href="#day-{d + 1}">Day {d + 1}: {lesson["title"]}</a></li>'
+                           for d, lesson in lessons) + "</ol>"
+    html_body = EMAIL_TEMPLATE.format(
+        phase=phases,
+        title=title,
+        content=toc + "".join(get_lesson_fragment(lesson, d) for d, lesson in lessons),
+        quiz="".join(f"<h4>Day {d + 1}: {lesson['title']}</h4>{lesson['quiz']}" for d, lesson in lessons),
+        day=day_indexes[-1] + 1,
+        total=len(CURRICULUM),
+    )
+    if OPTIMIZE_HTML:
+        html_body = optimize_html(html_body)
+
+    rule = "\n\n" + "#" * TEXT_WIDTH + "\n\n"
+    contents = "\n".join(f"  Day {d + 1}: {lesson['title']}" for d, lesson in lessons)
+    text_body = f"{title}\n{'=' * len(title)}\n\nContents\n\n{contents}" + rule + rule.join(
+        get_text_body(lesson) for _, lesson in lessons)
+    return {"phase": phases, "title": title}, html_body, text_body
+
+
+def send_combined(pool, ledger, day_indexes, recipients, title, report=None):
+    # One message per recipient covering every day in day_indexes; recipients
+    # the ledger already has for all of them are skipped, and a delivery is
+    # recorded against each day.
+    recipients = [r for r in recipients
+                  if not all(ledger.status(r, d) in (LEDGER_SENT, LEDGER_REJECTED) for d in day_indexes)]
+    tracker = DeliveryTracker()
+    if not recipients:
+        return tracker
+    lesson, html_body, text_body = render_digest(day_indexes, title)
+    factory = get_message_factory(lesson, html_body, text_body)
+
+    def on_result(recipient, outcome):
+        status = {"sent": LEDGER_SENT, "permanent": LEDGER_REJECTED}.get(outcome, LEDGER_FAILED)
+        for day_index in day_indexes:
+            ledger.record(recipient, day_index, status)
+
+    send_to_recipients(pool, ((r, factory.render(r)) for r in recipients), tracker, on_result)
+    if report:
+        tracker.write_report(report, day_indexes[-1])
+    print(f"✅ Sent: {title} ({len(day_indexes)} lessons) to {len(tracker.delivered)}/{len(recipients)} recipient(s)")
+    tracker.raise_if_aborted()
+    return tracker
+
+
+def send_digest(by, recipients, group=None, report=None):
+    # Without `group`, sends the digest whose last day is today's lesson.
+    groups = digest_groups(by)
+    if group is not None:
+        if not 1 <= group <= len(groups):
+            print(f"There are {len(groups)} {by} digests.")
+            return
+        title, days = groups[group - 1]
+    else:
+        today = get_day_index()
+        due = [(title, days) for title, days in groups if days[-1] == today]
+        if not due:
+            print(f"No {by} digest due today.")
+            return
+        title, days = due[0]
+    if not recipients:
+        print("No digest subscribers.")
+        return
+    try:
+        with SendLedger() as ledger, SMTPConnectionPool(size=min(SMTP_POOL_SIZE, len(recipients))) as pool:
+            send_combined(pool, ledger, days, recipients, f"{'Weekly' if by == 'week' else 'Phase'} digest: {title}",
+                          report)
+            pool.report()
+    except LedgerLocked as e:
+        print(f"⏳ Not sending: {e}")
+
+
+# =====================================================
+# CATCH-UP
+# =====================================================
+# Missed days are read from the send ledger: for every recipient, each day
+# since their own first record that has no SENT or REJECTED entry, so a
+# newly added address starts from the day it joined and an address with no
+# records at all is left alone. The
+# backlog goes out over a single SMTP session, either one message per missed
+# day (oldest first) or one combined message per recipient. Each missed day,
+# or each distinct set of missed days, is rendered once however many
+# recipients share it. Combined messages are digests (see send_combined).
+def first_recorded_day(ledger, recipient, until):
+    # The recipient's earliest day with any ledger record, or None.
+    for day_index in range(until):
+        if ledger.status(recipient, day_index):
+            return day_index
+    return None
+
+
+def missed_days(ledger, recipients, first_day=None, today=None):
+    # Returns {recipient: [day_index, ...]} for recipients with a backlog.
+    # An explicit first_day applies to everyone, with or without history.
+    today = min(get_day_index() if today is None else today, len(CURRICULUM))
+    backlog = {}
+    for recipient in recipients:
+        start = first_day if first_day is not None else first_recorded_day(ledger, recipient, today)
+        if start is None:
+            continue
+        missing = [d for d in range(max(0, start), today)
+                   if ledger.status(recipient, d) not in (LEDGER_SENT, LEDGER_REJECTED)]
+        if missing:
+            backlog[recipient] = missing
+    return backlog
+
+
+def catch_up(recipients, combined=False, first_day=None, report=None):
+    try:
+        with SendLedger() as ledger:
+            backlog = missed_days(ledger, recipients, first_day)
+            if not backlog:
+                print("Nothing to catch up on.")
+                return
+            print(f"📚 {len(backlog)} recipient(s) missed {sum(map(len, backlog.values()))} lesson(s)")
+            with SMTPConnectionPool(size=1) as pool:
+                if combined:
+                    _send_combined(pool, ledger, backlog, report)
+                else:
+                    by_day = {}
+                    for recipient, days in backlog.items():
+                        for day_index in days:
+                            by_day.setdefault(day_index, []).append(recipient)
+                    for day_index in sorted(by_day):
+                        send_lesson(day_index, by_day[day_index], pool=pool, ledger=ledger, report=report)
+                pool.report()
+    except LedgerLocked as e:
+        print(f"⏳ Not sending: {e}")
+
+
+def _send_combined(pool, ledger, backlog, report=None):
+    groups = {}
+    for recipient, days in backlog.items():
+        groups.setdefault(tuple(days), []).append(recipient)
+    for days, recipients in groups.items():
+        if len(days) == 1:
+            send_lesson(days[0], recipients, pool=pool, ledger=ledger, report=report)
+        else:
+            send_combined(pool, ledger, list(days), recipients,
+                          f"Catch-up: Days {', '.join(str(d + 1) for d in days)}", report)
+
+
+# =====================================================
+# SEARCH INDEX
+# =====================================================
+# Inverted index over every lesson's title, phase, content and quiz, with
+# markup stripped. Terms are lowercased identifier-ish words, so "TurboFan",
+# "setTimeout" and "__proto__" are single terms. Ranking is BM25 with the
+# title and phase counted several times over; a query word also matches
+# longer terms it prefixes ("closure" finds "closures"). The index stores
+# each lesson's content hash and is rebuilt only when one of them changes.
+SEARCH_INDEX = os.environ.get("SEARCH_INDEX", os.path.join(BASE_DIR, ".search_index.json"))
+SEARCH_INDEX_VERSION = 2
+SEARCH_FIELD_WEIGHTS = {"title": 5, "phase": 2, "content": 1, "quiz": 1}
+SEARCH_TERM = re.compile(r"[a-z0-9_$]+")
+SEARCH_RULE_LINE = re.compile(r"^[-=~]+\n", re.M)  # heading underlines from html_to_text
+
+SearchHit = namedtuple("SearchHit", "day_index title phase score snippet")
+
+
+def search_terms(text):
+    return SEARCH_TERM.findall(text.lower())
+
+
+class SearchIndex:
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, data):
+        self.docs = data["docs"]
+        self.postings = data["postings"]
+        self.terms = sorted(self.postings)
+        self.avg_length = sum(doc["length"] for doc in self.docs) / max(1, len(self.docs))
+
+    @classmethod
+    def build(cls, lessons):
+        docs, postings = [], {}
+        for day_index, lesson in enumerate(lessons):
+            text = SEARCH_RULE_LINE.sub("", html_to_text(lesson['content']))
+            quiz = html_to_text(lesson['quiz'])
+            counts = {}
+            length = 0
+            for field, value in (("title", lesson['title']), ("phase", lesson.get("phase", "")),
+                                 ("content", text), ("quiz", quiz)):
+                weight = SEARCH_FIELD_WEIGHTS[field]
+                for term in search_terms(value):
+                    counts[term] = counts.get(term, 0) + weight
+                    length += weight
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append([day_index, tf])
+            docs.append({"title": lesson['title'], "phase": lesson.get("phase", ""), "length": length,
+                         "text": f"{text}\n\n{quiz}"})
+        return cls({"docs": docs, "postings": postings})
+
+    def save(self, path, hashes):
+        data = {"version": SEARCH_INDEX_VERSION, "hashes": hashes, "docs": self.docs, "postings": self.postings}
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path, hashes):
+        # None if missing, from another version, or built from other content.
+        try:
+            with open(path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if data.get("version") != SEARCH_INDEX_VERSION or data.get("hashes") != hashes:
+            return None
+        return cls(data)
+
+    def expand(self, word):
+        # The word itself plus every indexed term it is a prefix of.
+        start = bisect_left(self.terms, word)
+        end = bisect_left(self.terms, word + "￿")
+        return self.terms[start:end]
+
+    def search(self, query, limit=5):
+        scores = {}
+        words = search_terms(query)
+        n = len(self.docs)
+        for word in words:
+            # A word scores its best-matching term per lesson, so a word with
+            # many completions ("event": events, eventemitter) counts once.
+            best = {}
+            for term in self.expand(word):
+                postings = self.postings[term]
+                idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+                # Exact matches outrank prefix matches.
+                boost = 1.0 if term == word else 0.5
+                for day_index, tf in postings:
+                    norm = self.K1 * (1 - self.B + self.B * self.docs[day_index]["length"] / self.avg_length)
+                    score = boost * idf * tf * (self.K1 + 1) / (tf + norm)
+                    best[day_index] = max(best.get(day_index, 0.0), score)
+            for day_index, score in best.items():
+                scores[day_index] = scores.get(day_index, 0.0) + score
+        ranked = heapq.nlargest(limit, scores.items(), key=lambda item: item[1])
+        return [SearchHit(d, self.docs[d]["title"], self.docs[d]["phase"], round(score, 3),
+                          self.snippet(d, words)) for d, score in ranked]
+
+    def snippet(self, day_index, words, width=160):
+        text = " ".join(self.docs[day_index]["text"].split())
+        pattern = re.compile(r"\b(" + "|".join(re.escape(w) for w in words) + r")\w*", re.I) if words else None
+        match = pattern.search(text) if pattern else None
+        start = max(0, match.start() - width // 3) if match else 0
+        excerpt = text[start:start + width]
+        if pattern:
+            excerpt = pattern.sub(lambda m: f"*{m.group(0)}*", excerpt)
+        return ("…" if start else "") + excerpt + ("…" if start + width < len(text) else "")
+
+
+_search_index = None
+
+
+def get_search_index(path=SEARCH_INDEX):
+    # Loaded once per process; rebuilt and saved when any lesson changed.
+    global _search_index
+    hashes = [CURRICULUM.content_hash(i) for i in range(len(CURRICULUM))]
+    if _search_index is not None and _search_index[0] == hashes:
+        return _search_index[1]
+    index = SearchIndex.load(path, hashes)
+    if index is None:
+        index = SearchIndex.build(CURRICULUM)
+        try:
+            index.save(path, hashes)
+        except OSError:
+            pass  # read-only checkout: keep it in memory
+    _search_index = (hashes, index)
+    return index
+
+
+def send_lesson_about(query, recipient):
+    hits = get_search_index().search(query, limit=1)
+    if not hits:
+        print(f"No lesson matches {query!r}.")
+        return None
+    day_index = hits[0].day_index
+    print(f"🔎 {query!r} → Day {day_index + 1}: {hits[0].title}")
+    # On request, so no ledger: asking again sends again.
+    return send_lesson(day_index, [recipient])
+
+
+# =====================================================
+# PER-SUBSCRIBER SCHEDULING
+# =====================================================
+# Subscribers have their own start date, time zone and local send hour.
+# They are stored pre-bucketed: one JSON file per (time zone, local hour)
+# under SCHEDULE_DIR, e.g. "Europe%2FBerlin@08.json" = {address: start}.
+# An hourly tick only lists file names, works out which (zone, hour) pairs
+# it is right now, and loads just those files. A small locator (sharded by
+# address hash) records each subscriber's bucket, so adding, moving or
+# removing one subscriber rewrites one bucket and one locator shard.
+Subscriber = namedtuple("Subscriber", "address start_date tz send_hour")
+
+
+def _read_json(path, default):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return default
+
+
+def _write_json(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=0, sort_keys=True)
+    if data:
+        os.replace(tmp, path)
+    else:
+        os.remove(tmp)
+        if os.path.exists(path):
+            os.remove(path)
+
+
+class SendBuckets:
+    def __init__(self, root=SCHEDULE_DIR):
+        self.root = root
+
+    @staticmethod
+    def bucket_name(tz, send_hour):
+        return f"{quote(tz, safe='')}@{send_hour:02d}.json"
+
+    def _bucket_path(self, name):
+        return os.path.join(self.root, "buckets", name)
+
+    def _locator_path(self, address):
+        shard = hashlib.sha1(address.lower().encode("utf-8")).hexdigest()[:2]
+        return os.path.join(self.root, "locator", f"{shard}.json")
+
+    def _update_bucket(self, name, change):
+        path = self._bucket_path(name)
+        bucket = _read_json(path, {})
+        change(bucket)
+        _write_json(path, bucket)
+
+    def add(self, subscriber):
+        ZoneInfo(subscriber.tz)  # reject unknown zones before touching disk
+        if not 0 <= subscriber.send_hour < 24:
+            raise ValueError(f"send hour must be 0-23, got {subscriber.send_hour}")
+        date.fromisoformat(subscriber.start_date)
+
+        locator_path = self._locator_path(subscriber.address)
+        locator = _read_json(locator_path, {})
+        old_name = locator.get(subscriber.address)
+        new_name = self.bucket_name(subscriber.tz, subscriber.send_hour)
+        if old_name and old_name != new_name:
+            self._update_bucket(old_name, lambda b: b.pop(subscriber.address, None))
+        self._update_bucket(new_name, lambda b: b.__setitem__(subscriber.address, subscriber.start_date))
+        locator[subscriber.address] = new_name
+        _write_json(locator_path, locator)
+
+    def remove(self, address):
+        locator_path = self._locator_path(address)
+        locator = _read_json(locator_path, {})
+        name = locator.pop(address, None)
+        if name is None:
+            return False
+        self._update_bucket(name, lambda b: b.pop(address, None))
+        _write_json(locator_path, locator)
+        return True
+
+    def due(self, now=None):
+        # Yields (subscriber, day_index) for everyone whose local clock is in
+        # their send hour right now. Local hours that DST skips or repeats
+        # follow the wall clock, so the send ledger is what stops repeats.
+        now = now or datetime.now(timezone.utc)
+        try:
+            names = os.listdir(os.path.join(self.root, "buckets"))
+        except FileNotFoundError:
+            return
+        zones = {}
+        for name in names:
+            if name.endswith(".json"):
+                zones.setdefault(unquote(name.rsplit("@", 1)[0]), None)
+        for tz in zones:
+            local = now.astimezone(ZoneInfo(tz))
+            bucket = _read_json(self._bucket_path(self.bucket_name(tz, local.hour)), {})
+            for address, start_date in bucket.items():
+                day_index = (local.date() - date.fromisoformat(start_date)).days
+                yield Subscriber(address, start_date, tz, local.hour), day_index
+
+    def mark_sent(self, deliveries):
+        pass  # bucket files keep no delivery state
+
+    def subscribers(self):
+        # Everyone in every bucket, e.g. to move them into the SQLite store.
+        try:
+            names = sorted(os.listdir(os.path.join(self.root, "buckets")))
+        except FileNotFoundError:
+            return
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            tz, send_hour = name[:-len(".json")].rsplit("@", 1)
+            for address, start_date in _read_json(self._bucket_path(name), {}).items():
+                yield Subscriber(address, start_date, unquote(tz), int(send_hour))
+
+
+# =====================================================
+# SQLITE SUBSCRIBER STORE
+# =====================================================
+# The same schedule as SendBuckets, in one SQLite file, for real audiences.
+# The (status, tz, send_hour, start_date, last_day_sent, address) index
+# covers the due query: for each (zone, local hour, local date) that is
+# current right now, SQLite seeks straight to the matching index range and
+# never touches the table itself.
+SUBSCRIBER_SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscribers (
+    id            INTEGER PRIMARY KEY,
+    address       TEXT    NOT NULL UNIQUE,
+    start_date    TEXT    NOT NULL,
+    tz            TEXT    NOT NULL DEFAULT 'UTC',
+    send_hour     INTEGER NOT NULL DEFAULT 8,
+    status        TEXT    NOT NULL DEFAULT 'active',
+    last_day_sent INTEGER NOT NULL DEFAULT -1
+);
+CREATE INDEX IF NOT EXISTS subscribers_due
+    ON subscribers (status, tz, send_hour, start_date, last_day_sent, address);
+CREATE TABLE IF NOT EXISTS zones (tz TEXT PRIMARY KEY) WITHOUT ROWID;
+"""
+
+INSERT_NEW_SUBSCRIBER = """
+INSERT INTO subscribers (address, start_date, tz, send_hour) VALUES (?, ?, ?, ?)
+ON CONFLICT (address) DO NOTHING
+"""
+
+UPSERT_SUBSCRIBER = """
+INSERT INTO subscribers (address, start_date, tz, send_hour) VALUES (?, ?, ?, ?)
+ON CONFLICT (address) DO UPDATE SET
+    start_date = excluded.start_date,
+    tz = excluded.tz,
+    send_hour = excluded.send_hour,
+    status = 'active'
+"""
+
+DUE_SUBSCRIBERS = """
+SELECT s.address, s.start_date, s.tz, s.send_hour,
+       CAST(julianday(d.local_date) - julianday(s.start_date) AS INTEGER) AS day
+FROM due_now AS d
+JOIN subscribers AS s
+  ON s.status = 'active' AND s.tz = d.tz AND s.send_hour = d.send_hour
+ AND s.start_date <= d.local_date
+WHERE s.last_day_sent < julianday(d.local_date) - julianday(s.start_date)
+  AND julianday(d.local_date) - julianday(s.start_date) < ?
+"""
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        batch = list(islice(iterator, size))
+        if not batch:
+            return
+        yield batch
+
+
+class SubscriberStore:
+    def __init__(self, path=SUBSCRIBER_DB):
+        self.path = path
+        self.db = self._connect()
+        self.db.executescript(SUBSCRIBER_SCHEMA)
+        self._known_zones = set()
+
+    def _connect(self):
+        db = sqlite3.connect(self.path)
+        db.execute("PRAGMA journal_mode = WAL")
+        db.execute("PRAGMA synchronous = NORMAL")
+        return db
+
+    def _check(self, subscriber):
+        if subscriber.tz not in self._known_zones:
+            ZoneInfo(subscriber.tz)
+            self._known_zones.add(subscriber.tz)
+        if not 0 <= subscriber.send_hour < 24:
+            raise ValueError(f"{subscriber.address}: send hour must be 0-23")
+        date.fromisoformat(subscriber.start_date)
+        return (subscriber.address, subscriber.start_date, subscriber.tz, subscriber.send_hour)
+
+    def add(self, subscriber):
+        self.import_subscribers([subscriber])
+
+    def import_subscribers(self, subscribers, batch_size=IMPORT_BATCH_SIZE, replace=True):
+        # One transaction per batch: a million rows is ~100 commits, not a
+        # million, and a bad row only rolls back its own batch. Once an
+        # import spans more than one batch, the due index is dropped and
+        # rebuilt at the end; one sort beats a million random index inserts.
+        # replace=False leaves addresses that are already stored untouched.
+        statement = UPSERT_SUBSCRIBER if replace else INSERT_NEW_SUBSCRIBER
+        count = 0
+        dropped_index = False
+        try:
+            for batch in batched(subscribers, batch_size):
+                rows = [self._check(s) for s in batch]
+                if count and not dropped_index:
+                    self.db.execute("DROP INDEX IF EXISTS subscribers_due")
+                    dropped_index = True
+                with self.db:
+                    self.db.executemany(statement, rows)
+                    self.db.executemany("INSERT OR IGNORE INTO zones (tz) VALUES (?)", {(row[2],) for row in rows})
+                count += len(rows)
+        finally:
+            if dropped_index:
+                self.db.executescript(SUBSCRIBER_SCHEMA)
+        return count
+
+    def remove(self, address):
+        with self.db:
+            cursor = self.db.execute(
+                "UPDATE subscribers SET status = 'unsubscribed' WHERE address = ? AND status = 'active'", (address,))
+        return cursor.rowcount > 0
+
+    def mark_sent(self, deliveries, batch_size=IMPORT_BATCH_SIZE):
+        # deliveries: iterable of (address, day_index)
+        for batch in batched(deliveries, batch_size):
+            with self.db:
+                self.db.executemany(
+                    "UPDATE subscribers SET last_day_sent = ? WHERE address = ? AND last_day_sent < ?",
+                    [(day, address, day) for address, day in batch])
+
+    def due(self, now=None, batch_size=IMPORT_BATCH_SIZE):
+        # Yields (subscriber, day_index) for active subscribers in their send
+        # hour who have not had today's lesson yet, streamed in batches from
+        # a separate read connection so mark_sent() can commit meanwhile.
+        now = now or datetime.now(timezone.utc)
+        reader = self._connect()
+        try:
+            due_now = []
+            for (tz,) in reader.execute("SELECT tz FROM zones"):
+                local = now.astimezone(ZoneInfo(tz))
+                due_now.append((tz, local.hour, local.date().isoformat()))
+            reader.execute("CREATE TEMP TABLE due_now (tz TEXT, send_hour INTEGER, local_date TEXT)")
+            with reader:
+                reader.executemany("INSERT INTO due_now VALUES (?, ?, ?)", due_now)
+
+            cursor = reader.execute(DUE_SUBSCRIBERS, (len(CURRICULUM),))
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for address, start_date, tz, send_hour, day_index in rows:
+                    yield Subscriber(address, start_date, tz, send_hour), day_index
+        finally:
+            reader.close()
+
+    def close(self):
+        self.db.close()
+
+
+def read_subscribers_csv(path):
+    # address,start_date[,tz[,send_hour]]; a header row is optional.
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if not row or row[0].strip().lower() in ("", "address", "email"):
+                continue
+            fields = [field.strip() for field in row]
+            yield Subscriber(
+                fields[0],
+                fields[1] if len(fields) > 1 and fields[1] else date.today().isoformat(),
+                fields[2] if len(fields) > 2 and fields[2] else "UTC",
+                int(fields[3]) if len(fields) > 3 and fields[3] else 8,
+            )
+
+
+def migrate_buckets(store, buckets=None):
+    # Moves everyone added with `subscribe` before the SQLite store existed
+    # into it, then sets the bucket directory aside so it is read only once.
+    # Rows already in the store win; the send ledger covers days sent so far.
+    buckets = buckets or SendBuckets()
+    if not os.path.isdir(os.path.join(buckets.root, "buckets")):
+        return 0
+    count = store.import_subscribers(buckets.subscribers(), replace=False)
+    os.replace(buckets.root, f"{buckets.root}.migrated")
+    print(f"📦 Moved {count:,} subscriber(s) from {buckets.root} into {store.path}")
+    return count
+
+
+def open_subscriber_store():
+    store = SubscriberStore()
+    migrate_buckets(store)
+    return store
+
+
+def get_schedule():
+    # The SQLite store takes over once it exists; small setups can keep
+    # using the bucket directory.
+    if os.path.exists(SUBSCRIBER_DB):
+        return open_subscriber_store()
+    return SendBuckets()
+
+
+def send_due_lessons(now=None, concurrency=None, render_workers=RENDER_WORKERS, schedule=None, report=None):
+    # Streams due subscribers in batches; every batch is grouped by lesson
+    # day and sent through one shared pool, then recorded as delivered.
+    schedule = schedule or get_schedule()
+    total = 0
+    try:
+        with SendLedger() as ledger, SMTPConnectionPool(size=concurrency or SMTP_POOL_SIZE) as pool:
+            for batch in batched(schedule.due(now), SEND_BATCH_SIZE):
+                refresh_curriculum()
+                by_day = {}
+                for subscriber, day_index in batch:
+                    if 0 <= day_index < len(CURRICULUM):
+                        by_day.setdefault(day_index, []).append(subscriber.address)
+                for day_index in sorted(by_day):
+                    delivered = send_lesson(day_index, by_day[day_index], concurrency, render_workers,
+                                            pool=pool, ledger=ledger, report=report).delivered
+                    schedule.mark_sent((address, day_index) for address in delivered)
+                    total += len(delivered)
+            pool.report()
+    except LedgerLocked as e:
+        print(f"⏳ Not sending: {e}")
+        return
+    finally:
+        METRICS.flush()
+    if not total:
+        print("Nobody is due this hour.")
+
+
+# =====================================================
+# SHARDED SENDING
+# =====================================================
+# Several workers (processes or machines sharing SHARD_DB) split one day's
+# list. The first worker plans the run: recipients are cut into fixed
+# shards and stored. Every worker then claims one shard at a time with a
+# lease, renews it while sending, and marks the shard done.
+#
+# A crashed worker stops renewing, its lease runs out, and another worker
+# takes the shard over. Leases only decide who works on what; double sends
+# are ruled out by each shard having its own SendLedger under
+# LEDGER_DIR/shards/. The ledger's flock is held for as long as the shard
+# is being sent, so a slow worker whose lease lapsed still blocks a second
+# sender, while a dead one has already released it. The ledger also lets
+# the next owner skip everyone the previous owner reached.
+#
+# The main ledger stays the record of who got what: before a shard is sent,
+# everyone it already has as done is copied into the shard ledger and
+# skipped, and afterwards the shard's outcomes are merged back. Each merge
+# holds the main ledger's lock only briefly (and waits for a `send` that
+# holds it). The plan drops repeated addresses, so nobody sits in two
+# shards. Once every shard is done, the run's rows and shard ledgers are
+# deleted and a one-row summary is kept in `runs`.
+SHARD_DB = os.environ.get("SHARD_DB", os.path.join(BASE_DIR, "shards.db"))
+SHARD_SIZE = int(os.environ.get("SHARD_SIZE", "500"))
+SHARD_LEASE = float(os.environ.get("SHARD_LEASE", "120"))
+
+SHARD_SCHEMA = """
+CREATE TABLE IF NOT EXISTS shards (
+    run         TEXT    NOT NULL,
+    shard       INTEGER NOT NULL,
+    day_index   INTEGER NOT NULL,
+    recipients  TEXT    NOT NULL,
+    state       TEXT    NOT NULL DEFAULT 'pending',
+    owner       TEXT,
+    lease_until REAL    NOT NULL DEFAULT 0,
+    claims      INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (run, shard)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS runs (
+    run         TEXT    PRIMARY KEY,
+    day_index   INTEGER NOT NULL,
+    shards      INTEGER NOT NULL,
+    claims      INTEGER NOT NULL,
+    finished_at REAL    NOT NULL
+) WITHOUT ROWID;
+"""
+
+Shard = namedtuple("Shard", "run shard day_index recipients")
+
+
+def unique_addresses(recipients):
+    # First occurrence of each address, compared case-insensitively like the
+    # ledger does.
+    seen = set()
+    for recipient in recipients:
+        key = recipient.lower()
+        if key not in seen:
+            seen.add(key)
+            yield recipient
+
+
+def shard_ledger_dir(run, shard=None):
+    name = f"{run}-{shard:05d}" if shard is not None else run
+    return os.path.join(LEDGER_DIR, "shards", name)
+
+
+class ShardQueue:
+    # Every call opens its own short-lived connection, so the queue can be
+    # used from the lease-renewal thread and from many processes at once;
+    # BEGIN IMMEDIATE serializes claims.
+    def __init__(self, path=SHARD_DB):
+        self.path = path
+        with self._connect() as db:
+            db.executescript(SHARD_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            db.execute("PRAGMA journal_mode = WAL")
+            yield db
+        finally:
+            db.close()
+
+    def plan(self, run, day_index, recipients, shard_size=SHARD_SIZE):
+        # Idempotent: the first worker's plan stands, and a finished run is
+        # never planned again; later calls are no-ops.
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            if (db.execute("SELECT 1 FROM shards WHERE run = ? LIMIT 1", (run,)).fetchone()
+                    or db.execute("SELECT 1 FROM runs WHERE run = ?", (run,)).fetchone()):
+                db.execute("COMMIT")
+                return False
+            for shard, batch in enumerate(batched(unique_addresses(recipients), max(1, shard_size))):
+                db.execute("INSERT INTO shards (run, shard, day_index, recipients) VALUES (?, ?, ?, ?)",
+                           (run, shard, day_index, "\n".join(batch)))
+            db.execute("COMMIT")
+            return True
+
+    def claim(self, run, owner, lease=SHARD_LEASE):
+        now = time.time()
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            row = db.execute(
+                "SELECT shard, day_index, recipients FROM shards WHERE run = ? AND "
+                "(state = 'pending' OR (state = 'leased' AND lease_until < ?)) ORDER BY shard LIMIT 1",
+                (run, now)).fetchone()
+            if row:
+                db.execute("UPDATE shards SET state = 'leased', owner = ?, lease_until = ?, claims = claims + 1 "
+                           "WHERE run = ? AND shard = ?", (owner, now + lease, run, row[0]))
+            db.execute("COMMIT")
+        if row is None:
+            return None
+        return Shard(run, row[0], row[1], row[2].split("\n"))
+
+    def renew(self, shard, owner, lease=SHARD_LEASE):
+        with self._connect() as db:
+            cursor = db.execute("UPDATE shards SET lease_until = ? WHERE run = ? AND shard = ? "
+                                "AND owner = ? AND state = 'leased'",
+                                (time.time() + lease, shard.run, shard.shard, owner))
+        return cursor.rowcount > 0
+
+    def complete(self, shard):
+        with self._connect() as db:
+            db.execute("UPDATE shards SET state = 'done' WHERE run = ? AND shard = ?", (shard.run, shard.shard))
+
+    def next_expiry(self, run):
+        # Seconds until the next outstanding lease lapses, or None when every
+        # shard is done.
+        with self._connect() as db:
+            until, outstanding = db.execute(
+                "SELECT MIN(lease_until), COUNT(*) FROM shards WHERE run = ? AND state != 'done'", (run,)).fetchone()
+        if not outstanding:
+            return None
+        return max(0.0, until - time.time())
+
+    def finish(self, run):
+        # Once every shard is done, replaces the run's rows (each holding a
+        # slice of the recipient list) with one summary row. Returns True
+        # for the caller that did it.
+        with self._connect() as db:
+            db.execute("BEGIN IMMEDIATE")
+            shards, claims, outstanding = db.execute(
+                "SELECT COUNT(*), SUM(claims), SUM(state != 'done') FROM shards WHERE run = ?", (run,)).fetchone()
+            if not shards or outstanding:
+                db.execute("COMMIT")
+                return False
+            day_index = db.execute("SELECT day_index FROM shards WHERE run = ? LIMIT 1", (run,)).fetchone()[0]
+            db.execute("INSERT OR IGNORE INTO runs (run, day_index, shards, claims, finished_at) VALUES (?, ?, ?, ?, ?)",
+                       (run, day_index, shards, claims, time.time()))
+            db.execute("DELETE FROM shards WHERE run = ?", (run,))
+            db.execute("COMMIT")
+            return True
+
+    def status(self, run):
+        with self._connect() as db:
+            rows = db.execute("SELECT state, COUNT(*), SUM(claims) FROM shards WHERE run = ? GROUP BY state",
+                              (run,)).fetchall()
+            return rows or db.execute("SELECT 'finished', shards, claims FROM runs WHERE run = ?", (run,)).fetchall()
+
+
+@contextmanager
+def keep_lease(queue, shard, owner, lease=SHARD_LEASE):
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(lease / 3):
+            if not queue.renew(shard, owner, lease):
+                with _output_lock:
+                    print(f"⚠️  Lost the lease on shard {shard.shard}; the ledger lock still guards it")
+                return
+
+    thread = threading.Thread(target=renew, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def copy_ledger_records(source, target, recipients, day_index, statuses=(LEDGER_SENT, LEDGER_REJECTED, LEDGER_FAILED)):
+    # Copies each recipient's status for day_index where target differs.
+    copied = 0
+    for recipient in recipients:
+        status = source.status(recipient, day_index)
+        if status in statuses and target.status(recipient, day_index) != status:
+            target.record(recipient, day_index, status)
+            copied += 1
+    return copied
+
+
+def run_shard_worker(run, owner=None, lease=SHARD_LEASE, concurrency=None, render_workers=RENDER_WORKERS,
+                     report=None, queue=None):
+    queue = queue or ShardQueue()
+    owner = owner or f"{os.uname().nodename}:{os.getpid()}"
+    shards = 0
+    with SMTPConnectionPool() as pool:
+        while True:
+            shard = queue.claim(run, owner, lease)
+            if shard is None:
+                wait = queue.next_expiry(run)
+                if wait is None:
+                    break
+                time.sleep(min(wait + 0.1, lease / 3))
+                continue
+            try:
+                with SendLedger(shard_ledger_dir(run, shard.shard)) as ledger, \
+                        keep_lease(queue, shard, owner, lease):
+                    print(f"🧩 {owner}: shard {shard.shard} ({len(shard.recipients)} recipient(s))")
+                    with SendLedger(wait=True) as main:
+                        copy_ledger_records(main, ledger, shard.recipients, shard.day_index,
+                                            (LEDGER_SENT, LEDGER_REJECTED))
+                    try:
+                        send_lesson(shard.day_index, shard.recipients, concurrency, render_workers,
+                                    pool=pool, ledger=ledger, report=report)
+                    finally:
+                        with SendLedger(wait=True) as main:
+                            copy_ledger_records(ledger, main, shard.recipients, shard.day_index)
+            except LedgerLocked:
+                # Lease expired but its previous owner is still sending.
+                print(f"⏳ Shard {shard.shard} is still being sent elsewhere; leaving it")
+                continue
+            queue.complete(shard)
+            shutil.rmtree(shard_ledger_dir(run, shard.shard), ignore_errors=True)
+            shards += 1
+        pool.report()
+    if queue.finish(run):
+        # Shard ledgers left by workers that died between complete() and rmtree().
+        parent = os.path.dirname(shard_ledger_dir(run))
+        for name in os.listdir(parent) if os.path.isdir(parent) else ():
+            if name.startswith(f"{run}-"):
+                shutil.rmtree(os.path.join(parent, name), ignore_errors=True)
+    print(f"🏁 {owner}: {shards} shard(s) sent; run {run} finished")
+    return shards
+
+
+# =====================================================
+# PREVIEW SERVER
+# =====================================================
+# `daily_js.py preview` serves every day exactly as send_daily_lesson()
+# would mail it (same template, highlighter, optimizer and render cache),
+# plus the text part. Each response is built once: the body, a strong ETag
+# from its hash, and a gzip copy are kept in memory and reused for every
+# reviewer until the course file changes. Browsers revalidate with
+# If-None-Match and get a bodiless 304.
+PREVIEW_REFRESH_EVERY = 1.0  # seconds between checks of the course file
+
+
+class PreviewResponses:
+    def __init__(self):
+        self._responses = {}
+        self._lock = threading.Lock()
+        self._checked = 0.0
+
+    def _refresh(self):
+        now = time.monotonic()
+        if now - self._checked < PREVIEW_REFRESH_EVERY:
+            return
+        self._checked = now
+        if refresh_curriculum():
+            self._responses.clear()
+
+    def get(self, path):
+        # (status, content type, etag, body, gzipped body), or None for 404.
+        with self._lock:
+            self._refresh()
+            response = self._responses.get(path)
+            if response is None:
+                rendered = self._render(path)
+                if rendered is None:
+                    return None
+                content_type, text = rendered
+                body = text.encode("utf-8")
+                etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+                response = self._responses[path] = (content_type, etag, body, gzip.compress(body, 9, mtime=0))
+            return response
+
+    def _render(self, path):
+        if path == "/":
+            items = "".join(f'<li><a href="/day/{i + 1}">Day {i + 1}: {html.escape(lesson["title"])}</a> '
+                            f'(<a href="/day/{i + 1}.txt">text</a>)</li>'
+                            for i, lesson in enumerate(CURRICULUM))
+            return "text/html; charset=utf-8", f"<!doctype html><title>Lesson preview</title><ol>{items}</ol>"
+        match = re.fullmatch(r"/day/(\d+)(\.txt)?", path)
+        if not match or not 1 <= int(match.group(1)) <= len(CURRICULUM):
+            return None
+        day_index = int(match.group(1)) - 1
+        lesson = CURRICULUM[day_index]
+        if match.group(2):
+            return "text/plain; charset=utf-8", get_text_body(lesson)
+        return "text/html; charset=utf-8", get_html_body(lesson, day_index)
+
+
+def accepts_gzip(accept_encoding):
+    # True if gzip has a non-zero q-value, named or through "*".
+    qualities = {}
+    for part in accept_encoding.split(","):
+        coding, *params = [field.strip() for field in part.split(";")]
+        if not coding:
+            continue
+        q = 1.0
+        for param in params:
+            name, _, value = param.partition("=")
+            if name.strip().lower() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        qualities[coding.lower()] = q
+    for coding in ("gzip", "x-gzip", "*"):
+        if coding in qualities:
+            return qualities[coding] > 0
+    return False
+
+
+def etag_matches(if_none_match, etag):
+    # If-None-Match uses weak comparison (RFC 7232 §3.2): W/ is ignored, and
+    # "*" matches any current representation.
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in [tag[2:] if tag.startswith("W/") else tag for tag in tags]
+
+
+class PreviewHandler(BaseHTTPRequestHandler):
+    preview = None  # PreviewResponses, set by serve_preview()
+
+    def do_GET(self, head=False):
+        response = self.preview.get(urlsplit(self.path).path)
+        if response is None:
+            self.send_error(404)
+            return
+        content_type, etag, body, gzipped = response
+        use_gzip = accepts_gzip(self.headers.get("Accept-Encoding", ""))
+        if use_gzip:
+            # Strong ETags are per representation, so the gzip copy gets its own.
+            body, etag = gzipped, etag[:-1] + '-gz"'
+        if etag_matches(self.headers.get("If-None-Match", ""), etag):
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Vary", "Accept-Encoding")
+            self.end_headers()
+            return
+        self.send_response(200)
+        if use_gzip:
+            self.send_header("Content-Encoding", "gzip")
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Vary", "Accept-Encoding")
+        self.end_headers()
+        if not head:
+            self.wfile.write(body)
+
+    def do_HEAD(self):
+        self.do_GET(head=True)
+
+    def log_message(self, format, *args):
+        with _output_lock:
+            print(f"👀 {self.address_string()} {format % args}")
+
+
+def serve_preview(host="127.0.0.1", port=8000):
+    PreviewHandler.preview = PreviewResponses()
+    server = ThreadingHTTPServer((host, port), PreviewHandler)
+    server.daemon_threads = True
+    print(f"👀 Previewing {len(CURRICULUM)} lessons at http://{host}:{server.server_address[1]}/")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+# =====================================================
+# STATIC ARCHIVE SITE
+# =====================================================
+# `daily_js.py build-site DIR` writes a browsable archive:
+#   index.html                   phases with their lessons
+#   phase-N.html                 one index page per phase
+#   day-NN.html                  each lesson, as mailed, plus a nav bar
+#   search.html + search.json    client-side search over the SearchIndex
+# DIR/.manifest.json records a source hash per page, and only pages whose
+# hash changed are rewritten; lesson pages are rendered in worker processes.
+# The manifest also keeps a fingerprint of the course file and renderer
+# versions; when that matches, the build stops before hashing anything.
+SITE_VERSION = 2
+SITE_NAV = (
+    '<div style="font-family: Arial, sans-serif; font-size: 13px; max-width: 700px; margin: 10px auto;">'
+    '{prev} · <a href="phase-{phase}.html">{phase_name}</a> · <a href="index.html">All lessons</a> · '
+    '<a href="search.html">Search</a> · {next}</div>'
+)
+SITE_PAGE = """<!doctype html>
+<html><head><meta charset="utf-8"><title>{title}</title></head>
+<body style="font-family: 'Segoe UI', Arial, sans-serif; line-height: 1.7; color: #333; max-width: 700px; margin: auto; padding: 10px;">
+<h1>{title}</h1>
+{body}
+</body></html>
+"""
+SITE_SEARCH_SCRIPT = """
+<input id="q" placeholder="closures, microtask, TurboFan…" style="width: 100%; font-size: 16px; padding: 6px;" autofocus>
+<ol id="hits"></ol>
+<script>
+fetch("search.json").then(r => r.json()).then(index => {
+  const terms = Object.keys(index.postings).sort();
+  const run = () => {
+    const scores = {};
+    for (const word of (document.getElementById("q").value.toLowerCase().match(/[a-z0-9_$]+/g) || [])) {
+      const best = {};
+      for (const term of terms.filter(t => t.startsWith(word))) {
+        const postings = index.postings[term];
+        const idf = Math.log(1 + (index.docs.length - postings.length + 0.5) / (postings.length + 0.5));
+        for (const [day, tf] of postings) {
+          const score = (term === word ? 1 : 0.5) * idf * tf / (tf + 1);
+          best[day] = Math.max(best[day] || 0, score);
+        }
+      }
+      for (const day in best) scores[day] = (scores[day] || 0) + best[day];
+    }
+    const hits = Object.keys(scores).sort((a, b) => scores[b] - scores[a]).slice(0, 10);
+    document.getElementById("hits").innerHTML = hits.map(d => {
+      const doc = index.docs[d];
+      return `<li><a href="day-${String(+d + 1).padStart(2, "0")}.html">Day ${+d + 1}: ${doc.title}</a> <small>${doc.phase}</small></li>`;
+    }).join("");
+  };
+  document.getElementById("q").addEventListener("input", run);
+  run();
+});
+</script>
+"""
+
+
+def site_renderer_version():
+    # Everything besides lesson content that page bytes depend on.
+    return hashlib.sha256(json.dumps([
+        SITE_VERSION, SEARCH_INDEX_VERSION, HIGHLIGHTER_VERSION, OPTIMIZER_VERSION if OPTIMIZE_HTML else 0,
+        EMAIL_TEMPLATE, SITE_NAV, SITE_PAGE, SITE_SEARCH_SCRIPT,
+    ]).encode("utf-8")).hexdigest()
+
+
+def site_fingerprint(renderer):
+    st = os.stat(CURRICULUM.path)
+    return f"{st.st_ino}:{st.st_size}:{st.st_mtime_ns}:{renderer}"
+
+
+def site_phases():
+    # [(phase name, [day_index, ...]), ...] in course order.
+    return digest_groups("phase")
+
+
+def render_site_lesson(job):
+    # Runs in a worker process; returns (file name, page).
+    day_index, phase_number = job
+    lesson = CURRICULUM[day_index]
+
+    def link(d, label):
+        return f'<a href="day-{d + 1:02d}.html">{label}</a>' if 0 <= d < len(CURRICULUM) else label
+
+    nav = SITE_NAV.format(prev=link(day_index - 1, "← Previous"), next=link(day_index + 1, "Next →"),
+                          phase=phase_number, phase_name=html.escape(lesson.get("phase", "")))
+    body = re.sub(r"(<body[^>]*>)", lambda m: m.group(1) + nav, get_html_body(lesson, day_index), count=1)
+    # The mailed body has no <head>; without a declared charset, pages opened
+    # from disk or served without one show mojibake for ←, —, 🧠 and friends.
+    head = f'<head><meta charset="utf-8"><title>Day {day_index + 1}: {html.escape(lesson["title"])}</title></head>'
+    body = re.sub(r"(<html[^>]*>)", lambda m: m.group(1) + head, body, count=1)
+    return f"day-{day_index + 1:02d}.html", "<!doctype html>\n" + body
+
+
+def _site_list(day_indexes):
+    return "<ol>" + "".join(f'<li value="{d + 1}"><a href="day-{d + 1:02d}.html">'
+                            f'{html.escape(CURRICULUM[d]["title"])}</a></li>' for d in day_indexes) + "</ol>"
+
+
+def build_site(root, workers=RENDER_WORKERS):
+    manifest_path = os.path.join(root, ".manifest.json")
+    manifest = _read_json(manifest_path, {})
+    renderer = site_renderer_version()
+    fingerprint = site_fingerprint(renderer)
+    pages = manifest.get("pages", {})
+    if manifest.get("fingerprint") == fingerprint and all(os.path.exists(os.path.join(root, p)) for p in pages):
+        print(f"✔️  {root} is up to date")
+        return 0
+
+    phases = site_phases()
+    phase_of = {d: n + 1 for n, (_, days) in enumerate(phases) for d in days}
+    # Source hash per page: everything that page's bytes depend on.
+    sources, hashes = {}, {}
+
+    def source(name, *parts):
+        hashes[name] = hashlib.sha256(json.dumps([renderer, *parts]).encode("utf-8")).hexdigest()
+
+    for day_index in range(len(CURRICULUM)):
+        name = f"day-{day_index + 1:02d}.html"
+        sources[name] = day_index
+        source(name, render_cache_key(CURRICULUM[day_index], day_index), phase_of[day_index],
+               day_index > 0, day_index < len(CURRICULUM) - 1)
+    titles = [(CURRICULUM[d]["title"], CURRICULUM[d].get("phase", "")) for d in range(len(CURRICULUM))]
+    listings = ["index.html", "search.html"] + [f"phase-{n + 1}.html" for n in range(len(phases))]
+    for name in listings:
+        source(name, titles)
+    source("search.json", [CURRICULUM.content_hash(d) for d in range(len(CURRICULUM))])
+
+    stale = [name for name, digest in hashes.items()
+             if pages.get(name) != digest or not os.path.exists(os.path.join(root, name))]
+    os.makedirs(root, exist_ok=True)
+    written = {}
+
+    jobs = [(sources[name], phase_of[sources[name]]) for name in stale if name in sources]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            written.update(executor.map(render_site_lesson, jobs, chunksize=max(1, len(jobs) // (workers * 2))))
+    else:
+        written.update(map(render_site_lesson, jobs))
+
+    if any(name in listings for name in stale):
+        index = "".join(f'<h2><a href="phase-{n + 1}.html">{html.escape(name)}</a></h2>{_site_list(days)}'
+                        for n, (name, days) in enumerate(phases))
+        written["index.html"] = SITE_PAGE.format(
+            title="JavaScript Daily — Archive", body='<p><a href="search.html">Search</a></p>' + index)
+        for n, (name, days) in enumerate(phases):
+            written[f"phase-{n + 1}.html"] = SITE_PAGE.format(
+                title=html.escape(name), body=f'<p><a href="index.html">All lessons</a></p>{_site_list(days)}')
+        written["search.html"] = SITE_PAGE.format(title="Search lessons", body=SITE_SEARCH_SCRIPT)
+    if "search.json" in stale:
+        search = get_search_index()
+        written["search.json"] = json.dumps({
+            "docs": [{"title": html.escape(d["title"]), "phase": html.escape(d["phase"])} for d in search.docs],
+            "postings": search.postings,
+        }, separators=(",", ":"))
+
+    for name, page in written.items():
+        path = os.path.join(root, name)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(page)
+        os.replace(tmp, path)
+    removed = [name for name in pages if name not in hashes]
+    for name in removed:
+        try:
+            os.remove(os.path.join(root, name))
+        except FileNotFoundError:
+            pass
+
+    _write_json(manifest_path, {"fingerprint": fingerprint, "pages": hashes})
+    print(f"🌐 {root}: {len(written)} page(s) written, {len(hashes) - len(written)} unchanged"
+          + (f", {len(removed)} removed" if removed else ""))
+    return len(written)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Daily JavaScript course mailer.")
+    commands = parser.add_subparsers(dest="command")
+
+    send = commands.add_parser("send", help="send today's lesson (default)")
+    send.add_argument("--recipients", metavar="FILE",
+                      help="file with one address per line (default: RECIPIENT_EMAILS or EMAIL_ADDRESS)")
+    send.add_argument("--async", dest="use_async", action="store_true",
+                      help="deliver with the asyncio dispatcher")
+    send.add_argument("--concurrency", type=int, default=SMTP_CONCURRENCY,
+                      help=f"max concurrent SMTP sessions in --async mode (default: {SMTP_CONCURRENCY})")
+    send.add_argument("--render-workers", type=int, default=RENDER_WORKERS,
+                      help="render messages in this many processes before pooled sending")
+    send.add_argument("--report", metavar="CSV", help="append per-recipient attempts and outcomes to this file")
+    send.add_argument("--pipeline", action="store_true",
+                      help="stream the recipient file through bounded render/serialize/send stages")
+    send.add_argument("--stage-workers", type=int, nargs=2, default=(1, 1), metavar=("RENDER", "SERIALIZE"),
+                      help="worker threads for the render and serialize stages in --pipeline mode")
+
+    prefetch = commands.add_parser("prefetch", help="pre-render upcoming lessons into the render cache")
+    prefetch.add_argument("--days", type=int, default=1,
+                          help="how many upcoming days to render, starting tomorrow (default: 1)")
+
+    pack = commands.add_parser("pack", help="convert the curriculum into a compressed .jsla archive")
+    pack.add_argument("output", nargs="?", default=os.path.splitext(COURSE_BUNDLE)[0] + ".jsla")
+    pack.add_argument("--no-dictionary", action="store_true",
+                      help="compress each lesson without the shared preset dictionary")
+
+    bench_highlight = commands.add_parser("bench-highlight", help="measure JS highlighter throughput")
+    bench_highlight.add_argument("--rounds", type=int, default=20)
+
+    commands.add_parser("size-report", help="show per-lesson HTML size before and after optimization")
+
+    subscribe = commands.add_parser("subscribe", help="add or move a scheduled subscriber")
+    subscribe.add_argument("address")
+    subscribe.add_argument("--start", default=date.today().isoformat(), help="course start date (YYYY-MM-DD)")
+    subscribe.add_argument("--tz", default="UTC", help="IANA time zone, e.g. Europe/Berlin")
+    subscribe.add_argument("--hour", type=int, default=8, help="local hour to send at (0-23)")
+
+    unsubscribe = commands.add_parser("unsubscribe", help="remove a scheduled subscriber")
+    unsubscribe.add_argument("address")
+
+    tick = commands.add_parser("tick", help="send to scheduled subscribers whose local send hour is now")
+    tick.add_argument("--now", help="pretend it is this UTC time (ISO 8601)")
+    tick.add_argument("--async", dest="use_async", action="store_true")
+    tick.add_argument("--concurrency", type=int, default=SMTP_CONCURRENCY)
+    tick.add_argument("--report", metavar="CSV", help="append per-recipient attempts and outcomes to this file")
+
+    import_subscribers = commands.add_parser("import-subscribers", help="bulk-load a CSV into the SQLite store")
+    import_subscribers.add_argument("csv_file", help="rows of address,start_date[,tz[,send_hour]]")
+
+    bench = commands.add_parser("bench", help="benchmark rendering stages and delivery strategies")
+    bench.add_argument("--recipients", type=int, default=200, help="synthetic recipients (default: 200)")
+    bench.add_argument("--rounds", type=int, default=5, help="render passes over the curriculum (default: 5)")
+    bench.add_argument("--concurrency", type=int, default=SMTP_CONCURRENCY)
+    bench.add_argument("--pool-size", type=int, default=SMTP_POOL_SIZE)
+    bench.add_argument("--latency-ms", type=float, default=0.0, help="delay the sink adds to every reply")
+    bench.add_argument("--output", metavar="JSON", help="write the report here instead of stdout")
+
+    spool = commands.add_parser("spool", help="render messages into a Maildir instead of sending them")
+    spool.add_argument("maildir")
+    spool.add_argument("--days", default=None, help="days to render, e.g. 1-30 or 3,5 (default: today)")
+    spool.add_argument("--recipients", metavar="FILE",
+                       help="file with one address per line (default: RECIPIENT_EMAILS or EMAIL_ADDRESS)")
+    spool.add_argument("--batch-size", type=int, default=SPOOL_BATCH_SIZE,
+                       help=f"messages written per sync (default: {SPOOL_BATCH_SIZE})")
+
+    rebuild = commands.add_parser("rebuild", help="re-render new or edited lessons into the render cache")
+    rebuild.add_argument("--watch", type=float, metavar="SECONDS",
+                         help="keep running and rebuild whenever the course file changes")
+
+    shard_worker = commands.add_parser("shard-worker",
+                                       help="claim and send shards of today's list alongside other workers")
+    shard_worker.add_argument("--recipients", metavar="FILE",
+                              help="file with one address per line (default: RECIPIENT_EMAILS or EMAIL_ADDRESS)")
+    shard_worker.add_argument("--shard-size", type=int, default=SHARD_SIZE)
+    shard_worker.add_argument("--lease", type=float, default=SHARD_LEASE, help="lease length in seconds")
+    shard_worker.add_argument("--worker-id", help="name recorded on claimed shards (default: host:pid)")
+    shard_worker.add_argument("--report", metavar="CSV", help="append per-recipient attempts and outcomes to this file")
+
+    commands.add_parser("shard-status", help="show progress of today's sharded run")
+
+    catch_up_parser = commands.add_parser("catch-up", help="deliver lessons each recipient missed since their first send")
+    catch_up_parser.add_argument("--recipients", metavar="FILE",
+                                 help="file with one address per line (default: RECIPIENT_EMAILS or EMAIL_ADDRESS)")
+    catch_up_parser.add_argument("--combined", action="store_true",
+                                 help="one message per recipient with every missed lesson")
+    catch_up_parser.add_argument("--since", type=int, metavar="DAY",
+                                 help="first course day to consider, for everyone (default: each recipient's first day in the ledger)")
+    catch_up_parser.add_argument("--report", metavar="CSV", help="append per-recipient attempts and outcomes to this file")
+
+    digest = commands.add_parser("digest", help="send the weekly or per-phase digest that ends today")
+    digest.add_argument("--by", choices=("week", "phase"), default="week")
+    digest.add_argument("--group", type=int, metavar="N", help="send digest N (1-based) regardless of the date")
+    digest.add_argument("--recipients", metavar="FILE", help="file with one address per line (default: DIGEST_EMAILS)")
+    digest.add_argument("--report", metavar="CSV", help="append per-recipient attempts and outcomes to this file")
+
+    search = commands.add_parser("search", help="find lessons by keyword")
+    search.add_argument("query", nargs="+")
+    search.add_argument("--limit", type=int, default=5)
+    search.add_argument("--json", action="store_true", help="print hits as JSON")
+
+    send_about = commands.add_parser("send-about", help="email the best-matching lesson for a topic")
+    send_about.add_argument("query", nargs="+")
+    send_about.add_argument("--to", required=True, metavar="ADDRESS")
+
+    preview = commands.add_parser("preview", help="serve rendered lessons over HTTP for review")
+    preview.add_argument("--host", default="127.0.0.1")
+    preview.add_argument("--port", type=int, default=8000)
+
+    build_site_parser = commands.add_parser("build-site", help="build or update the static lesson archive")
+    build_site_parser.add_argument("output", nargs="?", default=os.path.join(BASE_DIR, "site"))
+    build_site_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                                   help="processes rendering lesson pages (default: one per CPU)")
+
+    args = parser.parse_args(argv)
+
+    if args.command is None:
+        send_daily_lesson()
+    elif args.command == "send":
+        if args.pipeline:
+            recipients = read_recipients(args.recipients) if args.recipients else get_recipients()
+            send_daily_lesson(recipients, report=args.report, stream=tuple(args.stage_workers))
+        else:
+            send_daily_lesson(get_recipients(args.recipients),
+                              concurrency=args.concurrency if args.use_async else None,
+                              render_workers=args.render_workers, report=args.report)
+    elif args.command == "prefetch":
+        tomorrow = get_day_index() + 1
+        prefetch_lessons(range(tomorrow, tomorrow + args.days))
+    elif args.command == "pack":
+        pack_curriculum(CURRICULUM, args.output, use_dictionary=not args.no_dictionary)
+    elif args.command == "bench-highlight":
+        benchmark_highlighter(CURRICULUM, rounds=args.rounds)
+    elif args.command == "size-report":
+        report_html_sizes(CURRICULUM)
+    elif args.command == "subscribe":
+        get_schedule().add(Subscriber(args.address, args.start, args.tz, args.hour))
+        print(f"📬 {args.address}: from {args.start}, {args.hour:02d}:00 {args.tz}")
+    elif args.command == "unsubscribe":
+        if not get_schedule().remove(args.address):
+            print(f"{args.address} is not subscribed.")
+    elif args.command == "tick":
+        now = datetime.fromisoformat(args.now).replace(tzinfo=timezone.utc) if args.now else None
+        send_due_lessons(now, concurrency=args.concurrency if args.use_async else None, report=args.report)
+    elif args.command == "bench":
+        report = run_benchmarks(args.recipients, args.rounds, args.concurrency, args.pool_size,
+                                args.latency_ms / 1e3)
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+            print_benchmark_report(report)
+        else:
+            print(json.dumps(report, indent=2))
+    elif args.command == "spool":
+        days = parse_days(args.days) if args.days else parse_days(str(get_day_index() + 1))
+        spool_messages(args.maildir, days, get_recipients(args.recipients), args.batch_size)
+    elif args.command == "rebuild":
+        rebuild_render_cache()
+        if args.watch:
+            refresh_curriculum()
+            try:
+                while True:
+                    time.sleep(args.watch)
+                    if refresh_curriculum():
+                        rebuild_render_cache()
+            except KeyboardInterrupt:
+                pass
+    elif args.command in ("shard-worker", "shard-status"):
+        day_index = get_day_index()
+        run = f"{COURSE_START_DATE:%Y%m%d}-day{day_index + 1:02d}"
+        queue = ShardQueue()
+        if args.command == "shard-status":
+            for state, shards, claims in queue.status(run):
+                print(f"{run} {state:8} {shards:6} shard(s), {claims} claim(s)")
+        elif not 0 <= day_index < len(CURRICULUM):
+            print("No lesson to send today.")
+        else:
+            if queue.plan(run, day_index, get_recipients(args.recipients), args.shard_size):
+                print(f"🗂️  Planned {run}")
+            run_shard_worker(run, args.worker_id, args.lease, report=args.report, queue=queue)
+    elif args.command == "catch-up":
+        catch_up(get_recipients(args.recipients), args.combined,
+                 args.since - 1 if args.since else None, args.report)
+    elif args.command == "digest":
+        recipients = get_recipients(args.recipients) if args.recipients else \
+            [a.strip() for a in DIGEST_EMAILS.split(",") if a.strip()]
+        send_digest(args.by, recipients, args.group, args.report)
+    elif args.command == "search":
+        start = time.perf_counter()
+        hits = get_search_index().search(" ".join(args.query), args.limit)
+        elapsed = (time.perf_counter() - start) * 1e3
+        if args.json:
+            print(json.dumps([hit._asdict() for hit in hits], ensure_ascii=False, indent=2))
+        elif not hits:
+            print("No matches.")
+        for hit in [] if args.json else hits:
+            print(f"Day {hit.day_index + 1:>2}  {hit.title}  ({hit.phase}, score {hit.score})")
+            print(f"        {hit.snippet}")
+        if not args.json:
+            print(f"({len(hits)} hit(s) in {elapsed:.1f} ms)")
+    elif args.command == "send-about":
+        send_lesson_about(" ".join(args.query), args.to)
+    elif args.command == "preview":
+        serve_preview(args.host, args.port)
+    elif args.command == "build-site":
+        build_site(args.output, args.workers)
+    elif args.command == "import-subscribers":
+        start = time.perf_counter()
+        count = open_subscriber_store().import_subscribers(read_subscribers_csv(args.csv_file))
+        print(f"📥 Imported {count:,} subscribers into {SUBSCRIBER_DB} in {time.perf_counter() - start:.1f}s")
+
 
 if __name__ == "__main__":
-    send_daily_lesson()
+    try:
+        main()
+    except SendAborted as e:
+        sys.exit(f"🛑 {e}")
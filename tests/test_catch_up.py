@@ -0,0 +1,28 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from daily_js import LEDGER_FAILED, LEDGER_REJECTED, LEDGER_SENT, SendLedger, missed_days  # noqa: E402
+
+
+def test_backlog_starts_at_each_recipients_first_record(tmp_path):
+    with SendLedger(str(tmp_path)) as ledger:
+        for day_index in (0, 1, 2, 4):
+            ledger.record("early@example.com", day_index, LEDGER_SENT)
+        ledger.record("early@example.com", 3, LEDGER_FAILED)
+        ledger.record("early@example.com", 5, LEDGER_REJECTED)
+        ledger.record("joined@example.com", 6, LEDGER_SENT)
+
+        backlog = missed_days(ledger, ["early@example.com", "joined@example.com", "new@example.com"], today=8)
+
+    assert backlog == {"early@example.com": [3, 6, 7], "joined@example.com": [7]}
+
+
+def test_explicit_first_day_applies_to_everyone(tmp_path):
+    with SendLedger(str(tmp_path)) as ledger:
+        ledger.record("joined@example.com", 6, LEDGER_SENT)
+
+        backlog = missed_days(ledger, ["joined@example.com", "new@example.com"], first_day=5, today=8)
+
+    assert backlog == {"joined@example.com": [5, 7], "new@example.com": [5, 6, 7]}
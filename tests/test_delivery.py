@@ -0,0 +1,94 @@
+import os
+import smtplib
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import daily_js  # noqa: E402
+from daily_js import (  # noqa: E402
+    LEDGER_REJECTED, LEDGER_SENT, LocalSMTPSink, SendLedger, SMTPConnectionPool, classify_smtp_error, send_lesson,
+)
+
+
+@pytest.mark.parametrize("exc, kind", [
+    (smtplib.SMTPRecipientsRefused({"a@example.com": (550, b"5.1.1 No such user")}), "permanent"),
+    (smtplib.SMTPRecipientsRefused({"a@example.com": (450, b"4.2.1 Try later")}), "transient"),
+    (smtplib.SMTPDataError(554, b"5.7.1 Message rejected"), "permanent"),
+    (smtplib.SMTPDataError(451, b"4.3.0 Local error"), "transient"),
+    (smtplib.SMTPAuthenticationError(535, b"5.7.8 Bad credentials"), "session"),
+    (smtplib.SMTPSenderRefused(550, b"5.4.5 Daily sending quota exceeded", "me@example.com"), "session"),
+    (smtplib.SMTPSenderRefused(451, b"4.3.0 Try again", "me@example.com"), "transient"),
+    (smtplib.SMTPNotSupportedError("STARTTLS extension not supported by server."), "session"),
+    (smtplib.SMTPHeloError(501, b"Bad HELO"), "session"),
+    (smtplib.SMTPServerDisconnected("Connection unexpectedly closed"), "connection"),
+    (smtplib.SMTPResponseException(421, b"4.7.0 Closing"), "connection"),
+    (ConnectionResetError(), "connection"),
+    (UnicodeEncodeError("ascii", "josé@example.com", 3, 4, "ordinal not in range(128)"), "permanent"),
+    (ValueError("bad address"), "permanent"),
+    (AttributeError("'NoneType' object has no attribute 'strip'"), "session"),
+])
+def test_classify_smtp_error(exc, kind):
+    assert classify_smtp_error(exc) == kind
+
+
+class StrictSink(LocalSMTPSink):
+    # Answers a MAIL inside an open transaction with 503, like real servers.
+    def __init__(self):
+        super().__init__()
+        base = self.server.RequestHandlerClass
+
+        class Handler(base):
+            def converse(self):
+                in_mail = False
+                original = self.rfile
+
+                class Reader:
+                    def __iter__(reader):
+                        nonlocal in_mail
+                        for raw in original:
+                            verb = raw[:4].upper()
+                            if verb == b"MAIL":
+                                if in_mail:
+                                    self.reply("503 5.5.1 Nested MAIL command")
+                                    continue
+                                in_mail = True
+                            elif verb in (b"RSET", b"QUIT") or raw == b".\r\n":
+                                in_mail = False
+                            yield raw
+
+                self.rfile = Reader()
+                try:
+                    base.converse(self)
+                finally:
+                    self.rfile = original
+
+        self.server.RequestHandlerClass = Handler
+
+
+def test_one_unencodable_address_does_not_stop_the_list(tmp_path, monkeypatch):
+    monkeypatch.setattr(daily_js, "SENDER_EMAIL", "me@example.com")
+    recipients = [f"user{n}@example.com" for n in range(30)]
+    recipients.insert(10, "josé@example.com")
+    with StrictSink() as sink, SendLedger(str(tmp_path)) as ledger:
+        pool = SMTPConnectionPool(size=2, host=sink.host, port=sink.port, user="t", password="t", starttls=False)
+        with pool:
+            tracker = send_lesson(0, recipients, pool=pool, ledger=ledger)
+
+        assert sink.messages == 30
+        assert len(tracker.delivered) == 30
+        assert ledger.status("josé@example.com", 0) == LEDGER_REJECTED
+        assert all(ledger.status(r, 0) == LEDGER_SENT for r in recipients if r != "josé@example.com")
+
+
+def test_session_is_reset_after_an_address_fails_to_encode_in_rcpt():
+    # An ASCII message to a non-ASCII address gets as far as MAIL FROM before
+    # RCPT fails to encode; the pooled session must still take the next one.
+    with StrictSink() as sink:
+        with SMTPConnectionPool(size=1, host=sink.host, port=sink.port, user="t", password="t",
+                                starttls=False) as pool:
+            with pytest.raises(UnicodeEncodeError):
+                pool.sendmail("me@example.com", "josé@example.com", b"Subject: hi\r\n\r\nhi\r\n")
+            pool.sendmail("me@example.com", "user@example.com", b"Subject: hi\r\n\r\nhi\r\n")
+        assert sink.messages == 1
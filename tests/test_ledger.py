@@ -0,0 +1,135 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from daily_js import (  # noqa: E402
+    LEDGER_FAILED, LEDGER_REJECTED, LEDGER_SENT, LedgerLocked, SendLedger,
+)
+
+
+def log_path(root):
+    return os.path.join(root, "ledger.log")
+
+
+def test_records_survive_reopen(tmp_path):
+    root = str(tmp_path)
+    with SendLedger(root) as ledger:
+        ledger.record("a@example.com", 0, LEDGER_SENT)
+        ledger.record("b@example.com", 0, LEDGER_FAILED)
+        ledger.record("c@example.com", 3, LEDGER_REJECTED)
+        ledger.record("b@example.com", 0, LEDGER_SENT)  # a later record wins
+
+    with SendLedger(root) as ledger:
+        assert ledger.already_sent("A@Example.com", 0)
+        assert ledger.status("b@example.com", 0) == LEDGER_SENT
+        assert ledger.status("c@example.com", 3) == LEDGER_REJECTED
+        assert ledger.status("c@example.com", 2) == 0
+
+
+def test_torn_tail_is_cut_off(tmp_path):
+    root = str(tmp_path)
+    with SendLedger(root) as ledger:
+        ledger.record("a@example.com", 0, LEDGER_SENT)
+        ledger.record("b@example.com", 0, LEDGER_SENT)
+    with open(log_path(root), "ab") as f:
+        f.write(b"\x01\x02\x03")  # half a record from a crash mid-write
+
+    with SendLedger(root) as ledger:
+        assert os.path.getsize(log_path(root)) == 2 * SendLedger.RECORD_SIZE
+        assert ledger.already_sent("a@example.com", 0)
+        assert ledger.already_sent("b@example.com", 0)
+        ledger.record("c@example.com", 0, LEDGER_SENT)
+
+    with SendLedger(root) as ledger:
+        assert ledger.already_sent("c@example.com", 0)
+
+
+def test_corrupt_last_record_is_dropped(tmp_path):
+    root = str(tmp_path)
+    with SendLedger(root) as ledger:
+        ledger.record("a@example.com", 0, LEDGER_SENT)
+    os.remove(os.path.join(root, "ledger.idx"))
+    with SendLedger(root) as ledger:
+        ledger.record("b@example.com", 0, LEDGER_SENT)
+    os.remove(os.path.join(root, "ledger.idx"))
+    with open(log_path(root), "r+b") as f:
+        f.seek(-1, os.SEEK_END)
+        last = f.read(1)
+        f.seek(-1, os.SEEK_END)
+        f.write(bytes([last[0] ^ 0xFF]))  # break the CRC
+
+    with SendLedger(root) as ledger:
+        assert ledger.already_sent("a@example.com", 0)
+        assert not ledger.already_sent("b@example.com", 0)
+    assert os.path.getsize(log_path(root)) == SendLedger.RECORD_SIZE
+
+
+def test_missing_index_is_rebuilt_from_log(tmp_path):
+    root = str(tmp_path)
+    with SendLedger(root) as ledger:
+        for i in range(50):
+            ledger.record(f"user{i}@example.com", 1, LEDGER_SENT)
+    os.remove(os.path.join(root, "ledger.idx"))
+
+    with SendLedger(root) as ledger:
+        assert all(ledger.already_sent(f"user{i}@example.com", 1) for i in range(50))
+        assert ledger.entries == 50
+
+
+def test_stale_index_replays_log_tail(tmp_path):
+    # The log is written before the index; a crash in between leaves an
+    # index that covers less of the log than exists.
+    root = str(tmp_path)
+    with SendLedger(root) as ledger:
+        ledger.record("a@example.com", 0, LEDGER_SENT)
+    shutil.copy(os.path.join(root, "ledger.idx"), tmp_path / "old.idx")
+    with SendLedger(root) as ledger:
+        ledger.record("b@example.com", 0, LEDGER_SENT)
+    shutil.copy(tmp_path / "old.idx", os.path.join(root, "ledger.idx"))
+
+    with SendLedger(root) as ledger:
+        assert ledger.already_sent("a@example.com", 0)
+        assert ledger.already_sent("b@example.com", 0)
+        assert ledger.entries == 2
+
+
+def test_index_claiming_more_log_than_exists_is_rebuilt(tmp_path):
+    root = str(tmp_path)
+    with SendLedger(root) as ledger:
+        ledger.record("a@example.com", 0, LEDGER_SENT)
+        ledger.record("b@example.com", 0, LEDGER_SENT)
+    with open(log_path(root), "r+b") as f:
+        f.truncate(SendLedger.RECORD_SIZE)
+
+    with SendLedger(root) as ledger:
+        assert ledger.already_sent("a@example.com", 0)
+        assert not ledger.already_sent("b@example.com", 0)
+
+
+def test_index_grows_past_initial_capacity(tmp_path):
+    root = str(tmp_path)
+    count = 3000
+    with SendLedger(root, fsync_every=1000) as ledger:
+        initial = ledger.capacity
+        for i in range(count):
+            ledger.record(f"user{i}@example.com", i % 30, LEDGER_SENT)
+        assert ledger.capacity > initial
+        assert ledger.entries == count
+        assert all(ledger.already_sent(f"user{i}@example.com", i % 30) for i in range(count))
+
+    with SendLedger(root) as ledger:
+        assert ledger.entries == count
+        assert all(ledger.already_sent(f"user{i}@example.com", i % 30) for i in range(count))
+        assert not ledger.already_sent("user0@example.com", 1)
+
+
+def test_second_open_is_locked_out(tmp_path):
+    root = str(tmp_path)
+    with SendLedger(root):
+        with pytest.raises(LedgerLocked):
+            SendLedger(root).open()
+    SendLedger(root).open().close()
@@ -0,0 +1,35 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from daily_js import accepts_gzip, etag_matches  # noqa: E402
+
+ETAG = '"4523cc52d2ae630f"'
+
+
+@pytest.mark.parametrize("header, expected", [
+    (ETAG, True),
+    (f"W/{ETAG}", True),
+    (f'"other", W/{ETAG}', True),
+    ("*", True),
+    ('"other"', False),
+    ("", False),
+])
+def test_if_none_match_uses_weak_comparison(header, expected):
+    assert etag_matches(header, ETAG) is expected
+
+
+@pytest.mark.parametrize("header, expected", [
+    ("gzip", True),
+    ("br, gzip;q=0.5", True),
+    ("gzip;q=0", False),
+    ("gzip;q=0, *;q=1", False),
+    ("*", True),
+    ("identity", False),
+    ("", False),
+])
+def test_accepts_gzip_honours_q_values(header, expected):
+    assert accepts_gzip(header) is expected